@@ -1,6 +1,13 @@
-from DiffTrader.server.models import ProfitSettingQueries, ExpectedProfitQueries, SlippageDataQueries
+from DiffTrader.server.storage import ProfitSettingQueries, ExpectedProfitQueries, SlippageDataQueries, \
+    ExpectedProfitRollupQueries
+from DiffTrader.server.buffer import write_buffer
+from DiffTrader.server.cache import response_cache
+from DiffTrader.server.slippage import slippage_analytics
+from DiffTrader.server.stream import expected_profit_events
+from DiffTrader.server.settings import PartitionInfo, RollupInfo, SlippageInfo
+from DiffTrader.server.common import epoch_to_date_key
 from flask_restful import Resource
-from flask import jsonify, request
+from flask import jsonify, request, Response
 
 
 class ProfitSettingTable(Resource):
@@ -8,9 +15,10 @@ class ProfitSettingTable(Resource):
         args = request.args
         user_id = args.get('user_id', None)
 
-        result = ProfitSettingQueries.get_profit_setting_table(user_id)
-
-        return result
+        return response_cache.response(
+            'profit_setting', user_id,
+            lambda: [list(row) for row in ProfitSettingQueries.get_profit_setting_table(user_id)]
+        )
 
     def put(self):
         args = request.args
@@ -26,6 +34,7 @@ class ProfitSettingTable(Resource):
 
         if self._value_validator(value_list):
             ProfitSettingQueries.insert_profit_setting_table(value_list)
+            response_cache.invalidate(user_id, 'profit_setting')
             return True
         else:
             return False
@@ -52,10 +61,42 @@ class ExpectedProfitTable(Resource):
         user_id = args.get('user_id', None)
 
         date_from, date_to = args.get('date_from'), args.get('date_to')
+        if user_id is None or date_from is None or date_to is None:
+            return dict(data=list(), next_cursor=None)
+
+        return response_cache.response(
+            'expected_profit', user_id,
+            lambda: self._get_page(user_id, date_from, date_to)
+        )
+
+    def _get_page(self, user_id, date_from, date_to):
+        args = request.args
+        limit = max(1, min(args.get('limit', PartitionInfo.PAGE_SIZE, type=int), PartitionInfo.MAX_PAGE_SIZE))
+        cursor = self._decode_cursor(args.get('cursor'))
+
+        rows = ExpectedProfitQueries.get_expected_profit_table(user_id, date_from, date_to, cursor, limit)
 
-        result = ExpectedProfitQueries.get_expected_profit_table(user_id, date_from, date_to)
+        next_cursor = None
+        if len(rows) == limit:
+            last_trade_date, last_id = rows[-1][0], rows[-1][-1]
+            next_cursor = '{}:{}'.format(last_trade_date, last_id)
 
-        return result
+        return dict(
+            data=[list(row[:-1]) for row in rows],
+            next_cursor=next_cursor
+        )
+
+    def _decode_cursor(self, cursor):
+        """
+            cursor: 'trade_date:id', 이전 응답의 next_cursor
+        """
+        if not cursor:
+            return None
+        try:
+            last_trade_date, last_id = cursor.split(':')
+            return int(last_trade_date), int(last_id)
+        except ValueError:
+            return None
 
     def put(self):
         args = request.args
@@ -69,10 +110,109 @@ class ExpectedProfitTable(Resource):
         profit_percent = args.get('profit_percent')
 
         value_list = [
-            trade_date, symbol, primary_exchange, secondary_exchange, profit_btc, profit_percent
+            user_id, trade_date, symbol, primary_exchange, secondary_exchange, profit_btc, profit_percent
         ]
 
-        ExpectedProfitQueries.put_expected_profit_table(user_id, value_list)
+        # write-behind, flusher thread가 group commit 한다.
+        # flush 이후에도 buffer에서 한번 더 invalidate 한다.
+        response_cache.invalidate(user_id, 'expected_profit')
+        return write_buffer.put('expected_profit_table', value_list)
+
+
+class ExpectedProfitStream(Resource):
+    def get(self):
+        """
+            text/event-stream, 신규 ingest 된 expected_profit rows를 push 한다.
+            cursor 혹은 Last-Event-ID 이후부터 이어받으며, 없으면 지금부터 받는다.
+        """
+        args = request.args
+        user_id = args.get('user_id', None)
+        if user_id is None:
+            return list()
+
+        cursor = request.headers.get('Last-Event-ID') or args.get('cursor')
+        last_id = int(cursor) if cursor and cursor.isdigit() else None
+
+        return Response(
+            expected_profit_events(user_id, last_id),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+
+class ExpectedProfitRollup(Resource):
+    def get(self):
+        """
+            group_by: day, symbol, day_symbol, 없으면 기간 전체 합계
+            date_from, date_to: epoch seconds
+            row: [group columns..., total_profit_btc, trade_count, avg_profit_percent]
+        """
+        args = request.args
+        user_id = args.get('user_id', None)
+        date_from, date_to = args.get('date_from', type=float), args.get('date_to', type=float)
+        group_by = args.get('group_by', None)
+
+        if user_id is None or date_from is None or date_to is None:
+            return list()
+        elif group_by and group_by not in ExpectedProfitRollupQueries.GROUP_BY_COLUMNS:
+            return list()
+
+        result = ExpectedProfitRollupQueries.get_rollup(
+            user_id, group_by, epoch_to_date_key(date_from), epoch_to_date_key(date_to)
+        )
+
+        return [list(row) for row in result]
+
+
+class ExpectedProfitTop(Resource):
+    def get(self):
+        args = request.args
+        user_id = args.get('user_id', None)
+        if user_id is None:
+            return list()
+
+        count = max(1, min(args.get('count', RollupInfo.TOP_COUNT, type=int), RollupInfo.MAX_TOP_COUNT))
+        date_from, date_to = args.get('date_from'), args.get('date_to')
+
+        result = ExpectedProfitQueries.get_top_profits(user_id, count, date_from, date_to)
+
+        return [list(row) for row in result]
+
+
+class AllUsersProfitRollup(Resource):
+    def get(self):
+        """
+            전체 user 대상 rollup, 모든 shard에 scatter 후 합친다.
+            row: [group columns..., total_profit_btc, trade_count, avg_profit_percent]
+        """
+        args = request.args
+        date_from, date_to = args.get('date_from', type=float), args.get('date_to', type=float)
+        group_by = args.get('group_by', None)
+
+        if date_from is None or date_to is None:
+            return list()
+        elif group_by and group_by not in ExpectedProfitRollupQueries.GROUP_BY_COLUMNS:
+            return list()
+
+        return ExpectedProfitRollupQueries.get_all_users_rollup(
+            group_by, epoch_to_date_key(date_from), epoch_to_date_key(date_to)
+        )
+
+
+class AllUsersProfitTop(Resource):
+    def get(self):
+        """
+            row: [user_id, trade_date, symbol, primary_exchange, secondary_exchange, profit_btc, profit_percent]
+        """
+        args = request.args
+        date_from, date_to = args.get('date_from', type=float), args.get('date_to', type=float)
+        if date_from is None or date_to is None:
+            return list()
+
+        count = max(1, min(args.get('count', RollupInfo.TOP_COUNT, type=int), RollupInfo.MAX_TOP_COUNT))
+        result = ExpectedProfitQueries.get_all_users_top_profits(count, date_from, date_to)
+
+        return [list(row) for row in result]
 
 
 class SlippageDataTable(Resource):
@@ -100,5 +240,34 @@ class SlippageDataTable(Resource):
             user_id, coin, market, exchange, orderbooks, tradings,
             trading_type, orderbook_timestamp, trading_timestamp
         ]
-        
-        SlippageDataQueries.put_slippage_data(user_id, value_list)
+
+        return write_buffer.put('slippage_data_table', value_list)
+
+
+class SlippageAnalyticsTable(Resource):
+    def get(self):
+        """
+            symbol: BTC_XRP, exchange: Binance
+            expected/realised VWAP 기준 slippage bps 요약과 target_bps 이내 최대 주문 수량
+        """
+        args = request.args
+        user_id = args.get('user_id', None)
+        symbol = args.get('symbol', None)
+        exchange = args.get('exchange', None)
+        target_bps = args.get('target_bps', SlippageInfo.TARGET_BPS, type=float)
+
+        if not user_id or not symbol or not exchange or symbol.count('_') != 1:
+            return dict()
+
+        return slippage_analytics.get(user_id, symbol, exchange, target_bps)
+
+
+class WriteBufferMetrics(Resource):
+    def get(self):
+        return write_buffer.get_metrics()
+
+
+class ResponseCacheMetrics(Resource):
+    def get(self):
+        return response_cache.get_metrics()
+
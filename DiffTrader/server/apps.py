@@ -1,17 +1,51 @@
-from DiffTrader.server.apis import ProfitSettingTable, ExpectedProfitTable, SlippageDataTable
+from DiffTrader.server.apis import ProfitSettingTable, ExpectedProfitTable, SlippageDataTable, WriteBufferMetrics, \
+    ExpectedProfitRollup, ExpectedProfitTop, ResponseCacheMetrics, SlippageAnalyticsTable, \
+    ExpectedProfitStream, AllUsersProfitRollup, AllUsersProfitTop
+from DiffTrader.server.buffer import write_buffer
+from DiffTrader.server.maintenance import partition_maintenance
+from DiffTrader.server.common import json_default
+from DiffTrader.server.settings import StorageInfo, ProfilingInfo
+from DiffTrader.server.storage import create_tables, CONNECTION_POOLS
 
 from flask import Flask
 from flask_cors import CORS
 from flask_restful import Api
 
+from SharedDatabase import RequestProfiler
+
 
 app = Flask(__name__)
 api = Api()
 
 cors = CORS(app)
 app.config['CORS_HEADERS'] = 'Content-Type'
+app.config['RESTFUL_JSON'] = dict(default=json_default)
 
 api.add_resource(ProfitSettingTable, '/v0/setting/profit-table')
 api.add_resource(ExpectedProfitTable, '/v0/trade/expect-profit')
+api.add_resource(ExpectedProfitRollup, '/v0/trade/expect-profit/rollup')
+api.add_resource(ExpectedProfitTop, '/v0/trade/expect-profit/top')
+api.add_resource(ExpectedProfitStream, '/v0/trade/expect-profit/stream')
+api.add_resource(AllUsersProfitRollup, '/v0/admin/expect-profit/rollup')
+api.add_resource(AllUsersProfitTop, '/v0/admin/expect-profit/top')
 api.add_resource(SlippageDataTable, '/v0/trade/slippage-data')
+api.add_resource(SlippageAnalyticsTable, '/v0/trade/slippage-analytics')
+api.add_resource(WriteBufferMetrics, '/v0/server/write-buffer')
+api.add_resource(ResponseCacheMetrics, '/v0/server/response-cache')
 api.init_app(app)
+
+profiler = RequestProfiler(
+    pools=CONNECTION_POOLS,
+    slow_request_ms=ProfilingInfo.SLOW_REQUEST_MS,
+    sample_interval_ms=ProfilingInfo.SAMPLE_INTERVAL_MS,
+    max_slow_requests=ProfilingInfo.MAX_SLOW_REQUESTS
+)
+profiler.init_app(app, api)
+
+if StorageInfo.BACKEND == 'sqlite':
+    # sqlite는 매 실행마다 비어있을 수 있으므로 시작시 테이블을 만든다.
+    create_tables()
+
+write_buffer.start()
+# 시작시 한번, 이후 PartitionInfo.MAINTENANCE_SECONDS 마다 다음 달 partition을 만든다.
+partition_maintenance.start()
@@ -0,0 +1,219 @@
+from DiffTrader.server.storage import ExpectedProfitQueries, SlippageDataQueries, shard_of
+from DiffTrader.server.settings import BufferInfo
+from DiffTrader.server.cache import response_cache
+from DiffTrader.server.slippage import slippage_analytics
+from DiffTrader.server.stream import stream_hub
+
+from Util.pyinstaller_patch import debugger
+
+import atexit
+import queue
+import threading
+import time
+
+
+class WriteBehindBuffer(threading.Thread):
+    """
+        append-only 테이블(expected_profit_table, slippage_data_table)용 write-behind buffer
+        request handler는 row를 queue에 넣고 바로 반환하며,
+        flusher thread가 flush_rows 혹은 flush_interval_ms 단위로 테이블별 group commit 한다.
+    """
+    def __init__(self, flush_rows, flush_interval_ms, max_pending_rows):
+        super(WriteBehindBuffer, self).__init__()
+        self.daemon = True
+
+        self._flush_rows = flush_rows
+        self._flush_interval = flush_interval_ms / 1000
+        self._max_pending_rows = max_pending_rows
+
+        self._queue = queue.Queue(maxsize=max_pending_rows)
+        self._writers = dict()
+        self._after_flush = dict()
+        self._partitions = dict()
+        self._pending = list()
+
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+        self._metrics_lock = threading.Lock()
+        self._metrics = dict(
+            enqueued_rows=0,
+            rejected_rows=0,
+            flushed_rows=0,
+            failed_rows=0,
+            dropped_rows=0,
+            flush_count=0,
+            failed_flush_count=0,
+            last_flush_rows=0,
+            last_flush_ms=0,
+            max_flush_ms=0,
+            total_flush_ms=0,
+        )
+
+    def register(self, table_name, writer, after_flush=None, partition=None):
+        """
+            Args:
+                table_name: buffer key, table 이름
+                writer: list of rows를 받아 한번에 commit 하는 함수
+                after_flush: commit 이후 flush된 rows를 받아 호출되는 함수, cache invalidate 등
+                partition: row를 받아 shard 번호를 반환하는 함수,
+                    지정하면 shard 별로 따로 commit 하고 실패한 shard의 row만 재시도한다.
+        """
+        self._writers[table_name] = writer
+        if after_flush is not None:
+            self._after_flush[table_name] = after_flush
+        if partition is not None:
+            self._partitions[table_name] = partition
+
+    def put(self, table_name, row):
+        """
+            Return:
+                True if row is queued else False, queue가 가득 찬 경우 호출측에서 처리한다.
+        """
+        if table_name not in self._writers:
+            raise KeyError('[{}] is not registered on write buffer.'.format(table_name))
+        try:
+            self._queue.put_nowait((table_name, row))
+        except queue.Full:
+            self._add_metric('rejected_rows', 1)
+            return False
+
+        self._add_metric('enqueued_rows', 1)
+        return True
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self._collect()
+            self.flush()
+        self.flush()
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout=self._flush_interval * 4)
+        else:
+            self.flush()
+
+    def _collect(self):
+        """
+            flush_rows 만큼 모이거나 flush_interval이 지날때 까지 queue에서 row를 가져온다.
+        """
+        deadline = time.time() + self._flush_interval
+        collected = 0
+        while collected < self._flush_rows:
+            remain = deadline - time.time()
+            if remain <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remain)
+            except queue.Empty:
+                break
+            with self._flush_lock:
+                self._pending.append(item)
+            collected += 1
+
+    def flush(self):
+        """
+            queue와 pending row를 테이블별로 묶어 writer 1회 호출 == 1 commit 으로 저장한다.
+            실패한 row는 pending에 남겨 다음 flush에 재시도한다.
+        """
+        with self._flush_lock:
+            while True:
+                try:
+                    self._pending.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if not self._pending:
+                return
+
+            rows_by_table = dict()
+            for table_name, row in self._pending:
+                partition = self._partitions.get(table_name)
+                key = (table_name, partition(row) if partition else 0)
+                rows_by_table.setdefault(key, list()).append(row)
+            self._pending = list()
+
+            start = time.time()
+            flushed, failed = 0, 0
+            for (table_name, _), rows in rows_by_table.items():
+                try:
+                    self._writers[table_name](rows)
+                    flushed += len(rows)
+                except Exception:
+                    debugger.exception('fail to flush write buffer, [{}]'.format(table_name))
+                    self._pending.extend([(table_name, row) for row in rows])
+                    failed += len(rows)
+                    continue
+
+                after_flush = self._after_flush.get(table_name)
+                if after_flush is not None:
+                    try:
+                        after_flush(rows)
+                    except Exception:
+                        debugger.exception('fail to run after_flush, [{}]'.format(table_name))
+
+            overflow = len(self._pending) - self._max_pending_rows
+            if overflow > 0:
+                # DB 장애가 길어지는 경우 메모리 보호를 위해 오래된 row부터 버린다.
+                self._pending = self._pending[overflow:]
+                self._add_metric('dropped_rows', overflow)
+
+            elapsed_ms = (time.time() - start) * 1000
+            with self._metrics_lock:
+                self._metrics['flush_count'] += 1
+                self._metrics['flushed_rows'] += flushed
+                self._metrics['failed_rows'] += failed
+                self._metrics['failed_flush_count'] += 1 if failed else 0
+                self._metrics['last_flush_rows'] = flushed
+                self._metrics['last_flush_ms'] = elapsed_ms
+                self._metrics['total_flush_ms'] += elapsed_ms
+                self._metrics['max_flush_ms'] = max(self._metrics['max_flush_ms'], elapsed_ms)
+
+    def get_metrics(self):
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+
+        metrics['queued_rows'] = self._queue.qsize()
+        metrics['pending_rows'] = len(self._pending)
+        metrics['avg_flush_ms'] = metrics['total_flush_ms'] / metrics['flush_count'] \
+            if metrics['flush_count'] else 0
+        return metrics
+
+    def _add_metric(self, key, value):
+        with self._metrics_lock:
+            self._metrics[key] += value
+
+
+def after_expected_profit_flush(rows):
+    # row[0] == user_id
+    user_ids = {row[0] for row in rows}
+    for user_id in user_ids:
+        response_cache.invalidate(user_id, 'expected_profit')
+    stream_hub.notify(user_ids)
+
+
+def invalidate_slippage_analytics(rows):
+    for user_id in {row[0] for row in rows}:
+        slippage_analytics.invalidate(user_id)
+
+
+write_buffer = WriteBehindBuffer(
+    BufferInfo.FLUSH_ROWS,
+    BufferInfo.FLUSH_INTERVAL_MS,
+    BufferInfo.MAX_PENDING_ROWS
+)
+write_buffer.register(
+    'expected_profit_table',
+    ExpectedProfitQueries.put_expected_profit_table_many,
+    after_expected_profit_flush,
+    partition=lambda row: shard_of(row[0])
+)
+write_buffer.register(
+    'slippage_data_table',
+    SlippageDataQueries.put_slippage_data_many,
+    invalidate_slippage_analytics,
+    partition=lambda row: shard_of(row[0])
+)
+
+atexit.register(write_buffer.stop)
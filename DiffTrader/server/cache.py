@@ -0,0 +1,125 @@
+from DiffTrader.server.settings import CacheInfo
+from DiffTrader.server.common import json_default
+
+from flask import request, Response
+
+from collections import OrderedDict
+
+import hashlib
+import json
+import threading
+
+
+class ResponseCache(object):
+    """
+        GET 응답용 read-through LRU cache
+        key는 (namespace, user_id, 정렬된 query args), user 단위로 invalidate 한다.
+        invalidate 마다 user의 generation을 올리고, loader 실행 중 generation이 바뀌었으면
+        이전 값으로 읽었을 수 있으므로 cache에 넣지 않는다.
+    """
+    def __init__(self, max_entries):
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._user_keys = dict()
+        self._generations = dict()
+        self._lock = threading.Lock()
+
+        self._metrics = dict(hits=0, misses=0, not_modified=0, evictions=0, invalidations=0, stale_skips=0)
+
+    @staticmethod
+    def make_key(namespace, user_id, args):
+        return namespace, user_id, tuple(sorted((key, value) for key, value in args.items(multi=True)))
+
+    def get(self, key):
+        """
+            Return:
+                (etag, payload) if key is cached else None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._metrics['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._metrics['hits'] += 1
+            return entry
+
+    def generation(self, user_id):
+        with self._lock:
+            return self._generations.get(user_id, 0)
+
+    def set(self, key, payload, generation=None):
+        """
+            Args:
+                generation: loader 실행 전의 generation(user_id), 그 사이 invalidate 되었으면 저장하지 않는다.
+        """
+        dumped = json.dumps(payload, default=json_default, sort_keys=True)
+        etag = hashlib.md5(dumped.encode()).hexdigest()
+
+        _, user_id, _ = key
+        with self._lock:
+            if generation is not None and self._generations.get(user_id, 0) != generation:
+                self._metrics['stale_skips'] += 1
+                return etag
+
+            self._entries[key] = (etag, payload)
+            self._entries.move_to_end(key)
+            self._user_keys.setdefault(user_id, set()).add(key)
+
+            while len(self._entries) > self._max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._discard_user_key(old_key)
+                self._metrics['evictions'] += 1
+
+        return etag
+
+    def invalidate(self, user_id, namespace=None):
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            for key in list(self._user_keys.get(user_id, set())):
+                if namespace is None or key[0] == namespace:
+                    self._entries.pop(key, None)
+                    self._discard_user_key(key)
+                    self._metrics['invalidations'] += 1
+
+    def get_metrics(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['entries'] = len(self._entries)
+        return metrics
+
+    def _discard_user_key(self, key):
+        _, user_id, _ = key
+        keys = self._user_keys.get(user_id)
+        if keys is None:
+            return
+        keys.discard(key)
+        if not keys:
+            self._user_keys.pop(user_id)
+
+    def response(self, namespace, user_id, loader):
+        """
+            cache hit인 경우 DB를 거치지 않고, If-None-Match가 같으면 304를 반환한다.
+            Args:
+                loader: cache miss일 때 payload를 만드는 함수
+        """
+        key = self.make_key(namespace, user_id, request.args)
+        entry = self.get(key)
+        if entry is None:
+            generation = self.generation(user_id)
+            payload = loader()
+            etag = self.set(key, payload, generation)
+        else:
+            etag, payload = entry
+
+        headers = {'ETag': '"{}"'.format(etag)}
+        if request.if_none_match.contains(etag):
+            with self._lock:
+                self._metrics['not_modified'] += 1
+            return Response(status=304, headers=headers)
+
+        return payload, 200, headers
+
+
+response_cache = ResponseCache(CacheInfo.MAX_ENTRIES)
@@ -0,0 +1,45 @@
+from decimal import Decimal
+import datetime
+
+"""
+    MySQL, SQLite backend가 함께 쓰는 변환 함수
+    connection pool을 만들지 않으므로 어느 backend에서든 import 할 수 있다.
+"""
+
+
+def epoch_to_date_key(epoch):
+    """
+        epoch seconds -> YYYYMMDD(int, UTC), rollup 테이블의 일 단위 key
+    """
+    return int(datetime.datetime.utcfromtimestamp(float(epoch)).strftime('%Y%m%d'))
+
+
+def aggregate_rollup_rows(row_list):
+    """
+        expected_profit rows를 (user_id, YYYYMMDD, symbol) 단위로 미리 합쳐서
+        같은 key에 대한 rollup upsert를 flush 당 1회로 줄인다.
+        Return:
+            [[user_id, rollup_date, symbol, total_profit_btc, trade_count, sum_profit_percent], ...]
+    """
+    rollup = dict()
+    for user_id, trade_date, symbol, _, _, profit_btc, profit_percent in row_list:
+        key = (user_id, epoch_to_date_key(trade_date), symbol)
+        total_profit_btc, trade_count, sum_profit_percent = rollup.get(key, (Decimal(0), 0, 0.0))
+        rollup[key] = (
+            total_profit_btc + Decimal(str(profit_btc or 0)),
+            trade_count + 1,
+            sum_profit_percent + float(profit_percent or 0)
+        )
+
+    return [[*key, *value] for key, value in rollup.items()]
+
+
+def json_default(obj):
+    """
+        flask_restful json 변환시 DECIMAL, DATE 컬럼 처리
+    """
+    if isinstance(obj, Decimal):
+        return float(obj)
+    elif isinstance(obj, (datetime.date, datetime.datetime)):
+        return obj.isoformat()
+    raise TypeError('{} is not JSON serializable'.format(type(obj)))
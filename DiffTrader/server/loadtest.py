@@ -0,0 +1,173 @@
+"""
+    DiffTrader server load generator
+    PUT/GET 요청을 실제 client와 비슷한 비율로 섞어 보내고, endpoint 별 p50/p99 latency, throughput을 출력한다.
+
+    usage:
+        # SQLite in-memory backend, in-process flask test client
+        python -m DiffTrader.server.loadtest --local --duration 30 --workers 8
+
+        # 실행중인 server 대상
+        python -m DiffTrader.server.loadtest --url http://localhost:5000 --duration 30 --workers 8
+"""
+import argparse
+import os
+import random
+import threading
+import time
+
+# (name, method, path, weight)
+SCENARIOS = [
+    ('put_expect_profit', 'PUT', '/v0/trade/expect-profit', 40),
+    ('get_expect_profit', 'GET', '/v0/trade/expect-profit', 20),
+    ('get_top_profit', 'GET', '/v0/trade/expect-profit/top', 10),
+    ('get_profit_rollup', 'GET', '/v0/trade/expect-profit/rollup', 10),
+    ('put_slippage_data', 'PUT', '/v0/trade/slippage-data', 10),
+    ('put_profit_setting', 'PUT', '/v0/setting/profit-table', 2),
+    ('get_profit_setting', 'GET', '/v0/setting/profit-table', 8),
+]
+
+SYMBOLS = ['BTC_XRP', 'BTC_ETH', 'BTC_EOS', 'BTC_ADA', 'BTC_QTUM']
+EXCHANGES = ['Binance', 'Bithumb', 'Upbit']
+
+
+def make_params(name, user_id):
+    now = time.time()
+    if name == 'put_expect_profit':
+        primary, secondary = random.sample(EXCHANGES, 2)
+        return dict(
+            user_id=user_id,
+            trade_date=int(now),
+            symbol=random.choice(SYMBOLS),
+            primary_exchange=primary,
+            secondary_exchange=secondary,
+            profit_btc=round(random.uniform(0.0001, 0.01), 8),
+            profit_percent=round(random.uniform(0.001, 0.05), 4)
+        )
+    elif name == 'get_expect_profit':
+        return dict(user_id=user_id, date_from=int(now - 24 * 60 * 60), date_to=int(now))
+    elif name == 'get_top_profit':
+        return dict(user_id=user_id, count=10, date_from=int(now - 24 * 60 * 60), date_to=int(now))
+    elif name == 'get_profit_rollup':
+        return dict(user_id=user_id, date_from=int(now - 7 * 24 * 60 * 60), date_to=int(now), group_by='day')
+    elif name == 'put_slippage_data':
+        market, coin = random.choice(SYMBOLS).split('_')
+        return dict(
+            user_id=user_id,
+            coin=coin,
+            market=market,
+            exchange=random.choice(EXCHANGES),
+            orderbooks='{"asks": [[0.0001, 100]], "bids": [[0.00009, 100]]}',
+            tradings='[[0.0001, 10]]',
+            trading_type='primary_to_secondary',
+            trading_timestamp=int(now)
+        )
+    elif name == 'put_profit_setting':
+        return dict(user_id=user_id, min_profit_percent=0.03, min_profit_btc=0.0075, auto_withdrawal=1)
+    else:
+        return dict(user_id=user_id)
+
+
+class HttpClient(object):
+    def __init__(self, url):
+        import requests
+
+        self._url = url.rstrip('/')
+        self._session = requests.Session()
+
+    def request(self, method, path, params):
+        rq = self._session.request(method, self._url + path, params=params)
+        return rq.status_code
+
+
+class LocalClient(object):
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def request(self, method, path, params):
+        rq = self._client.open(path, method=method, query_string=params)
+        return rq.status_code
+
+
+class LoadWorker(threading.Thread):
+    def __init__(self, client, users, deadline):
+        super(LoadWorker, self).__init__()
+        self.daemon = True
+        self._client = client
+        self._users = users
+        self._deadline = deadline
+
+        self.latencies = {name: list() for name, *_ in SCENARIOS}
+        self.errors = {name: 0 for name, *_ in SCENARIOS}
+
+    def run(self):
+        weights = [weight for *_, weight in SCENARIOS]
+        while time.time() < self._deadline:
+            name, method, path, _ = random.choices(SCENARIOS, weights=weights)[0]
+            params = make_params(name, random.choice(self._users))
+
+            start = time.perf_counter()
+            try:
+                status = self._client.request(method, path, params)
+            except Exception:
+                status = None
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            if status is None or status >= 400:
+                self.errors[name] += 1
+            else:
+                self.latencies[name].append(elapsed_ms)
+
+
+def percentile(sorted_list, percent):
+    if not sorted_list:
+        return 0
+    index = min(len(sorted_list) - 1, int(round(percent / 100 * (len(sorted_list) - 1))))
+    return sorted_list[index]
+
+
+def report(workers, elapsed):
+    print('{:<22}{:>9}{:>8}{:>11}{:>11}{:>11}'.format('endpoint', 'requests', 'errors', 'req/s', 'p50(ms)', 'p99(ms)'))
+    total = 0
+    for name, *_ in SCENARIOS:
+        latencies = sorted(each for worker in workers for each in worker.latencies[name])
+        errors = sum(worker.errors[name] for worker in workers)
+        total += len(latencies)
+        print('{:<22}{:>9}{:>8}{:>11.1f}{:>11.2f}{:>11.2f}'.format(
+            name, len(latencies), errors, len(latencies) / elapsed,
+            percentile(latencies, 50), percentile(latencies, 99)
+        ))
+    print('total {} requests in {:.1f}s, {:.1f} req/s'.format(total, elapsed, total / elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DiffTrader server load generator')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--local', action='store_true', help='run in-process with the SQLite backend')
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--users', type=int, default=50)
+    args = parser.parse_args()
+
+    if args.local:
+        # settings가 import 되기 전에 backend를 정해야 한다.
+        os.environ.setdefault('DIFFTRADER_STORAGE', 'sqlite')
+        from DiffTrader.server.apps import app
+        make_client = lambda: LocalClient(app)
+    else:
+        make_client = lambda: HttpClient(args.url)
+
+    users = ['loadtest-{}'.format(n) for n in range(args.users)]
+    deadline = time.time() + args.duration
+    workers = [LoadWorker(make_client(), users, deadline) for _ in range(args.workers)]
+
+    start = time.time()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    report(workers, time.time() - start)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+from DiffTrader.server.storage import ExpectedProfitQueries
+from DiffTrader.server.settings import PartitionInfo
+
+from Util.pyinstaller_patch import debugger
+
+import atexit
+import threading
+
+
+class PartitionMaintenance(threading.Thread):
+    """
+        expected_profit_table의 다음 달 partition을 시작시, 그리고 interval_seconds 마다 미리 만든다.
+        이미 있는 partition은 건너뛰므로 월 1회보다 자주 실행해도 된다.
+    """
+    def __init__(self, interval_seconds):
+        super(PartitionMaintenance, self).__init__()
+        self.daemon = True
+
+        self._interval = interval_seconds
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.run_once()
+            self._stop_event.wait(self._interval)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run_once(self):
+        try:
+            added = ExpectedProfitQueries.add_expected_profit_partitions()
+        except Exception:
+            debugger.exception('fail to add expected_profit_table partitions')
+            return None
+
+        if any(added):
+            debugger.info('expected_profit_table partitions added, [{}]'.format(added))
+        return added
+
+
+partition_maintenance = PartitionMaintenance(PartitionInfo.MAINTENANCE_SECONDS)
+
+atexit.register(partition_maintenance.stop)
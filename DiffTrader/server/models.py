@@ -1,4 +1,8 @@
-from DiffTrader.server.util import execute_db_many, execute_db
+from DiffTrader.server.util import execute_db_many, execute_db, execute_db_group, stream_db, execute_db_all, \
+    shard_of, monthly_partition_bounds, SHARD_COUNT
+from DiffTrader.server.common import aggregate_rollup_rows
+from DiffTrader.server.sharding import split_by_shard, merge_rollup_rows, merge_top_rows
+from DiffTrader.server.settings import PartitionInfo
 
 
 
@@ -15,7 +19,7 @@ class ProfitSettingQueries(object):
             )
         """
 
-        return execute_db(query)
+        return execute_db_all(query)
 
     @staticmethod
     def get_profit_setting_table(user_id):
@@ -24,7 +28,7 @@ class ProfitSettingQueries(object):
             FROM profit_setting_table
             WHERE user_id = %s
         """
-        return execute_db(query, value=user_id)
+        return execute_db(query, value=user_id, shard=shard_of(user_id))
 
     @staticmethod
     def insert_profit_setting_table(value_list):
@@ -36,44 +40,271 @@ class ProfitSettingQueries(object):
             min_profit_btc = VALUES(min_profit_btc),
             auto_withdrawal = VALUES(auto_withdrawal)
         """
-        return execute_db(query, value=value_list)
+        return execute_db(query, value=value_list, shard=shard_of(value_list[0]))
 
 
 class ExpectedProfitQueries(object):
     @staticmethod
     def create_expected_profit_table():
+        """
+            trade_date는 epoch seconds, 월 단위 RANGE partition으로 나눈다.
+            partition key는 모든 unique key에 포함되어야 하므로 PK는 (id, trade_date).
+        """
+        partitions = ',\n'.join(
+            'PARTITION {} VALUES LESS THAN ({})'.format(name, less_than)
+            for name, less_than in monthly_partition_bounds(PartitionInfo.MONTHS_BEFORE, PartitionInfo.MONTHS_AFTER)
+        )
         query = """
             CREATE TABLE IF NOT EXISTS expected_profit_table(
-                user_id INT,
-                trade_date DATE,
+                id BIGINT NOT NULL AUTO_INCREMENT,
+                user_id VARCHAR(64) NOT NULL,
+                trade_date BIGINT NOT NULL,
+                symbol CHAR(16) NOT NULL,
                 primary_exchange CHAR(16),
                 secondary_exchange CHAR(16),
-                profit_btc DECIMAL(4, 8),
-                profit_perecent FLOAT,
+                profit_btc DECIMAL(18, 8),
+                profit_percent FLOAT,
+                PRIMARY KEY (id, trade_date),
+                KEY user_trade_date_idx (user_id, trade_date, id),
+                KEY user_profit_btc_idx (user_id, profit_btc)
+            )
+            PARTITION BY RANGE (trade_date) (
+                {partitions},
+                PARTITION p_future VALUES LESS THAN MAXVALUE
             )
+        """.format(partitions=partitions)
+
+        return execute_db_all(query)
+
+    @staticmethod
+    def add_expected_profit_partitions(now=None):
+        """
+            p_future를 분할해 MONTHS_AFTER 만큼의 다음 달 partition을 shard 마다 미리 만든다.
+            이미 있는 partition은 건너뛴다, PartitionMaintenance가 주기적으로 호출한다.
+            Return:
+                shard 별 추가한 partition 이름 list
         """
+        query = """
+            SELECT partition_name
+            FROM information_schema.partitions
+            WHERE table_schema = DATABASE() AND table_name = 'expected_profit_table'
+        """
+        added = list()
+        for shard in range(SHARD_COUNT):
+            exist_partitions = {each[0] for each in execute_db(query, shard=shard)}
+
+            new_bounds = [
+                (name, less_than)
+                for name, less_than in monthly_partition_bounds(0, PartitionInfo.MONTHS_AFTER, now)
+                if name not in exist_partitions
+            ]
+            added.append([name for name, _ in new_bounds])
+            if not new_bounds:
+                continue
 
-        return execute_db(query)
+            new_partitions = [
+                'PARTITION {} VALUES LESS THAN ({})'.format(name, less_than) for name, less_than in new_bounds
+            ]
+
+            reorganize_query = """
+                ALTER TABLE expected_profit_table REORGANIZE PARTITION p_future INTO (
+                    {partitions},
+                    PARTITION p_future VALUES LESS THAN MAXVALUE
+                )
+            """.format(partitions=',\n'.join(new_partitions))
+
+            execute_db(reorganize_query, shard=shard)
+        return added
 
     @staticmethod
-    def get_expected_profit_table(user_id, date_from, date_to):
+    def get_expected_profit_table(user_id, date_from, date_to, cursor=None, limit=PartitionInfo.PAGE_SIZE):
+        """
+            (trade_date, id) keyset pagination,
+            user_trade_date_idx를 range scan 하고 trade_date 조건으로 partition pruning 된다.
+
+            Args:
+                cursor: 이전 page 마지막 row의 (trade_date, id), 첫 page는 None
+            Return:
+                rows, 각 row의 마지막 값은 id
+        """
+        last_trade_date, last_id = cursor if cursor else (date_from, -1)
         query = """
-        SELECT trade_date, symbol, primary_exchange, secondary_exchange, profit_btc, profit_percent
-        FROM expected_porift_table
-        WHERE user_id = %s AND (trade_date BETWEEN date_from AND date_to)
+        SELECT trade_date, symbol, primary_exchange, secondary_exchange, profit_btc, profit_percent, id
+        FROM expected_profit_table
+        WHERE user_id = %s AND (trade_date BETWEEN %s AND %s)
+        AND (trade_date > %s OR (trade_date = %s AND id > %s))
+        ORDER BY trade_date ASC, id ASC
+        LIMIT %s
         """
 
-        return execute_db(query, value=[user_id, date_from, date_to])
+        return execute_db(query, value=[user_id, date_from, date_to,
+                                        last_trade_date, last_trade_date, last_id, limit], shard=shard_of(user_id))
 
     @staticmethod
-    def put_expected_profit_table(user_id, value_list):
+    def get_last_expected_profit_id(user_id, trade_date_from):
         query = """
-        INSERT INTO expected_profit_table(user_id, trade_date, symbol, 
+        SELECT MAX(id)
+        FROM expected_profit_table
+        WHERE user_id = %s AND trade_date >= %s
+        """
+
+        result = execute_db(query, value=[user_id, trade_date_from], shard=shard_of(user_id))
+        return result[0][0] if result and result[0][0] is not None else 0
+
+    @staticmethod
+    def get_expected_profit_since(user_id, last_id, trade_date_from, limit):
+        """
+            push stream 용, id(ingest 순서) 기준으로 last_id 이후 row를 가져온다.
+            trade_date 하한으로 user_trade_date_idx range scan과 partition pruning을 유지한다.
+        """
+        query = """
+        SELECT trade_date, symbol, primary_exchange, secondary_exchange, profit_btc, profit_percent, id
+        FROM expected_profit_table
+        WHERE user_id = %s AND trade_date >= %s AND id > %s
+        ORDER BY id ASC
+        LIMIT %s
+        """
+
+        return execute_db(query, value=[user_id, trade_date_from, last_id, limit], shard=shard_of(user_id))
+
+    @staticmethod
+    def put_expected_profit_table_many(row_list):
+        """
+            row_list: [[user_id, trade_date, symbol, primary_exchange, secondary_exchange,
+                        profit_btc, profit_percent], ...]
+            원본 row insert와 rollup 갱신을 같은 transaction으로 처리한다.
+        """
+        query = """
+        INSERT INTO expected_profit_table(user_id, trade_date, symbol,
         primary_exchange, secondary_exchange, profit_btc, profit_percent)
         VALUES (%s, %s, %s, %s, %s, %s, %s)
         """
 
-        return execute_db(query, value=[user_id, *value_list])
+        for shard, rows in split_by_shard(row_list, SHARD_COUNT).items():
+            execute_db_group([
+                (query, rows),
+                (ExpectedProfitRollupQueries.UPSERT_QUERY, aggregate_rollup_rows(rows))
+            ], shard=shard)
+
+    @staticmethod
+    def get_top_profits(user_id, count, date_from=None, date_to=None):
+        """
+            user_profit_btc_idx를 역순으로 읽어 count개만 가져온다.
+            date range가 있는 경우 user_trade_date_idx range scan 후 정렬한다.
+        """
+        if date_from is None or date_to is None:
+            query = """
+            SELECT trade_date, symbol, primary_exchange, secondary_exchange, profit_btc, profit_percent
+            FROM expected_profit_table
+            WHERE user_id = %s
+            ORDER BY profit_btc DESC
+            LIMIT %s
+            """
+            return execute_db(query, value=[user_id, count], shard=shard_of(user_id))
+
+        query = """
+        SELECT trade_date, symbol, primary_exchange, secondary_exchange, profit_btc, profit_percent
+        FROM expected_profit_table
+        WHERE user_id = %s AND (trade_date BETWEEN %s AND %s)
+        ORDER BY profit_btc DESC
+        LIMIT %s
+        """
+        return execute_db(query, value=[user_id, date_from, date_to, count], shard=shard_of(user_id))
+
+    @staticmethod
+    def get_all_users_top_profits(count, date_from, date_to):
+        """
+            전체 user 대상 top-N, shard 별 top-N을 모아 다시 자른다.
+        """
+        query = """
+        SELECT user_id, trade_date, symbol, primary_exchange, secondary_exchange, profit_btc, profit_percent
+        FROM expected_profit_table
+        WHERE trade_date BETWEEN %s AND %s
+        ORDER BY profit_btc DESC
+        LIMIT %s
+        """
+        shard_results = execute_db_all(query, value=[date_from, date_to, count])
+        return merge_top_rows(shard_results, count, sort_index=5)
+
+
+class ExpectedProfitRollupQueries(object):
+    """
+        user, 일(UTC), symbol 단위 누적 집계 테이블
+        avg profit percent = sum_profit_percent / trade_count
+    """
+    UPSERT_QUERY = """
+        INSERT INTO expected_profit_rollup(user_id, rollup_date, symbol,
+        total_profit_btc, trade_count, sum_profit_percent)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+        total_profit_btc = total_profit_btc + VALUES(total_profit_btc),
+        trade_count = trade_count + VALUES(trade_count),
+        sum_profit_percent = sum_profit_percent + VALUES(sum_profit_percent)
+    """
+
+    GROUP_BY_COLUMNS = {
+        'day': 'rollup_date',
+        'symbol': 'symbol',
+        'day_symbol': 'rollup_date, symbol',
+    }
+
+    @staticmethod
+    def create_expected_profit_rollup():
+        query = """
+            CREATE TABLE IF NOT EXISTS expected_profit_rollup(
+                user_id VARCHAR(64) NOT NULL,
+                rollup_date INT NOT NULL,
+                symbol CHAR(16) NOT NULL,
+                total_profit_btc DECIMAL(24, 8) NOT NULL DEFAULT 0,
+                trade_count INT NOT NULL DEFAULT 0,
+                sum_profit_percent DOUBLE NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, rollup_date, symbol)
+            )
+        """
+
+        return execute_db_all(query)
+
+    @staticmethod
+    def get_rollup(user_id, group_by, date_from, date_to):
+        """
+            Args:
+                group_by: 'day', 'symbol', 'day_symbol' 혹은 None(기간 전체 합계)
+                date_from, date_to: YYYYMMDD
+        """
+        group_columns = ExpectedProfitRollupQueries.GROUP_BY_COLUMNS.get(group_by)
+        select_columns = '{}, '.format(group_columns) if group_columns else ''
+        group_clause = 'GROUP BY {0} ORDER BY {0}'.format(group_columns) if group_columns else ''
+
+        query = """
+        SELECT {select_columns}SUM(total_profit_btc), SUM(trade_count),
+        SUM(sum_profit_percent) / SUM(trade_count)
+        FROM expected_profit_rollup
+        WHERE user_id = %s AND (rollup_date BETWEEN %s AND %s)
+        {group_clause}
+        """.format(select_columns=select_columns, group_clause=group_clause)
+
+        return execute_db(query, value=[user_id, date_from, date_to], shard=shard_of(user_id))
+
+    @staticmethod
+    def get_all_users_rollup(group_by, date_from, date_to):
+        """
+            전체 user 대상 rollup, shard 별 합계를 key 단위로 다시 합친다.
+            평균은 shard 마다 구하면 틀어지므로 sum_profit_percent 합계를 가져와 merge 후 나눈다.
+        """
+        group_columns = ExpectedProfitRollupQueries.GROUP_BY_COLUMNS.get(group_by)
+        select_columns = '{}, '.format(group_columns) if group_columns else ''
+        group_clause = 'GROUP BY {}'.format(group_columns) if group_columns else ''
+
+        query = """
+        SELECT {select_columns}SUM(total_profit_btc), SUM(trade_count), SUM(sum_profit_percent)
+        FROM expected_profit_rollup
+        WHERE rollup_date BETWEEN %s AND %s
+        {group_clause}
+        """.format(select_columns=select_columns, group_clause=group_clause)
+
+        shard_results = execute_db_all(query, value=[date_from, date_to])
+        key_size = len(group_columns.split(',')) if group_columns else 0
+        return merge_rollup_rows(shard_results, key_size)
 
 
 class SlippageDataQueries(object):
@@ -81,18 +312,37 @@ class SlippageDataQueries(object):
     def get_slippage_data(user_id):
         query = """
         SELECT user_id, coin, market, exchange, orderbooks, tradings, trading_type, orderbook_timestamp, trading_timestamp
-        FROM expected_porift_table
+        FROM slippage_data_table
         WHERE user_id = %s
         """
 
-        return execute_db(query, value=[user_id])
+        return execute_db(query, value=[user_id], shard=shard_of(user_id))
+
+    @staticmethod
+    def get_slippage_data_by_symbol(user_id, coin, market, exchange):
+        """
+            orderbooks, tradings는 크기가 커서 SSCursor로 stream 한다.
+        """
+        query = """
+        SELECT orderbooks, tradings, trading_type
+        FROM slippage_data_table
+        WHERE user_id = %s AND coin = %s AND market = %s AND exchange = %s
+        ORDER BY trading_timestamp ASC
+        """
+
+        return stream_db(query, value=[user_id, coin, market, exchange], shard=shard_of(user_id))
     
     @staticmethod
-    def put_slippage_data(user_id, value_list):
+    def put_slippage_data_many(row_list):
+        """
+            row_list: [[user_id, coin, market, exchange, orderbooks, tradings,
+                        trading_type, orderbook_timestamp, trading_timestamp], ...]
+        """
         query = """
         INSERT INTO slippage_data_table(user_id, coin, market, exchange, orderbooks, tradings,
         trading_type, orderbook_timestamp, trading_timestamp)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
         """
 
-        return execute_db(query, value=[user_id, *value_list])
+        for shard, rows in split_by_shard(row_list, SHARD_COUNT).items():
+            execute_db_many(query, rows, shard=shard)
@@ -1,3 +1,6 @@
+import os
+
+
 class SqlInfo(object):
     POOL_CONFIG = {
         'database': 'difftrader',
@@ -5,3 +8,69 @@ class SqlInfo(object):
         'password': 'root',
         'host': 'localhost',
     }
+    POOL_SIZE = 3
+    SLOW_QUERY_MS = 200
+
+    # user_id 기준 write sharding, 각 shard는 같은 schema를 가진 별도 database
+    SHARD_CONFIGS = [POOL_CONFIG]
+
+
+class BufferInfo(object):
+    # write-behind buffer, append-only 테이블은 N rows 혹은 T ms 단위로 group commit 한다.
+    FLUSH_ROWS = 200
+    FLUSH_INTERVAL_MS = 500
+    MAX_PENDING_ROWS = 20000
+
+
+class PartitionInfo(object):
+    # expected_profit_table 월 단위 partition, 생성시 앞뒤로 미리 만들어 둘 개월 수
+    MONTHS_BEFORE = 12
+    MONTHS_AFTER = 3
+    # 다음 달 partition이 없으면 p_future로 들어가 pruning이 안되므로 주기적으로 미리 만든다.
+    MAINTENANCE_SECONDS = 24 * 60 * 60
+
+    PAGE_SIZE = 500
+    MAX_PAGE_SIZE = 5000
+
+
+class RollupInfo(object):
+    TOP_COUNT = 10
+    MAX_TOP_COUNT = 100
+
+
+class CacheInfo(object):
+    # GET 응답 LRU cache 최대 entry 수
+    MAX_ENTRIES = 4096
+
+
+class StorageInfo(object):
+    # mysql 혹은 sqlite, sqlite는 local 실행과 load test 용도
+    BACKEND = os.environ.get('DIFFTRADER_STORAGE', 'mysql')
+    SQLITE_PATH = os.environ.get('DIFFTRADER_SQLITE_PATH', ':memory:')
+    # 콤마로 구분한 sqlite 파일 목록, 지정하면 user_id 기준으로 나눠 저장한다.
+    SQLITE_SHARD_PATHS = [
+        path for path in os.environ.get('DIFFTRADER_SQLITE_SHARDS', '').split(',') if path
+    ] or [SQLITE_PATH]
+
+
+class SlippageInfo(object):
+    # slippage analytics, BATCH_SIZE trade 단위로 decode/계산하고 결과는 CACHE_SECONDS 동안 재사용한다.
+    BATCH_SIZE = 2000
+    CACHE_SECONDS = 300
+    TARGET_BPS = 10
+
+
+class StreamInfo(object):
+    # expected_profit push stream(SSE)
+    LOOKBACK_SECONDS = 24 * 60 * 60
+    BATCH_SIZE = 500
+    HEARTBEAT_SECONDS = 15
+    RETRY_MS = 3000
+
+
+class ProfilingInfo(object):
+    # request profiling, /metrics 로 endpoint 별 parse/db/serialize latency를 노출한다.
+    SLOW_REQUEST_MS = 500
+    # 0 보다 크면 sampling profiler로 slow request의 stack을 수집한다.
+    SAMPLE_INTERVAL_MS = int(os.environ.get('DIFFTRADER_PROFILE_SAMPLE_MS', 0))
+    MAX_SLOW_REQUESTS = 50
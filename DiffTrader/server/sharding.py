@@ -0,0 +1,66 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import zlib
+
+"""
+    user_id 기준 shard routing과 scatter-gather helper
+    shard 번호는 crc32(user_id) % shard 수, 프로세스/재시작과 무관하게 같은 user는 같은 shard로 간다.
+"""
+
+
+def shard_of(user_id, shard_count):
+    if shard_count == 1:
+        return 0
+    return zlib.crc32(str(user_id).encode()) % shard_count
+
+
+def split_by_shard(row_list, shard_count, key_index=0):
+    """
+        Return:
+            {shard: rows}, row[key_index] == user_id
+    """
+    rows_by_shard = dict()
+    for row in row_list:
+        rows_by_shard.setdefault(shard_of(row[key_index], shard_count), list()).append(row)
+    return rows_by_shard
+
+
+def scatter(func, shard_count):
+    """
+        func(shard)를 모든 shard에 동시에 실행하고 shard 순서대로 결과를 반환한다.
+    """
+    if shard_count == 1:
+        return [func(0)]
+    with ThreadPoolExecutor(max_workers=shard_count) as executor:
+        return list(executor.map(func, range(shard_count)))
+
+
+def merge_rollup_rows(shard_results, key_size):
+    """
+        shard 별 [key columns..., total_profit_btc, trade_count, sum_profit_percent] 결과를 key 단위로 합친다.
+        Return:
+            [[key columns..., total_profit_btc, trade_count, avg_profit_percent], ...] key 순서로 정렬
+    """
+    merged = dict()
+    for rows in shard_results:
+        for row in rows:
+            key = tuple(row[:key_size])
+            total_profit_btc, trade_count, sum_profit_percent = row[key_size:]
+            if trade_count is None:
+                continue
+            before = merged.get(key, (0, 0, 0))
+            merged[key] = (
+                before[0] + float(total_profit_btc or 0),
+                before[1] + int(trade_count),
+                before[2] + float(sum_profit_percent or 0)
+            )
+
+    return [
+        [*key, total_profit_btc, trade_count, sum_profit_percent / trade_count if trade_count else 0]
+        for key, (total_profit_btc, trade_count, sum_profit_percent) in sorted(merged.items())
+    ]
+
+
+def merge_top_rows(shard_results, count, sort_index):
+    rows = [row for rows in shard_results for row in rows]
+    return sorted(rows, key=lambda row: row[sort_index], reverse=True)[:count]
@@ -0,0 +1,234 @@
+from DiffTrader.server.settings import SlippageInfo
+from DiffTrader.server.storage import SlippageDataQueries
+
+import numpy as np
+
+import json
+import threading
+import time
+
+"""
+    send_slippage_data로 쌓인 orderbooks, tradings를 batch 단위로 decode 해서
+    expected VWAP(주문 당시 orderbook 기준) / realised VWAP(실제 체결) / slippage bps / 소진 depth를 계산한다.
+
+    orderbooks: {"asks": [[price, amount], ...], "bids": [...]}, level은 {"price", "amount"} dict도 허용
+    tradings: [[price, amount], ...] 혹은 {"fills": [...]}, fill은 {"price", "amount"|"qty"} dict도 허용
+"""
+
+BUY = 1
+SELL = -1
+
+
+def _to_levels(raw_levels):
+    levels = list()
+    for level in raw_levels or list():
+        if isinstance(level, dict):
+            price = level.get('price')
+            amount = level.get('amount', level.get('qty', level.get('quantity')))
+        else:
+            price, amount = level[0], level[1]
+        if price is None or amount is None:
+            continue
+        levels.append((float(price), float(amount)))
+    return levels
+
+
+def decode_orderbook(raw_orderbook):
+    """
+        Return:
+            (asks, bids), level list of (price, amount), asks는 오름차순 bids는 내림차순
+    """
+    data = json.loads(raw_orderbook) if isinstance(raw_orderbook, (str, bytes)) else raw_orderbook
+    if not isinstance(data, dict):
+        return list(), list()
+    asks = sorted(_to_levels(data.get('asks')))
+    bids = sorted(_to_levels(data.get('bids')), reverse=True)
+    return asks, bids
+
+
+def decode_fills(raw_tradings):
+    data = json.loads(raw_tradings) if isinstance(raw_tradings, (str, bytes)) else raw_tradings
+    if isinstance(data, dict):
+        data = data.get('fills', data.get('trades', list()))
+    return _to_levels(data)
+
+
+def trade_side(trading_type):
+    """
+        PRIMARY_TO_SECONDARY는 primary에서 BTC를 팔고 ALT를 사므로 asks를 소진한다.
+    """
+    return BUY if trading_type == 'primary_to_secondary' else SELL
+
+
+def _pad(level_lists):
+    """
+        길이가 다른 level list들을 (N, L) price, amount 배열로 맞춘다. 빈 칸은 amount 0.
+    """
+    width = max([len(levels) for levels in level_lists] + [1])
+    prices = np.zeros((len(level_lists), width))
+    amounts = np.zeros((len(level_lists), width))
+    for n, levels in enumerate(level_lists):
+        if levels:
+            array = np.asarray(levels, dtype=float)
+            prices[n, :len(levels)] = array[:, 0]
+            amounts[n, :len(levels)] = array[:, 1]
+    return prices, amounts
+
+
+def compute_batch(book_levels, fill_levels, sides):
+    """
+        N개 trade를 한번에 계산한다.
+        Args:
+            book_levels: trade 별 소진 방향 orderbook levels
+            fill_levels: trade 별 체결 levels
+            sides: trade 별 BUY/SELL
+        Return:
+            dict of (N,) arrays, 계산할 수 없는 trade는 nan
+    """
+    book_prices, book_amounts = _pad(book_levels)
+    fill_prices, fill_amounts = _pad(fill_levels)
+    sides = np.asarray(sides, dtype=float)
+
+    filled_qty = fill_amounts.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        realised_vwap = (fill_prices * fill_amounts).sum(axis=1) / filled_qty
+
+        # 체결 수량만큼 book을 위에서부터 소진했을 때 각 level에서 가져가는 수량
+        cum_before = np.cumsum(book_amounts, axis=1) - book_amounts
+        taken = np.clip(filled_qty[:, None] - cum_before, 0, book_amounts)
+        taken_qty = taken.sum(axis=1)
+        expected_vwap = (taken * book_prices).sum(axis=1) / taken_qty
+
+        slippage_bps = (realised_vwap - expected_vwap) / expected_vwap * 10000 * sides
+        depth_ratio = filled_qty / book_amounts.sum(axis=1)
+
+    valid = (filled_qty > 0) & (taken_qty > 0)
+    return dict(
+        filled_qty=filled_qty,
+        expected_vwap=np.where(valid, expected_vwap, np.nan),
+        realised_vwap=np.where(valid, realised_vwap, np.nan),
+        slippage_bps=np.where(valid, slippage_bps, np.nan),
+        depth_levels=(taken > 0).sum(axis=1),
+        depth_ratio=np.where(valid, depth_ratio, np.nan),
+        # book 수량보다 많이 체결된 경우 expected는 book 전체 기준
+        book_exhausted=filled_qty > taken_qty,
+    )
+
+
+def max_size_within_bps(levels, target_bps):
+    """
+        최근 orderbook 기준 VWAP가 best price 대비 target_bps 이내로 유지되는 최대 수량
+        fill simulator 등의 주문 수량 산정에 사용한다.
+    """
+    if not levels:
+        return 0.0
+    array = np.asarray(levels, dtype=float)
+    prices, amounts = array[:, 0], array[:, 1]
+    cum_amounts = np.cumsum(amounts)
+    vwap = np.cumsum(prices * amounts) / cum_amounts
+    cost_bps = np.abs(vwap / prices[0] - 1) * 10000
+    within = np.nonzero(cost_bps <= target_bps)[0]
+    return float(cum_amounts[within[-1]]) if within.size else 0.0
+
+
+class SlippageAnalytics(object):
+    """
+        (user_id, symbol, exchange) 단위 결과 cache, slippage row가 flush 되면 해당 user를 invalidate 한다.
+    """
+    def __init__(self, batch_size, cache_seconds):
+        self._batch_size = batch_size
+        self._cache_seconds = cache_seconds
+        self._cache = dict()
+        self._lock = threading.Lock()
+
+    def invalidate(self, user_id):
+        with self._lock:
+            for key in [key for key in self._cache if key[0] == user_id]:
+                self._cache.pop(key)
+
+    def get(self, user_id, symbol, exchange, target_bps=SlippageInfo.TARGET_BPS):
+        """
+            batch 결과는 (user_id, symbol, exchange) 단위로 cache 하고,
+            target_bps는 요청마다 달라질 수 있으므로 sizing만 매번 계산한다.
+        """
+        key = (user_id, symbol, exchange)
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached and time.time() - cached[0] < self._cache_seconds:
+            summary, last_book = cached[1]
+        else:
+            summary, last_book = self.analyze(user_id, symbol, exchange)
+            with self._lock:
+                self._cache[key] = (time.time(), (summary, last_book))
+
+        if last_book is None:
+            return summary
+
+        levels, side = last_book
+        return dict(summary, sizing=dict(
+            side='buy' if side == BUY else 'sell',
+            target_bps=target_bps,
+            max_size=max_size_within_bps(levels, target_bps)
+        ))
+
+    def analyze(self, user_id, symbol, exchange):
+        """
+            Return:
+                (summary, (마지막 trade의 소진 방향 levels, side)), 분석할 trade가 없으면 last book은 None
+        """
+        market, coin = symbol.split('_', 1)
+        rows = SlippageDataQueries.get_slippage_data_by_symbol(user_id, coin, market, exchange)
+
+        results = list()
+        batch = list()
+        last_book = None
+        for orderbooks, tradings, trading_type in rows:
+            batch.append((orderbooks, tradings, trading_type))
+            if len(batch) >= self._batch_size:
+                batch_result, last_book = self._compute_rows(batch)
+                results.append(batch_result)
+                batch = list()
+        if batch:
+            batch_result, last_book = self._compute_rows(batch)
+            results.append(batch_result)
+
+        if not results:
+            return dict(trade_count=0), None
+
+        merged = {name: np.concatenate([each[name] for each in results]) for name in results[0]}
+        slippage = merged['slippage_bps'][~np.isnan(merged['slippage_bps'])]
+        if not slippage.size:
+            return dict(trade_count=int(merged['filled_qty'].size), analyzed_count=0), None
+
+        summary = dict(
+            trade_count=int(merged['filled_qty'].size),
+            analyzed_count=int(slippage.size),
+            total_filled_qty=float(merged['filled_qty'].sum()),
+            mean_slippage_bps=float(slippage.mean()),
+            median_slippage_bps=float(np.median(slippage)),
+            p90_slippage_bps=float(np.percentile(slippage, 90)),
+            max_slippage_bps=float(slippage.max()),
+            mean_depth_levels=float(merged['depth_levels'].mean()),
+            mean_depth_ratio=float(np.nanmean(merged['depth_ratio'])),
+            book_exhausted_count=int(merged['book_exhausted'].sum()),
+        )
+
+        return summary, last_book
+
+    def _compute_rows(self, rows):
+        book_levels, fill_levels, sides = list(), list(), list()
+        for orderbooks, tradings, trading_type in rows:
+            try:
+                asks, bids = decode_orderbook(orderbooks)
+                fills = decode_fills(tradings)
+            except (ValueError, TypeError, IndexError):
+                asks, bids, fills = list(), list(), list()
+            side = trade_side(trading_type)
+            book_levels.append(asks if side == BUY else bids)
+            fill_levels.append(fills)
+            sides.append(side)
+
+        return compute_batch(book_levels, fill_levels, sides), (book_levels[-1], sides[-1])
+
+
+slippage_analytics = SlippageAnalytics(SlippageInfo.BATCH_SIZE, SlippageInfo.CACHE_SECONDS)
@@ -0,0 +1,281 @@
+from DiffTrader.server.sqlite_util import execute_db_many, execute_db, execute_db_group, stream_db, \
+    execute_db_all, shard_of, SHARD_COUNT
+from DiffTrader.server.sharding import split_by_shard, merge_rollup_rows, merge_top_rows
+from DiffTrader.server.common import aggregate_rollup_rows
+from DiffTrader.server.settings import PartitionInfo
+
+"""
+    models.py와 같은 interface의 SQLite 구현체
+    partition, ON DUPLICATE KEY 대신 일반 index와 ON CONFLICT upsert를 사용한다.
+"""
+
+
+class ProfitSettingQueries(object):
+    @staticmethod
+    def create_min_profit_data_table():
+        query = """
+            CREATE TABLE IF NOT EXISTS profit_setting_table(
+                user_id TEXT PRIMARY KEY,
+                min_profit_percent REAL NOT NULL,
+                min_profit_btc REAL NOT NULL,
+                auto_withdrawal INTEGER NOT NULL
+            )
+        """
+
+        return execute_db_all(query)
+
+    @staticmethod
+    def get_profit_setting_table(user_id):
+        query = """
+            SELECT user_id
+            FROM profit_setting_table
+            WHERE user_id = ?
+        """
+        return execute_db(query, value=[user_id], shard=shard_of(user_id))
+
+    @staticmethod
+    def insert_profit_setting_table(value_list):
+        query = """
+            INSERT INTO profit_setting_table(user_id, min_profit_percent, min_profit_btc, auto_withdrawal)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+            min_profit_percent = excluded.min_profit_percent,
+            min_profit_btc = excluded.min_profit_btc,
+            auto_withdrawal = excluded.auto_withdrawal
+        """
+        return execute_db(query, value=value_list, shard=shard_of(value_list[0]))
+
+
+class ExpectedProfitQueries(object):
+    @staticmethod
+    def create_expected_profit_table():
+        execute_db_all("""
+            CREATE TABLE IF NOT EXISTS expected_profit_table(
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                trade_date INTEGER NOT NULL,
+                symbol TEXT NOT NULL,
+                primary_exchange TEXT,
+                secondary_exchange TEXT,
+                profit_btc REAL,
+                profit_percent REAL
+            )
+        """)
+        execute_db_all("""
+            CREATE INDEX IF NOT EXISTS user_trade_date_idx
+            ON expected_profit_table(user_id, trade_date, id)
+        """)
+        return execute_db_all("""
+            CREATE INDEX IF NOT EXISTS user_profit_btc_idx
+            ON expected_profit_table(user_id, profit_btc)
+        """)
+
+    @staticmethod
+    def add_expected_profit_partitions(now=None):
+        # SQLite는 partition을 지원하지 않는다.
+        return [list() for _ in range(SHARD_COUNT)]
+
+    @staticmethod
+    def get_expected_profit_table(user_id, date_from, date_to, cursor=None, limit=PartitionInfo.PAGE_SIZE):
+        last_trade_date, last_id = cursor if cursor else (date_from, -1)
+        query = """
+        SELECT trade_date, symbol, primary_exchange, secondary_exchange, profit_btc, profit_percent, id
+        FROM expected_profit_table
+        WHERE user_id = ? AND (trade_date BETWEEN ? AND ?)
+        AND (trade_date > ? OR (trade_date = ? AND id > ?))
+        ORDER BY trade_date ASC, id ASC
+        LIMIT ?
+        """
+
+        return execute_db(query, value=[user_id, date_from, date_to,
+                                        last_trade_date, last_trade_date, last_id, limit], shard=shard_of(user_id))
+
+    @staticmethod
+    def get_last_expected_profit_id(user_id, trade_date_from):
+        query = """
+        SELECT MAX(id)
+        FROM expected_profit_table
+        WHERE user_id = ? AND trade_date >= ?
+        """
+
+        result = execute_db(query, value=[user_id, trade_date_from], shard=shard_of(user_id))
+        return result[0][0] if result and result[0][0] is not None else 0
+
+    @staticmethod
+    def get_expected_profit_since(user_id, last_id, trade_date_from, limit):
+        query = """
+        SELECT trade_date, symbol, primary_exchange, secondary_exchange, profit_btc, profit_percent, id
+        FROM expected_profit_table
+        WHERE user_id = ? AND trade_date >= ? AND id > ?
+        ORDER BY id ASC
+        LIMIT ?
+        """
+
+        return execute_db(query, value=[user_id, trade_date_from, last_id, limit], shard=shard_of(user_id))
+
+    @staticmethod
+    def put_expected_profit_table_many(row_list):
+        query = """
+        INSERT INTO expected_profit_table(user_id, trade_date, symbol,
+        primary_exchange, secondary_exchange, profit_btc, profit_percent)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """
+
+        for shard, rows in split_by_shard(row_list, SHARD_COUNT).items():
+            execute_db_group([
+                (query, rows),
+                (ExpectedProfitRollupQueries.UPSERT_QUERY, aggregate_rollup_rows(rows))
+            ], shard=shard)
+
+    @staticmethod
+    def get_top_profits(user_id, count, date_from=None, date_to=None):
+        if date_from is None or date_to is None:
+            query = """
+            SELECT trade_date, symbol, primary_exchange, secondary_exchange, profit_btc, profit_percent
+            FROM expected_profit_table
+            WHERE user_id = ?
+            ORDER BY profit_btc DESC
+            LIMIT ?
+            """
+            return execute_db(query, value=[user_id, count], shard=shard_of(user_id))
+
+        query = """
+        SELECT trade_date, symbol, primary_exchange, secondary_exchange, profit_btc, profit_percent
+        FROM expected_profit_table
+        WHERE user_id = ? AND (trade_date BETWEEN ? AND ?)
+        ORDER BY profit_btc DESC
+        LIMIT ?
+        """
+        return execute_db(query, value=[user_id, date_from, date_to, count], shard=shard_of(user_id))
+
+    @staticmethod
+    def get_all_users_top_profits(count, date_from, date_to):
+        query = """
+        SELECT user_id, trade_date, symbol, primary_exchange, secondary_exchange, profit_btc, profit_percent
+        FROM expected_profit_table
+        WHERE trade_date BETWEEN ? AND ?
+        ORDER BY profit_btc DESC
+        LIMIT ?
+        """
+        shard_results = execute_db_all(query, value=[date_from, date_to, count])
+        return merge_top_rows(shard_results, count, sort_index=5)
+
+
+class ExpectedProfitRollupQueries(object):
+    UPSERT_QUERY = """
+        INSERT INTO expected_profit_rollup(user_id, rollup_date, symbol,
+        total_profit_btc, trade_count, sum_profit_percent)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(user_id, rollup_date, symbol) DO UPDATE SET
+        total_profit_btc = total_profit_btc + excluded.total_profit_btc,
+        trade_count = trade_count + excluded.trade_count,
+        sum_profit_percent = sum_profit_percent + excluded.sum_profit_percent
+    """
+
+    GROUP_BY_COLUMNS = {
+        'day': 'rollup_date',
+        'symbol': 'symbol',
+        'day_symbol': 'rollup_date, symbol',
+    }
+
+    @staticmethod
+    def create_expected_profit_rollup():
+        query = """
+            CREATE TABLE IF NOT EXISTS expected_profit_rollup(
+                user_id TEXT NOT NULL,
+                rollup_date INTEGER NOT NULL,
+                symbol TEXT NOT NULL,
+                total_profit_btc REAL NOT NULL DEFAULT 0,
+                trade_count INTEGER NOT NULL DEFAULT 0,
+                sum_profit_percent REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, rollup_date, symbol)
+            )
+        """
+
+        return execute_db_all(query)
+
+    @staticmethod
+    def get_rollup(user_id, group_by, date_from, date_to):
+        group_columns = ExpectedProfitRollupQueries.GROUP_BY_COLUMNS.get(group_by)
+        select_columns = '{}, '.format(group_columns) if group_columns else ''
+        group_clause = 'GROUP BY {0} ORDER BY {0}'.format(group_columns) if group_columns else ''
+
+        query = """
+        SELECT {select_columns}SUM(total_profit_btc), SUM(trade_count),
+        SUM(sum_profit_percent) / SUM(trade_count)
+        FROM expected_profit_rollup
+        WHERE user_id = ? AND (rollup_date BETWEEN ? AND ?)
+        {group_clause}
+        """.format(select_columns=select_columns, group_clause=group_clause)
+
+        return execute_db(query, value=[user_id, date_from, date_to], shard=shard_of(user_id))
+
+    @staticmethod
+    def get_all_users_rollup(group_by, date_from, date_to):
+        group_columns = ExpectedProfitRollupQueries.GROUP_BY_COLUMNS.get(group_by)
+        select_columns = '{}, '.format(group_columns) if group_columns else ''
+        group_clause = 'GROUP BY {}'.format(group_columns) if group_columns else ''
+
+        query = """
+        SELECT {select_columns}SUM(total_profit_btc), SUM(trade_count), SUM(sum_profit_percent)
+        FROM expected_profit_rollup
+        WHERE rollup_date BETWEEN ? AND ?
+        {group_clause}
+        """.format(select_columns=select_columns, group_clause=group_clause)
+
+        shard_results = execute_db_all(query, value=[date_from, date_to])
+        key_size = len(group_columns.split(',')) if group_columns else 0
+        return merge_rollup_rows(shard_results, key_size)
+
+
+class SlippageDataQueries(object):
+    @staticmethod
+    def create_slippage_data_table():
+        query = """
+            CREATE TABLE IF NOT EXISTS slippage_data_table(
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                coin TEXT,
+                market TEXT,
+                exchange TEXT,
+                orderbooks TEXT,
+                tradings TEXT,
+                trading_type TEXT,
+                orderbook_timestamp TEXT,
+                trading_timestamp TEXT
+            )
+        """
+
+        return execute_db_all(query)
+
+    @staticmethod
+    def get_slippage_data(user_id):
+        query = """
+        SELECT user_id, coin, market, exchange, orderbooks, tradings, trading_type, orderbook_timestamp, trading_timestamp
+        FROM slippage_data_table
+        WHERE user_id = ?
+        """
+
+        return execute_db(query, value=[user_id], shard=shard_of(user_id))
+
+    @staticmethod
+    def get_slippage_data_by_symbol(user_id, coin, market, exchange):
+        query = """
+        SELECT orderbooks, tradings, trading_type
+        FROM slippage_data_table
+        WHERE user_id = ? AND coin = ? AND market = ? AND exchange = ?
+        ORDER BY trading_timestamp ASC
+        """
+
+        return stream_db(query, value=[user_id, coin, market, exchange], shard=shard_of(user_id))
+
+    @staticmethod
+    def put_slippage_data_many(row_list):
+        query = """
+        INSERT INTO slippage_data_table(user_id, coin, market, exchange, orderbooks, tradings,
+        trading_type, orderbook_timestamp, trading_timestamp)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """
+
+        for shard, rows in split_by_shard(row_list, SHARD_COUNT).items():
+            execute_db_many(query, rows, shard=shard)
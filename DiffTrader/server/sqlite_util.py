@@ -0,0 +1,109 @@
+from DiffTrader.server.settings import StorageInfo
+from DiffTrader.server import sharding
+from SharedDatabase import profiling, QueryStats
+
+from contextlib import contextmanager
+from decimal import Decimal
+
+import sqlite3
+import threading
+import time
+
+sqlite3.register_adapter(Decimal, float)
+
+
+class SqliteDatabase(object):
+    """
+        local, load test 용 SQLite storage
+        ':memory:' 를 여러 thread에서 공유해야 하므로 connection 1개를 lock으로 보호한다.
+    """
+    def __init__(self, path):
+        self._con = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.stats = QueryStats()
+        if path != ':memory:':
+            self._con.execute('PRAGMA journal_mode=WAL')
+            self._con.execute('PRAGMA synchronous=NORMAL')
+
+    @contextmanager
+    def _locked(self):
+        # lock 대기는 MySQL pool 대기와 같은 의미로 pool_wait에 기록한다.
+        start = time.time()
+        with self._lock:
+            wait_ms = (time.time() - start) * 1000
+            self.stats.add_pool_wait(wait_ms)
+            profiling.add_pool_wait(wait_ms)
+            start = time.time()
+            try:
+                yield
+            finally:
+                profiling.add_db_time((time.time() - start) * 1000)
+
+    def execute(self, query, value=None):
+        with self._locked():
+            try:
+                cursor = self._con.execute(query, value or ())
+                data = cursor.fetchall()
+                self._con.commit()
+            except Exception:
+                self._con.rollback()
+                raise
+        return data
+
+    def execute_many(self, query, value_list, *args):
+        if not value_list:
+            raise ValueError('value_list is empty')
+
+        rows = [tuple(list(args) + list(each)) for each in value_list]
+        with self._locked():
+            try:
+                self._con.executemany(query, rows)
+                self._con.commit()
+            except Exception:
+                self._con.rollback()
+                raise
+        return list()
+
+    def execute_group(self, statement_list):
+        with self._locked():
+            try:
+                for query, value_list in statement_list:
+                    if value_list:
+                        self._con.executemany(query, [tuple(each) for each in value_list])
+                self._con.commit()
+            except Exception:
+                self._con.rollback()
+                raise
+
+    def stream(self, query, value=None, fetch_size=1000):
+        # SQLite는 로컬이라 한번에 읽어도 lock 점유 시간이 짧다.
+        for row in self.execute(query, value):
+            yield row
+
+
+DATABASES = [SqliteDatabase(path) for path in StorageInfo.SQLITE_SHARD_PATHS]
+SHARD_COUNT = len(DATABASES)
+
+
+def shard_of(user_id):
+    return sharding.shard_of(user_id, SHARD_COUNT)
+
+
+def execute_db(query, value=None, shard=0):
+    return DATABASES[shard].execute(query, value)
+
+
+def execute_db_many(query, value_list, *args, shard=0):
+    return DATABASES[shard].execute_many(query, value_list, *args)
+
+
+def execute_db_group(statement_list, shard=0):
+    return DATABASES[shard].execute_group(statement_list)
+
+
+def stream_db(query, value=None, fetch_size=1000, shard=0):
+    return DATABASES[shard].stream(query, value, fetch_size)
+
+
+def execute_db_all(query, value=None):
+    return sharding.scatter(lambda shard: execute_db(query, value, shard=shard), SHARD_COUNT)
@@ -0,0 +1,38 @@
+from DiffTrader.server.settings import StorageInfo
+
+"""
+    StorageInfo.BACKEND 에 따라 query 구현체를 선택한다.
+    apis, buffer는 models를 직접 import 하지 않고 이 모듈을 통해 사용한다.
+    CONNECTION_POOLS는 /metrics에 노출할 현재 backend의 pool(sqlite는 shard 별 database) list
+"""
+
+if StorageInfo.BACKEND == 'sqlite':
+    from DiffTrader.server.sqlite_models import ProfitSettingQueries, ExpectedProfitQueries, \
+        ExpectedProfitRollupQueries, SlippageDataQueries
+    from DiffTrader.server.sqlite_util import shard_of, DATABASES as CONNECTION_POOLS
+elif StorageInfo.BACKEND == 'mysql':
+    from DiffTrader.server.models import ProfitSettingQueries, ExpectedProfitQueries, \
+        ExpectedProfitRollupQueries, SlippageDataQueries
+    from DiffTrader.server.util import shard_of, CONNECTION_POOLS
+else:
+    raise ValueError('unknown storage backend, [{}]'.format(StorageInfo.BACKEND))
+
+
+def create_tables():
+    ProfitSettingQueries.create_min_profit_data_table()
+    ExpectedProfitQueries.create_expected_profit_table()
+    ExpectedProfitQueries.add_expected_profit_partitions()
+    ExpectedProfitRollupQueries.create_expected_profit_rollup()
+    if hasattr(SlippageDataQueries, 'create_slippage_data_table'):
+        SlippageDataQueries.create_slippage_data_table()
+
+
+__all__ = [
+    'ProfitSettingQueries',
+    'ExpectedProfitQueries',
+    'ExpectedProfitRollupQueries',
+    'SlippageDataQueries',
+    'create_tables',
+    'shard_of',
+    'CONNECTION_POOLS'
+]
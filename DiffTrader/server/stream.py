@@ -0,0 +1,75 @@
+from DiffTrader.server.settings import StreamInfo
+from DiffTrader.server.storage import ExpectedProfitQueries
+from DiffTrader.server.common import json_default
+
+import json
+import threading
+import time
+
+
+class ProfitStreamHub(object):
+    """
+        user 별 expected_profit 신규 row 알림
+        write buffer flush 이후 notify 되며, 구독자는 자신의 cursor(id) 이후 row만 DB에서 읽는다.
+    """
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._versions = dict()
+
+    def notify(self, user_ids):
+        with self._condition:
+            for user_id in user_ids:
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._condition.notify_all()
+
+    def version(self, user_id):
+        with self._condition:
+            return self._versions.get(user_id, 0)
+
+    def wait(self, user_id, version, timeout):
+        """
+            Return:
+                현재 version, timeout 동안 변경이 없으면 전달받은 version 그대로
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._versions.get(user_id, 0) != version, timeout=timeout)
+            return self._versions.get(user_id, 0)
+
+
+def sse_event(event, data, event_id=None):
+    lines = list()
+    if event_id is not None:
+        lines.append('id: {}'.format(event_id))
+    lines.append('event: {}'.format(event))
+    lines.append('data: {}'.format(json.dumps(data, default=json_default)))
+    return '\n'.join(lines) + '\n\n'
+
+
+def expected_profit_events(user_id, last_id=None):
+    """
+        SSE generator, last_id 이후 ingest 된 row를 push 한다.
+        id는 ingest 순서이므로 trade_date가 늦게 도착한 row도 빠지지 않는다.
+        event id == 마지막 row id, 재접속시 Last-Event-ID로 이어받는다.
+    """
+    if last_id is None:
+        last_id = ExpectedProfitQueries.get_last_expected_profit_id(user_id, time.time() - StreamInfo.LOOKBACK_SECONDS)
+
+    yield 'retry: {}\n\n'.format(StreamInfo.RETRY_MS)
+    while True:
+        # 조회 전에 version을 읽어야 조회 중 들어온 notify를 놓치지 않는다.
+        version = stream_hub.version(user_id)
+        rows = ExpectedProfitQueries.get_expected_profit_since(
+            user_id, last_id, time.time() - StreamInfo.LOOKBACK_SECONDS, StreamInfo.BATCH_SIZE
+        )
+        if rows:
+            last_id = rows[-1][-1]
+            yield sse_event('expected_profit', [list(row[:-1]) for row in rows], last_id)
+            if len(rows) == StreamInfo.BATCH_SIZE:
+                continue
+
+        if stream_hub.wait(user_id, version, StreamInfo.HEARTBEAT_SECONDS) == version:
+            # proxy, client의 idle timeout 방지
+            yield ': keep-alive\n\n'
+
+
+stream_hub = ProfitStreamHub()
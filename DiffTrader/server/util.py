@@ -1,44 +1,69 @@
 from DiffTrader.server.settings import SqlInfo as info
-from mysql.connector import pooling
+from DiffTrader.server import sharding
+from SharedDatabase import ConnectionPool
 
-from Util.pyinstaller_patch import debugger
+import datetime
+import calendar
 
-CONNECTION_POOL = pooling.MySQLConnectionPool(
-    pool_name='server_pool',
-    pool_size=3,
-    **info.POOL_CONFIG
-)
+CONNECTION_POOLS = [
+    ConnectionPool(
+        pool_size=info.POOL_SIZE,
+        slow_query_ms=info.SLOW_QUERY_MS,
+        **config
+    )
+    for config in info.SHARD_CONFIGS
+]
+SHARD_COUNT = len(CONNECTION_POOLS)
 
 
-def execute_db(query, value=None, custom_cursor=None):
-    con = CONNECTION_POOL.get_connection()
+def shard_of(user_id):
+    return sharding.shard_of(user_id, SHARD_COUNT)
 
-    with con.cursor(custom_cursor) as cursor:
-        if value:
-            cursor.execute(query, value)
-        else:
-            cursor.execute(query)
 
-        debugger.info(cursor._last_executed)
-        data = cursor.fetchall()
+def execute_db(query, value=None, custom_cursor=None, shard=0):
+    return CONNECTION_POOLS[shard].execute(query, value, custom_cursor)
 
-    con.commit()
 
-    return data
+def execute_db_many(query, value_list, *args, shard=0):
+    return CONNECTION_POOLS[shard].execute_many(query, value_list, *args)
 
 
-def execute_db_many(query, value_list, *args):
-    try:
-        con = CONNECTION_POOL.get_connection()
-        with con.cursor() as cursor:
-            if value_list:
-                cursor.executemany(query, [tuple(list(args) + each) for each in value_list])
-            else:
-                raise
-            debugger.info(cursor._last_executed)
-            data = cursor.fetchall()
-        con.commit()
-        return data
-    except Exception:
-        debugger.info(query)
-        raise
+def execute_db_group(statement_list, shard=0):
+    """
+        여러 executemany를 하나의 connection, 하나의 transaction으로 처리한다.
+        Args:
+            statement_list: [(query, value_list), ...], value_list가 비어있는 statement는 건너뛴다.
+    """
+    return CONNECTION_POOLS[shard].execute_group(statement_list)
+
+
+def stream_db(query, value=None, fetch_size=1000, shard=0):
+    return CONNECTION_POOLS[shard].stream(query, value, fetch_size)
+
+
+def execute_db_all(query, value=None):
+    """
+        모든 shard에 같은 query를 실행한다. DDL, admin 집계용
+        Return:
+            shard 순서대로의 결과 list
+    """
+    return sharding.scatter(lambda shard: execute_db(query, value, shard=shard), SHARD_COUNT)
+
+
+def monthly_partition_bounds(months_before, months_after, now=None):
+    """
+        Return:
+            [(partition name, 다음 달 1일 00:00 UTC epoch), ...]
+            ex) ('p202610', 1793491200) -> 2026년 10월 row는 p202610에 들어간다.
+    """
+    now = now or datetime.datetime.utcnow()
+    bounds = list()
+    for diff in range(-months_before, months_after + 1):
+        month_index = now.year * 12 + now.month - 1 + diff
+        year, month = divmod(month_index, 12)
+        next_year, next_month = divmod(month_index + 1, 12)
+        less_than = calendar.timegm((next_year, next_month + 1, 1, 0, 0, 0))
+        bounds.append(('p{:04d}{:02d}'.format(year, month + 1), less_than))
+
+    return bounds
+
@@ -0,0 +1,21 @@
+import pytest
+
+import os
+import uuid
+
+# server settings는 import 시점에 읽으므로 server module 보다 먼저 설정한다.
+# in-memory SQLite 2개를 shard로 사용한다.
+os.environ['DIFFTRADER_STORAGE'] = 'sqlite'
+os.environ['DIFFTRADER_SQLITE_SHARDS'] = ':memory:,:memory:'
+
+
+@pytest.fixture
+def client():
+    from DiffTrader.server.apps import app
+    return app.test_client()
+
+
+@pytest.fixture
+def user_id():
+    # in-memory DB는 test 사이에 공유되므로 test 마다 다른 user를 쓴다.
+    return uuid.uuid4().hex
@@ -0,0 +1,134 @@
+from DiffTrader.server.buffer import WriteBehindBuffer
+
+
+class FlakyWriter(object):
+    def __init__(self, fail_times=0):
+        self.fail_times = fail_times
+        self.calls = list()
+
+    def __call__(self, rows):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise ConnectionError('db is down')
+        self.calls.append(list(rows))
+
+
+def make_buffer(writer, after_flush=None, partition=None, flush_rows=100, max_pending_rows=100):
+    buffer = WriteBehindBuffer(flush_rows, 10, max_pending_rows)
+    buffer.register('table', writer, after_flush, partition)
+    return buffer
+
+
+def test_flush_commits_once_per_table():
+    writer = FlakyWriter()
+    flushed = list()
+    buffer = make_buffer(writer, after_flush=flushed.extend)
+
+    for index in range(5):
+        assert buffer.put('table', ['user', index])
+    buffer.flush()
+
+    assert writer.calls == [[['user', index] for index in range(5)]]
+    assert flushed == [['user', index] for index in range(5)]
+
+    metrics = buffer.get_metrics()
+    assert metrics['flushed_rows'] == 5
+    assert metrics['flush_count'] == 1
+    assert metrics['pending_rows'] == 0
+
+
+def test_flush_splits_by_partition():
+    writer = FlakyWriter()
+    buffer = make_buffer(writer, partition=lambda row: row[0] % 2)
+
+    for index in range(6):
+        buffer.put('table', [index])
+    buffer.flush()
+
+    assert sorted(writer.calls) == [[[0], [2], [4]], [[1], [3], [5]]]
+
+
+def test_failed_rows_are_retried_on_next_flush():
+    writer = FlakyWriter(fail_times=1)
+    flushed = list()
+    buffer = make_buffer(writer, after_flush=flushed.extend)
+
+    buffer.put('table', ['user', 1])
+    buffer.put('table', ['user', 2])
+    buffer.flush()
+
+    assert writer.calls == list()
+    assert flushed == list()
+    metrics = buffer.get_metrics()
+    assert metrics['failed_rows'] == 2
+    assert metrics['failed_flush_count'] == 1
+    assert metrics['pending_rows'] == 2
+
+    buffer.put('table', ['user', 3])
+    buffer.flush()
+
+    assert writer.calls == [[['user', 1], ['user', 2], ['user', 3]]]
+    assert flushed == [['user', 1], ['user', 2], ['user', 3]]
+    assert buffer.get_metrics()['pending_rows'] == 0
+
+
+def test_only_failed_partition_is_retried():
+    failing_shards = {1}
+    calls = list()
+
+    def writer(rows):
+        if rows[0][0] in failing_shards:
+            raise ConnectionError('shard is down')
+        calls.append(list(rows))
+
+    buffer = make_buffer(writer, partition=lambda row: row[0])
+    buffer.put('table', [0, 'a'])
+    buffer.put('table', [1, 'b'])
+    buffer.flush()
+    assert calls == [[[0, 'a']]]
+
+    failing_shards.clear()
+    buffer.flush()
+    assert calls == [[[0, 'a']], [[1, 'b']]]
+
+
+def test_pending_overflow_drops_oldest_rows():
+    writer = FlakyWriter(fail_times=10)
+    buffer = make_buffer(writer, max_pending_rows=3)
+
+    for index in range(3):
+        buffer.put('table', [index])
+    buffer.flush()
+    buffer.put('table', [3])
+    buffer.flush()
+
+    assert buffer.get_metrics()['dropped_rows'] == 1
+    assert buffer.get_metrics()['pending_rows'] == 3
+
+    writer.fail_times = 0
+    buffer.flush()
+    assert writer.calls == [[[1], [2], [3]]]
+
+
+def test_full_queue_rejects_rows():
+    buffer = make_buffer(FlakyWriter(), max_pending_rows=2)
+
+    assert buffer.put('table', [1])
+    assert buffer.put('table', [2])
+    assert not buffer.put('table', [3])
+    assert buffer.get_metrics()['rejected_rows'] == 1
+
+
+def test_after_flush_error_does_not_requeue_rows():
+    writer = FlakyWriter()
+
+    def after_flush(rows):
+        raise RuntimeError('invalidate failed')
+
+    buffer = make_buffer(writer, after_flush=after_flush)
+    buffer.put('table', [1])
+    buffer.flush()
+    buffer.flush()
+
+    assert writer.calls == [[[1]]]
+    assert buffer.get_metrics()['pending_rows'] == 0
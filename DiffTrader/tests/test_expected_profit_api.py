@@ -0,0 +1,81 @@
+from DiffTrader.server.storage import ExpectedProfitQueries
+
+URL = '/v0/trade/expect-profit'
+
+
+def put_rows(user_id, trade_dates):
+    ExpectedProfitQueries.put_expected_profit_table_many([
+        [user_id, trade_date, 'BTC_XRP', 'binance', 'bithumb', 0.001 * index, 0.1]
+        for index, trade_date in enumerate(trade_dates)
+    ])
+
+
+def get_page(client, user_id, **params):
+    params = dict(dict(user_id=user_id, date_from=0, date_to=1000), **params)
+    response = client.get(URL, query_string=params)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_keyset_pages_follow_next_cursor(client, user_id):
+    put_rows(user_id, [100, 100, 101, 102, 103])
+    put_rows('other-{}'.format(user_id), [100, 101])
+
+    rows, cursors, cursor = list(), list(), None
+    while True:
+        page = get_page(client, user_id, limit=2, **(dict(cursor=cursor) if cursor else dict()))
+        rows.extend(page['data'])
+        cursor = page['next_cursor']
+        cursors.append(cursor)
+        if not cursor:
+            break
+
+    assert [row[0] for row in rows] == [100, 100, 101, 102, 103]
+    assert [row[4] for row in rows] == [0, 0.001, 0.002, 0.003, 0.004]
+    assert len(cursors) == 3 and cursors[-1] is None
+    assert all(len(row) == 6 for row in rows)
+
+
+def test_full_last_page_returns_empty_next_page(client, user_id):
+    put_rows(user_id, [100, 101])
+
+    page = get_page(client, user_id, limit=2)
+    assert len(page['data']) == 2
+    assert page['next_cursor']
+
+    page = get_page(client, user_id, limit=2, cursor=page['next_cursor'])
+    assert page == dict(data=list(), next_cursor=None)
+
+
+def test_date_range_and_invalid_cursor(client, user_id):
+    put_rows(user_id, [100, 200, 300])
+
+    page = get_page(client, user_id, date_from=150, date_to=250)
+    assert [row[0] for row in page['data']] == [200]
+
+    page = get_page(client, user_id, cursor='not-a-cursor')
+    assert [row[0] for row in page['data']] == [100, 200, 300]
+
+
+def test_missing_date_range_returns_empty_page(client, user_id):
+    put_rows(user_id, [100])
+
+    response = client.get(URL, query_string=dict(user_id=user_id, date_from=0))
+    assert response.get_json() == dict(data=list(), next_cursor=None)
+
+
+def test_limit_below_one_is_clamped(client, user_id):
+    put_rows(user_id, [100, 101])
+
+    for limit in (0, -1):
+        page = get_page(client, user_id, limit=limit)
+        assert [row[0] for row in page['data']] == [100]
+        assert page['next_cursor']
+
+
+def test_top_count_below_one_is_clamped(client, user_id):
+    put_rows(user_id, [100, 101, 102])
+
+    for count in (0, -1):
+        response = client.get(URL + '/top', query_string=dict(user_id=user_id, count=count))
+        assert [row[4] for row in response.get_json()] == [0.002]
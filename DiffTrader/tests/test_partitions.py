@@ -0,0 +1,54 @@
+from DiffTrader.server import models
+from DiffTrader.server.maintenance import PartitionMaintenance
+from DiffTrader.server.settings import PartitionInfo
+
+import datetime
+
+
+class FakeShards(object):
+    """
+        shard 별 partition 이름을 information_schema 대신 들고 REORGANIZE 결과를 반영한다.
+    """
+    def __init__(self, partitions_by_shard):
+        self.partitions = [set(each) for each in partitions_by_shard]
+        self.reorganized = list()
+
+    def execute_db(self, query, value=None, custom_cursor=None, shard=0):
+        if 'information_schema' in query:
+            return [(name,) for name in sorted(self.partitions[shard])]
+        assert 'REORGANIZE PARTITION p_future' in query
+        names = [line.split()[1] for line in query.splitlines() if line.strip().startswith('PARTITION p2')]
+        self.reorganized.append((shard, names))
+        self.partitions[shard].update(names)
+        return list()
+
+
+def test_adds_missing_months_per_shard(monkeypatch):
+    shards = FakeShards([
+        {'p202609', 'p202610', 'p202611', 'p_future'},
+        {'p202610', 'p202611', 'p202612', 'p202701', 'p_future'},
+    ])
+    monkeypatch.setattr(models, 'execute_db', shards.execute_db)
+    monkeypatch.setattr(models, 'SHARD_COUNT', 2)
+    monkeypatch.setattr(PartitionInfo, 'MONTHS_AFTER', 3)
+
+    now = datetime.datetime(2026, 10, 19)
+    added = models.ExpectedProfitQueries.add_expected_profit_partitions(now)
+
+    assert added == [['p202612', 'p202701'], list()]
+    assert shards.reorganized == [(0, ['p202612', 'p202701'])]
+
+    # 다음 달이 되면 한 달씩 더 만든다.
+    added = models.ExpectedProfitQueries.add_expected_profit_partitions(datetime.datetime(2026, 11, 1))
+    assert added == [['p202702'], ['p202702']]
+
+    assert models.ExpectedProfitQueries.add_expected_profit_partitions(datetime.datetime(2026, 11, 2)) == \
+        [list(), list()]
+
+
+def test_maintenance_survives_failure(monkeypatch):
+    def fail():
+        raise RuntimeError('db down')
+
+    monkeypatch.setattr('DiffTrader.server.maintenance.ExpectedProfitQueries.add_expected_profit_partitions', fail)
+    assert PartitionMaintenance(60).run_once() is None
@@ -0,0 +1,88 @@
+from DiffTrader.server.buffer import write_buffer
+from DiffTrader.server.cache import ResponseCache
+from DiffTrader.server.storage import ExpectedProfitQueries
+
+from flask import Flask
+
+URL = '/v0/trade/expect-profit'
+
+
+def query(user_id):
+    return dict(user_id=user_id, date_from=0, date_to=1000)
+
+
+def put_row(user_id, trade_date):
+    ExpectedProfitQueries.put_expected_profit_table_many([
+        [user_id, trade_date, 'BTC_XRP', 'binance', 'bithumb', 0.001, 0.1]
+    ])
+
+
+def test_etag_returns_not_modified(client, user_id):
+    put_row(user_id, 100)
+
+    first = client.get(URL, query_string=query(user_id))
+    etag = first.headers['ETag']
+    assert first.status_code == 200
+
+    second = client.get(URL, query_string=query(user_id), headers={'If-None-Match': etag})
+    assert second.status_code == 304
+    assert second.headers['ETag'] == etag
+    assert not second.data
+
+    other = client.get(URL, query_string=query(user_id), headers={'If-None-Match': '"other"'})
+    assert other.status_code == 200
+    assert other.get_json() == first.get_json()
+
+
+def test_buffer_flush_invalidates_etag(client, user_id):
+    put_row(user_id, 100)
+    etag = client.get(URL, query_string=query(user_id)).headers['ETag']
+
+    response = client.put(URL, query_string=dict(
+        user_id=user_id, trade_date=200, symbol='BTC_ETH', primary_exchange='upbit',
+        secondary_exchange='bithumb', profit_btc=0.002, profit_percent=0.2
+    ))
+    assert response.get_json() is True
+    write_buffer.flush()
+
+    response = client.get(URL, query_string=query(user_id), headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert [row[0] for row in response.get_json()['data']] == [100, 200]
+
+
+def test_invalidate_during_load_is_not_cached():
+    cache = ResponseCache(max_entries=10)
+    app = Flask(__name__)
+    loads = list()
+
+    def stale_loader():
+        # loader가 DB를 읽는 사이 flush가 끝나 invalidate 된 경우
+        loads.append('stale')
+        cache.invalidate('user', 'expected_profit')
+        return ['stale']
+
+    with app.test_request_context('/?user_id=user'):
+        assert cache.response('expected_profit', 'user', stale_loader)[0] == ['stale']
+        assert cache.get_metrics()['stale_skips'] == 1
+
+        assert cache.response('expected_profit', 'user', lambda: ['fresh'])[0] == ['fresh']
+        assert cache.response('expected_profit', 'user', lambda: ['unused'])[0] == ['fresh']
+
+    assert cache.get_metrics()['hits'] == 1
+
+
+def test_lru_eviction_and_namespace_invalidate():
+    cache = ResponseCache(max_entries=2)
+    cache.set(('a', 'user', ()), [1])
+    cache.set(('b', 'user', ()), [2])
+    cache.get(('a', 'user', ()))
+    cache.set(('c', 'user', ()), [3])
+
+    assert cache.get(('b', 'user', ())) is None
+    assert cache.get(('a', 'user', ())) is not None
+    assert cache.get_metrics()['evictions'] == 1
+
+    cache.invalidate('user', 'a')
+    assert cache.get(('a', 'user', ())) is None
+    assert cache.get(('c', 'user', ())) is not None
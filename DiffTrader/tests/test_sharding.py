@@ -0,0 +1,88 @@
+from DiffTrader.server.sharding import shard_of, split_by_shard, scatter, merge_rollup_rows, merge_top_rows
+from DiffTrader.server.storage import ExpectedProfitQueries
+
+import pytest
+
+# 2001-09-09 01:46:40 UTC, 다른 test의 row와 겹치지 않는 날짜
+BASE_DATE = 1000000000
+
+
+def test_shard_of_is_stable():
+    assert shard_of('user', 1) == 0
+    assert shard_of('user', 4) == shard_of('user', 4)
+    assert {shard_of('user-{}'.format(index), 4) for index in range(100)} == {0, 1, 2, 3}
+
+
+def test_split_by_shard_keeps_row_order():
+    rows = [['user-{}'.format(index % 5), index] for index in range(20)]
+    rows_by_shard = split_by_shard(rows, 3)
+
+    assert sorted(row for rows in rows_by_shard.values() for row in rows) == sorted(rows)
+    for shard, shard_rows in rows_by_shard.items():
+        assert all(shard_of(row[0], 3) == shard for row in shard_rows)
+        assert [row[1] for row in shard_rows] == sorted(row[1] for row in shard_rows)
+
+
+def test_scatter_returns_shard_order():
+    assert scatter(lambda shard: shard * 10, 4) == [0, 10, 20, 30]
+
+
+def test_merge_rollup_rows_weights_average_by_count():
+    shard_results = [
+        [[20260101, 'BTC_XRP', 1.0, 2, 0.4], [20260102, 'BTC_ETH', 0.5, 1, 0.3]],
+        [[20260101, 'BTC_XRP', 2.0, 3, 0.9], [20260101, 'BTC_EOS', None, None, None]],
+    ]
+
+    assert merge_rollup_rows(shard_results, key_size=2) == [
+        [20260101, 'BTC_XRP', 3.0, 5, pytest.approx(0.26)],
+        [20260102, 'BTC_ETH', 0.5, 1, pytest.approx(0.3)],
+    ]
+
+
+def test_merge_rollup_rows_without_group():
+    shard_results = [[[1.5, 3, 0.6]], [[None, None, None]], [[0.5, 1, 0.2]]]
+
+    assert merge_rollup_rows(shard_results, key_size=0) == [[2.0, 4, pytest.approx(0.2)]]
+
+
+def test_merge_top_rows():
+    shard_results = [
+        [['a', 0.5], ['b', 0.1]],
+        [['c', 0.9], ['d', 0.3]],
+    ]
+
+    assert merge_top_rows(shard_results, 3, sort_index=1) == [['c', 0.9], ['a', 0.5], ['d', 0.3]]
+
+
+def test_all_users_aggregates_across_shards(client):
+    user_ids = ['shard-user-{}'.format(index) for index in range(8)]
+    assert len({shard_of(user_id, 2) for user_id in user_ids}) == 2
+
+    ExpectedProfitQueries.put_expected_profit_table_many([
+        [user_id, BASE_DATE + index, 'BTC_XRP', 'binance', 'bithumb', 0.001 * (index + 1), 0.1]
+        for index, user_id in enumerate(user_ids)
+    ])
+    query = dict(date_from=BASE_DATE - 1, date_to=BASE_DATE + 100)
+
+    rollup = client.get('/v0/admin/expect-profit/rollup', query_string=query).get_json()
+    assert len(rollup) == 1
+    total_profit_btc, trade_count, avg_profit_percent = rollup[0]
+    assert total_profit_btc == pytest.approx(0.036)
+    assert trade_count == 8
+    assert avg_profit_percent == pytest.approx(0.1)
+
+    top = client.get('/v0/admin/expect-profit/top', query_string=dict(query, count=3)).get_json()
+    assert [row[0] for row in top] == ['shard-user-7', 'shard-user-6', 'shard-user-5']
+
+
+def test_all_users_top_count_below_one_is_clamped(client):
+    user_ids = ['clamp-user-{}'.format(index) for index in range(4)]
+    ExpectedProfitQueries.put_expected_profit_table_many([
+        [user_id, BASE_DATE + 500 + index, 'BTC_XRP', 'binance', 'bithumb', 0.001 * (index + 1), 0.1]
+        for index, user_id in enumerate(user_ids)
+    ])
+    query = dict(date_from=BASE_DATE + 500, date_to=BASE_DATE + 600)
+
+    for count in (0, -1):
+        top = client.get('/v0/admin/expect-profit/top', query_string=dict(query, count=count)).get_json()
+        assert [row[0] for row in top] == ['clamp-user-3']
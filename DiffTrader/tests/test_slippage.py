@@ -0,0 +1,56 @@
+from DiffTrader.server.slippage import slippage_analytics
+from DiffTrader.server.storage import SlippageDataQueries
+
+import json
+
+URL = '/v0/trade/slippage-analytics'
+
+ORDERBOOK = json.dumps(dict(asks=[[100, 1], [101, 1], [110, 5]], bids=[[99, 1]]))
+
+
+def put_trades(user_id, count=3):
+    SlippageDataQueries.put_slippage_data_many([
+        [user_id, 'XRP', 'BTC', 'binance', ORDERBOOK, json.dumps([[100.5, 1.5]]),
+         'primary_to_secondary', index, index]
+        for index in range(count)
+    ])
+
+
+def get_analytics(client, user_id, **params):
+    params = dict(dict(user_id=user_id, symbol='BTC_XRP', exchange='binance'), **params)
+    response = client.get(URL, query_string=params)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_sizing_uses_request_target_bps(client, user_id):
+    put_trades(user_id)
+
+    result = get_analytics(client, user_id, target_bps=10)
+    assert result['trade_count'] == 3
+    assert result['sizing'] == dict(side='buy', target_bps=10, max_size=1.0)
+
+    # 같은 cache 결과로 target_bps 만 다시 계산한다.
+    result = get_analytics(client, user_id, target_bps=100)
+    assert result['sizing'] == dict(side='buy', target_bps=100, max_size=2.0)
+
+
+def test_cache_key_ignores_target_bps(client, user_id):
+    put_trades(user_id)
+
+    for target_bps in range(1, 20):
+        get_analytics(client, user_id, target_bps=target_bps)
+
+    keys = [key for key in slippage_analytics._cache if key[0] == user_id]
+    assert keys == [(user_id, 'BTC_XRP', 'binance')]
+
+
+def test_invalid_symbol_returns_empty(client, user_id):
+    put_trades(user_id)
+
+    assert get_analytics(client, user_id, symbol='BTC_XRP_X') == dict()
+    assert get_analytics(client, user_id, symbol='BTCXRP') == dict()
+
+
+def test_no_trades(client, user_id):
+    assert get_analytics(client, user_id) == dict(trade_count=0)
@@ -0,0 +1,29 @@
+from DiffTrader.trading.apis import get_expected_profit
+
+import queue
+
+
+def test_get_expected_profit_follows_next_cursor():
+    data_receive_queue = queue.Queue()
+    results = list()
+    get_expected_profit('user', data_receive_queue, results.append)
+
+    pages = [
+        dict(data=[[1684985593, 'BTC_XRP', 'binance', 'bithumb', 0.001, 0.1]], next_cursor='1684985593:1'),
+        dict(data=[[1684975593, 'BTC_ETH', 'upbit', 'bithumb', 0.005, 0.2]], next_cursor=None),
+    ]
+    parameters = list()
+    for page in pages:
+        _, _, information_dict = data_receive_queue.get_nowait()
+        parameters.append(information_dict['parameter'])
+        information_dict['callback'](page)
+
+    assert data_receive_queue.empty()
+    assert 'cursor' not in parameters[0]
+    assert parameters[1]['cursor'] == '1684985593:1'
+    assert {'date_from', 'date_to'} <= set(parameters[0])
+
+    assert len(results) == 1
+    assert [row[1] for row in results[0]] == ['BTC_XRP', 'BTC_ETH']
+    # trade_date는 화면 표시용 문자열로 바뀐다.
+    assert all(isinstance(row[0], str) for row in results[0])
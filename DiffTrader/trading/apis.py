@@ -1,4 +1,4 @@
-from DiffTrader.trading.settings import SAI_URL, PROFIT_SAI_URL, \
+from DiffTrader.trading.settings import SAI_URL, PROFIT_SAI_URL, TOP_PROFIT_SAI_URL, PROFIT_ROLLUP_SAI_URL, \
     SAVE_DATA_URL, LOAD_DATA_URL, MethodType
 
 import requests
@@ -7,32 +7,101 @@ import time
 from datetime import datetime
 
 
+def format_profit_rows(result):
+    """
+        expected_profit rows의 trade_date(epoch)를 화면 표시용 문자열로 변환한다.
+    """
+    if result:
+        result = copy.deepcopy(result)
+        for date_ in result:
+            profit_date = datetime.fromtimestamp(date_[0]).strftime(
+                '%Y{} %m{} %d{} %H{} %M{}').format('년', '월', '일', '시', '분')
+            date_[0] = profit_date
+
+    return result if result else list()
+
+
 def get_expected_profit(user_id, data_receive_queue, after_process=None):
     """
         Get expected_profit from saiblockchain api server.
+        server는 keyset page 단위로 반환하므로 next_cursor가 없을 때까지 이어서 요청하고,
+        모든 page를 받은 후 after_process를 한번 호출한다.
     """
+    now_date = time.time()
+    yesterday = now_date - 24 * 60 * 60
+    rows = list()
+
+    def request_page(cursor=None):
+        parameter = {'user_id': user_id, 'date_from': yesterday, 'date_to': now_date}
+        if cursor:
+            parameter['cursor'] = cursor
+
+        information_dict = {
+            'parameter': parameter,
+            'callback': callback
+        }
+        data_receive_queue.put((PROFIT_SAI_URL, MethodType.GET, information_dict))
+
     def callback(result):
-        if result:
-            result = copy.deepcopy(result)
-            for date_ in result:
-                profit_date = datetime.fromtimestamp(date_[0]).strftime(
-                    '%Y{} %m{} %d{} %H{} %M{}').format('년', '월', '일', '시', '분')
-                date_[0] = profit_date
+        result = result or dict()
+        rows.extend(result.get('data', list()))
 
-        return result if result else list()
+        next_cursor = result.get('next_cursor')
+        if next_cursor:
+            request_page(next_cursor)
+        elif after_process:
+            after_process(format_profit_rows(rows))
+
+    request_page()
+
+    return list()
+
+
+def get_top_profits(user_id, data_receive_queue, after_process=None, count=10):
+    """
+        Get top N expected_profit of last 24 hours by profit_btc, sorted by server.
+    """
+    def callback(result):
+        return format_profit_rows(result)
 
     now_date = time.time()
     yesterday = now_date - 24 * 60 * 60
 
     information_dict = {
-        'parameter': {'user_id': user_id, 'from': yesterday, 'to': now_date},
+        'parameter': {'user_id': user_id, 'count': count, 'date_from': yesterday, 'date_to': now_date},
         'after_process': after_process,
         'callback': callback
     }
 
-    data_receive_queue.put((PROFIT_SAI_URL, MethodType.GET, information_dict))
+    data_receive_queue.put((TOP_PROFIT_SAI_URL, MethodType.GET, information_dict))
+
+
+def get_profit_rollup(user_id, data_receive_queue, after_process=None):
+    """
+        Get total profit_btc, trade count and average profit percent of last 24 hours from server rollup.
+    """
+    def callback(result):
+        if not result:
+            return dict()
+
+        total_profit_btc, trade_count, avg_profit_percent = result[0]
+        return dict(
+            total_profit_btc=total_profit_btc or 0,
+            trade_count=trade_count or 0,
+            avg_profit_percent=avg_profit_percent or 0
+        )
+
+    now_date = time.time()
+    yesterday = now_date - 24 * 60 * 60
+
+    information_dict = {
+        'parameter': {'user_id': user_id, 'date_from': yesterday, 'date_to': now_date},
+        'after_process': after_process,
+        'callback': callback
+    }
+
+    data_receive_queue.put((PROFIT_ROLLUP_SAI_URL, MethodType.GET, information_dict))
 
-    return list()
 
 def send_expected_profit(profit_object, data_receive_queue, after_process=None):
     information_dict = {'parameter': profit_object.information}
@@ -11,9 +11,25 @@ def profit_table_mock():
     profit_btc,
     profit_percent
     """
-    return [[1684985593, 'BTC_XRP', 'binance', 'bithumb', 0.001, 0.1],
-            [1684975593, 'BTC_ETH', 'upbit', 'bithumb', 0.005, 0.2],
-            [1684965593, 'BTC_EOS', 'upbit', 'binance', 0.007, 0.3]]
+    return dict(
+        data=[[1684985593, 'BTC_XRP', 'binance', 'bithumb', 0.001, 0.1],
+              [1684975593, 'BTC_ETH', 'upbit', 'bithumb', 0.005, 0.2],
+              [1684965593, 'BTC_EOS', 'upbit', 'binance', 0.007, 0.3]],
+        next_cursor=None
+    )
+
+
+def top_profit_mock():
+    return sorted(profit_table_mock()['data'], key=lambda x: x[4], reverse=True)
+
+
+def profit_rollup_mock():
+    """
+    total_profit_btc,
+    trade_count,
+    avg_profit_percent
+    """
+    return [[0.013, 3, 0.2]]
 
 
 def profit_setting_mock():
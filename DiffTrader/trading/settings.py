@@ -1,6 +1,9 @@
 TAG_COINS = ['XRP', 'XMR']
 SAI_URL = 'http://www.saiblockchain.com/api/pft_data'
 PROFIT_SAI_URL = 'http://saiblockchain.com/api/expected_profit'
+TOP_PROFIT_SAI_URL = 'http://saiblockchain.com/api/expected_profit/top'
+PROFIT_ROLLUP_SAI_URL = 'http://saiblockchain.com/api/expected_profit/rollup'
+PROFIT_STREAM_SAI_URL = 'http://saiblockchain.com/api/expected_profit/stream'
 
 SAVE_DATA_URL = 'http://songsb13.cafe24.com:8081/save_data'
 LOAD_DATA_URL = 'http://songsb13.cafe24.com:8081/get_data'
@@ -1,9 +1,9 @@
 from DiffTrader.settings import DEBUG
 from Util.pyinstaller_patch import debugger
-from DiffTrader.trading.settings import SAI_URL, PROFIT_SAI_URL, \
+from DiffTrader.trading.settings import SAI_URL, PROFIT_SAI_URL, TOP_PROFIT_SAI_URL, PROFIT_ROLLUP_SAI_URL, \
     SAVE_DATA_URL, LOAD_DATA_URL, MethodType
 
-from DiffTrader.trading.mockup import profit_table_mock, profit_setting_mock
+from DiffTrader.trading.mockup import profit_table_mock, profit_setting_mock, top_profit_mock, profit_rollup_mock
 
 import threading
 import requests
@@ -27,7 +27,7 @@ class SenderThread(threading.Thread):
                 
                 if not DEBUG:
                     if method == MethodType.GET:
-                        rq = requests.get(url, json=parameter)
+                        rq = requests.get(url, params=parameter)
                     elif method == MethodType.POST:
                         rq = requests.post(url, data=parameter)
                     else:
@@ -37,6 +37,10 @@ class SenderThread(threading.Thread):
                 else:
                     if url == PROFIT_SAI_URL:
                         result = profit_table_mock()
+                    elif url == TOP_PROFIT_SAI_URL:
+                        result = top_profit_mock()
+                    elif url == PROFIT_ROLLUP_SAI_URL:
+                        result = profit_rollup_mock()
                     elif url == LOAD_DATA_URL:
                         result = profit_setting_mock()
                     else:
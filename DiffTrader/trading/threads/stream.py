@@ -0,0 +1,72 @@
+from DiffTrader.settings import DEBUG
+from Util.pyinstaller_patch import debugger
+from DiffTrader.trading.settings import PROFIT_STREAM_SAI_URL
+
+from PyQt5.QtCore import pyqtSignal, QThread
+
+import threading
+import requests
+import json
+import time
+
+
+class ProfitStreamThread(QThread):
+    """
+        expected_profit push stream(SSE) 구독 thread
+        server에서 신규 row가 들어오면 rows_signal(list of rows)을 emit 하며,
+        table 갱신은 GUI thread의 slot에서 한다.
+        연결이 끊기면 마지막 event id부터 이어받는다.
+    """
+    rows_signal = pyqtSignal(list)
+
+    def __init__(self, user_id):
+        super(ProfitStreamThread, self).__init__()
+        self._user_id = user_id
+        self._last_event_id = None
+        self._retry_seconds = 3
+        self._stopped = threading.Event()
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self):
+        if DEBUG:
+            return
+
+        while not self._stopped.is_set():
+            try:
+                self._subscribe()
+            except Exception as ex:
+                debugger.debug(ex)
+            time.sleep(self._retry_seconds)
+
+    def _subscribe(self):
+        headers = {'Accept': 'text/event-stream'}
+        if self._last_event_id is not None:
+            headers['Last-Event-ID'] = self._last_event_id
+
+        with requests.get(PROFIT_STREAM_SAI_URL, params={'user_id': self._user_id},
+                          headers=headers, stream=True, timeout=(10, 60)) as rq:
+            event_id, data_lines = None, list()
+            for line in rq.iter_lines(decode_unicode=True):
+                if self._stopped.is_set():
+                    return
+                if line is None or line.startswith(':'):
+                    continue
+                elif line == '':
+                    # 빈 줄에서 event 하나가 끝난다.
+                    if data_lines:
+                        self.rows_signal.emit(json.loads('\n'.join(data_lines)))
+                    if event_id is not None:
+                        self._last_event_id = event_id
+                    event_id, data_lines = None, list()
+                    continue
+
+                field, _, value = line.partition(':')
+                value = value[1:] if value.startswith(' ') else value
+                if field == 'id':
+                    event_id = value
+                elif field == 'data':
+                    data_lines.append(value)
+                elif field == 'retry' and value.isdigit():
+                    self._retry_seconds = int(value) / 1000
@@ -2,12 +2,14 @@ from PyQt5 import (QtWidgets, QtCore)
 
 from DiffTrader.paths import ProgramSettingWidgets
 from DiffTrader.trading.apis import (save_total_data_to_database, load_total_data_to_database,
-                                     get_expected_profit)
+                                     get_expected_profit, get_top_profits, get_profit_rollup,
+                                     format_profit_rows)
 from DiffTrader.trading.settings import AVAILABLE_EXCHANGES, ENABLE_SETTING, UNABLE_SETTING
 from DiffTrader.trading.widgets.dialogs import SettingEncryptKeyDialog, LoadSettingsDialog
 from DiffTrader.trading.widgets.utils import base_item_setter, number_type_converter
 from DiffTrader.trading.threads.trade_thread import TradeThread
 from DiffTrader.trading.threads.sender import SenderThread
+from DiffTrader.trading.threads.stream import ProfitStreamThread
 from DiffTrader.messages import QMessageBoxMessage as Msg
 from DiffTrader.settings import DEBUG
 
@@ -65,10 +67,16 @@ class DiffTraderGUI(QtWidgets.QMainWindow, ProgramSettingWidgets.DIFF_TRADER_WID
         self._exchange_setting_tab = self.ExchangeSettingTab(self)
         self._program_setting_tab = self.ProgramSettingTab(self)
 
+        # stream thread에서 받은 rows는 signal로 GUI thread에 넘겨 table을 갱신한다.
+        self._main_tab.profit_stream_thread.rows_signal.connect(
+            self._main_tab.append_trade_objects, QtCore.Qt.QueuedConnection
+        )
+
         self.stopTradeBtn.setEnabled(False)
 
     def closeEvent(self, *args, **kwargs):
         close_program(self.user_id)
+        self._main_tab.profit_stream_thread.stop()
         self.top_profit_thread.exit()
         self.closed.emit()
     
@@ -177,6 +185,7 @@ class DiffTraderGUI(QtWidgets.QMainWindow, ProgramSettingWidgets.DIFF_TRADER_WID
 
             # define table variables
             self.trade_object_set = set()
+            self.profit_stream_thread = ProfitStreamThread(self._user_id)
 
             # exchange select bar settings
             self._diff_gui.primaryExchange.addItems(AVAILABLE_EXCHANGES)
@@ -193,7 +202,12 @@ class DiffTraderGUI(QtWidgets.QMainWindow, ProgramSettingWidgets.DIFF_TRADER_WID
 
         def initiation_for_set_table(self):
             self.set_all_trade_history()
+            self.set_profit_summary()
             self.top_ten_by_profits()
+
+            # 최초 24시간 데이터 이후로는 server push로 신규 row만 받는다.
+            if not self.profit_stream_thread.isRunning():
+                self.profit_stream_thread.start()
         
         def same_exchange_checker(self, exchange_combobox):
             """
@@ -232,15 +246,20 @@ class DiffTraderGUI(QtWidgets.QMainWindow, ProgramSettingWidgets.DIFF_TRADER_WID
                 trade_object.profit_percent,
             ]
             row_count = self._diff_gui.tradeHistoryView.rowCount()
+            self._diff_gui.tradeHistoryView.insertRow(row_count)
             base_item_setter(row_count, self._diff_gui.tradeHistoryView, item_list)
 
-            btc_total = [each.profit_btc for each in self.trade_object_set]
-            percent_total = [each.profit_percent for each in self.trade_object_set]
-            
-            total_profit_btc = sum(btc_total)
-            total_profit_percent = sum(percent_total) / len(percent_total)
-            self._diff_gui.profitBTC.setText(total_profit_btc)
-            self._diff_gui.profitPercent.setText(total_profit_percent)
+        def set_profit_summary(self):
+            """
+                It is profitBTC, profitPercent setter by server-side rollup of last 24 hours.
+            """
+            def after_process(result_dict):
+                if not result_dict:
+                    return
+                self._diff_gui.profitBTC.setText(str(result_dict['total_profit_btc']))
+                self._diff_gui.profitPercent.setText(str(result_dict['avg_profit_percent']))
+
+            get_profit_rollup(self._user_id, self._diff_gui.data_receive_queue, after_process)
 
         def set_all_trade_history(self):
             """
@@ -271,6 +290,24 @@ class DiffTraderGUI(QtWidgets.QMainWindow, ProgramSettingWidgets.DIFF_TRADER_WID
             self.trade_object_set.add(trade_object)
 
             self.set_trade_history(trade_object)
+            self.set_profit_summary()
+            self.top_ten_by_profits()
+
+        def append_trade_objects(self, result_data_list):
+            """
+                It is ProfitStreamThread.rows_signal slot, appending only newly pushed rows from server.
+                It runs on the GUI thread.
+
+                Args:
+                    result_data_list: list of [trade_date, symbol, primary_exchange, secondary_exchange,
+                                               profit_btc, profit_percent]
+            """
+            for data_list in format_profit_rows(result_data_list):
+                trade_object = TradeObject(*data_list)
+                self.trade_object_set.add(trade_object)
+                self.set_trade_history(trade_object)
+
+            self.set_profit_summary()
             self.top_ten_by_profits()
 
         def set_trade_object_set_from_server(self):
@@ -297,23 +334,15 @@ class DiffTraderGUI(QtWidgets.QMainWindow, ProgramSettingWidgets.DIFF_TRADER_WID
         def top_ten_by_profits(self):
             """
                 It is profitRankView setter when trading is done and received its data.
+                top 10 is sorted by server, only 10 rows are received.
             """
-            sorted_objects = sorted(self.trade_object_set, key=lambda x: x.profit_btc, reverse=True)
-            
-            row_count = self._diff_gui.profitRankView.rowCount()
+            def after_process(result_data_list):
+                self._diff_gui.profitRankView.setRowCount(0)
+                for row_count, item_list in enumerate(result_data_list):
+                    self._diff_gui.profitRankView.insertRow(row_count)
+                    base_item_setter(row_count, self._diff_gui.profitRankView, item_list)
 
-            for trade_object in sorted_objects:
-                item_list = [
-                    trade_object.trade_date,
-                    trade_object.symbol,
-                    trade_object.primary_exchange,
-                    trade_object.secondary_exchange,
-                    trade_object.profit_btc,
-                    trade_object.profit_percent,
-                ]
-                self._diff_gui.profitRankView.insertRow(row_count)
-                base_item_setter(row_count, self._diff_gui.profitRankView, item_list)
-                row_count += 1
+            get_top_profits(self._user_id, self._diff_gui.data_receive_queue, after_process)
 
         def write_logs(self, msg, level=logging.INFO):
             """
@@ -1,19 +1,79 @@
 from flask_restful import Resource
 from flask import jsonify, request
-from bs4 import BeautifulSoup
-from KiwoomHighChart.query import GetQueries, PutQueries, TableQueries, DeleteQueries
-from KiwoomHighChart.config import IndicatorDict
+from KiwoomHighChart.query import GetQueries, PutQueries, TableQueries
+from KiwoomHighChart.config import IndicatorDict, StoreInfo, ScreenerInfo, ParserInfo, NameIndexInfo, \
+    ResampleInfo
+from KiwoomHighChart.cache import candle_cache
+from KiwoomHighChart.store import candle_store
+from KiwoomHighChart.indicators import indicator_engine, parse_indicators, to_json_list
+from KiwoomHighChart.screener import indicator_matrix
+from KiwoomHighChart.parser import parse_indicator_html, parse_many
+from KiwoomHighChart.names import stock_names
+from KiwoomHighChart.resample import INTERVALS, downsample
 
-import datetime
-import re
+import numpy as np
+
+
+MAX_CANDLE_DATE = 2 ** 62
+
+
+def unknown_stock(stock_kor):
+    return dict(
+        success=False,
+        data=str(),
+        message='Unknown stock kor name, [{}]'.format(stock_kor)
+    )
 
 
 class GetDailyCandle(Resource):
     def get(self):
+        """
+            format: rows(기본, [[candle_date, open, high, low, close], ...]), columnar(t, o, h, l, c 배열)
+            from, to: candle_date(ms) 범위, limit: 범위 내 최근 limit개, columnar에서 사용
+            with_indicator: columnar에 indicator 포함 여부
+            Accept: application/x-msgpack 이면 msgpack(설치된 경우), Accept-Encoding: gzip 이면 압축한다.
+        """
         args = request.args
         stock_kor = args.get('stock_kor')
-        candle_query_data = GetQueries.daily_candle_by_stock_kor(stock_kor)
-        indicator_query_data = GetQueries.stock_indicator_by_stock_kor(stock_kor)
+        if args.get('format') == 'columnar':
+            return candle_cache.response(stock_kor, lambda: self.columnar_payload(stock_kor, args),
+                                         with_indicator=bool(args.get('with_indicator', 0, type=int)))
+        return candle_cache.response(stock_kor, lambda: self.rows_payload(stock_kor), with_indicator=True)
+
+    @staticmethod
+    def store_slice(stock_code, date_from=None, date_to=None, limit=None):
+        """
+            Return:
+                candle store의 (5, n) view, store를 쓰지 않거나 종목이 없으면 None
+        """
+        if not StoreInfo.ENABLED or stock_code is None:
+            return None
+        return candle_store.slice(stock_code, date_from, date_to, limit)
+
+    @staticmethod
+    def candle_array(stock_code, date_from=0, date_to=MAX_CANDLE_DATE):
+        """
+            Return:
+                candle_date 범위의 shape (5, n) int64 배열, store에 없으면 DB에서 읽는다.
+        """
+        view = GetDailyCandle.store_slice(stock_code, date_from, date_to)
+        if view is not None:
+            return view
+        rows = GetQueries.daily_candle_range_by_stock_code(stock_code, date_from, date_to, MAX_CANDLE_DATE)
+        return np.array(rows, dtype=np.int64).reshape(-1, 5).T
+
+    @staticmethod
+    def rows_payload(stock_kor):
+        stock_code = stock_names.code_by_kor(stock_kor)
+        if stock_code is None:
+            return unknown_stock(stock_kor)
+
+        view = GetDailyCandle.store_slice(stock_code)
+        if view is not None:
+            candle_query_data = view.T.tolist()
+        else:
+            candle_query_data = GetQueries.daily_candle_by_stock_code(stock_code)
+        indicator_query_data = GetQueries.stock_indicator_by_stock_code(stock_code)
         if candle_query_data and indicator_query_data:
             candle_query_data = list(candle_query_data)
             indicator_query_data = list(indicator_query_data)
@@ -31,14 +91,161 @@ class GetDailyCandle(Resource):
                 data='',
                 message='Fail to get daily candle by code, [{}]'.format(stock_kor)
             )
+
+    @staticmethod
+    def columnar_payload(stock_kor, args):
+        date_from = args.get('from', 0, type=int)
+        date_to = args.get('to', MAX_CANDLE_DATE, type=int)
+        limit = args.get('limit', MAX_CANDLE_DATE, type=int)
+
+        stock_code = stock_names.code_by_kor(stock_kor)
+        if stock_code is None:
+            return unknown_stock(stock_kor)
+
+        view = GetDailyCandle.store_slice(stock_code, date_from, date_to, limit)
+        if view is not None:
+            t, o, h, l, c = (column.tolist() for column in view)
+        else:
+            rows = GetQueries.daily_candle_range_by_stock_code(stock_code, date_from, date_to, limit)
+            t, o, h, l, c = (list(column) for column in zip(*rows)) if rows else (list(), ) * 5
+
+        if not t:
+            return dict(
+                success=False,
+                data='',
+                message='Fail to get daily candle by code, [{}]'.format(stock_kor)
+            )
+
+        data = dict(t=t, o=o, h=h, l=l, c=c)
+        if args.get('with_indicator', 0, type=int):
+            data['indicator'] = [list(each) for each in GetQueries.stock_indicator_by_stock_code(stock_code)]
+
+        return dict(
+            success=True,
+            data=data,
+            message=str()
+        )
     
 
+class GetCandleIndicators(Resource):
+    def get(self):
+        """
+            indicators: 'sma:20,ema:12,rsi:14,bb:20:2'
+            from, to, limit: 반환할 구간, GetDailyCandle columnar와 같다.
+            data: t와 지표별 {series name: 배열}, 값이 없는 구간은 null
+        """
+        args = request.args
+        stock_kor = args.get('stock_kor')
+        try:
+            specs = parse_indicators(args.get('indicators', str()))
+        except ValueError as ex:
+            return dict(
+                success=False,
+                data=str(),
+                message=str(ex)
+            )
+
+        return candle_cache.response(stock_kor, lambda: self.payload(stock_kor, specs, args))
+
+    @staticmethod
+    def payload(stock_kor, specs, args):
+        stock_code = stock_names.code_by_kor(stock_kor)
+        if stock_code is None:
+            return unknown_stock(stock_kor)
+
+        view = GetDailyCandle.store_slice(stock_code)
+        if view is not None:
+            t, close = view[0], view[4]
+        else:
+            rows = GetQueries.daily_candle_by_stock_code(stock_code)
+            t = np.array([row[0] for row in rows], dtype=np.int64)
+            close = np.array([row[4] for row in rows], dtype=np.float64)
+
+        if not len(t):
+            return dict(
+                success=False,
+                data=str(),
+                message='Fail to get daily candle by code, [{}]'.format(stock_kor)
+            )
+
+        results = indicator_engine.compute(stock_kor, candle_cache.watermark(stock_kor), close, specs)
+
+        start = int(np.searchsorted(t, args.get('from', 0, type=int), side='left'))
+        end = int(np.searchsorted(t, args.get('to', MAX_CANDLE_DATE, type=int), side='right'))
+        limit = args.get('limit', None, type=int)
+        if limit is not None:
+            start = max(start, end - limit)
+
+        data = dict(t=t[start:end].tolist())
+        for key, result in results.items():
+            data[key] = {name: to_json_list(series[start:end]) for name, series in result.items()}
+
+        return dict(
+            success=True,
+            data=data,
+            message=str()
+        )
+
+
+class GetResampledCandle(Resource):
+    def get(self):
+        """
+            interval: week, month(기간 OHLC), lttb(종가 모양을 유지하는 points개의 일봉)
+            points: lttb 목표 점 수
+            from, to: 대상 candle_date(ms) 범위
+            data: GetDailyCandle columnar와 같은 t, o, h, l, c 배열과 원본 일봉 수 n
+        """
+        args = request.args
+        stock_kor = args.get('stock_kor')
+        interval = args.get('interval')
+        points = args.get('points', ResampleInfo.DEFAULT_POINTS, type=int)
+        if interval not in INTERVALS:
+            return dict(
+                success=False,
+                data=str(),
+                message='interval should be one of {}'.format(', '.join(INTERVALS))
+            )
+        if not 3 <= points <= ResampleInfo.MAX_POINTS:
+            return dict(
+                success=False,
+                data=str(),
+                message='points should be 3 ~ {}'.format(ResampleInfo.MAX_POINTS)
+            )
+
+        return candle_cache.response(stock_kor, lambda: self.payload(stock_kor, interval, points, args))
+
+    @staticmethod
+    def payload(stock_kor, interval, points, args):
+        stock_code = stock_names.code_by_kor(stock_kor)
+        if stock_code is None:
+            return unknown_stock(stock_kor)
+
+        data = GetDailyCandle.candle_array(
+            stock_code, args.get('from', 0, type=int), args.get('to', MAX_CANDLE_DATE, type=int))
+        if not data.shape[1]:
+            return dict(
+                success=False,
+                data=str(),
+                message='Fail to get daily candle by code, [{}]'.format(stock_kor)
+            )
+
+        t, o, h, l, c = (column.tolist() for column in downsample(data, interval, points))
+        return dict(
+            success=True,
+            data=dict(t=t, o=o, h=h, l=l, c=c, n=int(data.shape[1])),
+            message=str()
+        )
+
+
 class GetStockIndicators(Resource):
     def get(self):
         args = request.args
         stock_kor = args.get('stock_kor')
+        stock_code = stock_names.code_by_kor(stock_kor)
+        if stock_code is None:
+            return unknown_stock(stock_kor)
         
-        query_data = GetQueries.stock_indicator_by_stock_kor(stock_kor)
+        query_data = GetQueries.stock_indicator_by_stock_code(stock_code)
         if query_data:
             query_data = list(query_data)
             return dict(
@@ -54,6 +261,76 @@ class GetStockIndicators(Resource):
             )
     
 
+class SearchStockNames(Resource):
+    def get(self):
+        """
+            종목명 자동완성, q: '삼성', 'ㅅㅅㅈㅈ', '삼성ㅈ' 처럼 prefix 또는 초성
+            data: [[stock_code, kor_name], ...], prefix 일치가 먼저 온다.
+        """
+        args = request.args
+        limit = min(max(args.get('limit', NameIndexInfo.DEFAULT_LIMIT, type=int), 1), NameIndexInfo.MAX_LIMIT)
+        return dict(
+            success=True,
+            data=[list(each) for each in stock_names.search(args.get('q', str()), limit)],
+            message=str()
+        )
+
+
+class ScreenStocks(Resource):
+    def get(self):
+        """
+            전체 종목 지표 screener
+            year: 대상 연도, 없으면 가장 최근 연도
+            filter: 'PER:0:10', 'PBR::1' 처럼 지표명:최소:최대, 여러 번 전달하면 AND
+            sort, order(asc, desc): 정렬 기준 지표, limit: 상위 n개
+            columns: 'PER,PBR,ROE' 반환할 지표, 없으면 filter와 sort에 쓰인 지표
+            data: columns와 [[stock_code, kor_name, 지표 값...], ...], total은 조건에 맞는 전체 종목 수
+        """
+        args = request.args
+        try:
+            filters = [self.parse_filter(each) for each in args.getlist('filter')]
+            limit = args.get('limit', ScreenerInfo.DEFAULT_LIMIT, type=int)
+            if not 1 <= limit <= ScreenerInfo.MAX_LIMIT:
+                raise ValueError('limit should be 1 ~ {}'.format(ScreenerInfo.MAX_LIMIT))
+            columns = args.get('columns')
+            year, columns, total, rows = indicator_matrix.screen(
+                year=args.get('year', None, type=int),
+                filters=filters,
+                sort=args.get('sort'),
+                descending=args.get('order', 'asc') == 'desc',
+                limit=limit,
+                columns=[each.strip() for each in columns.split(',') if each.strip()] if columns else None
+            )
+        except ValueError as ex:
+            return dict(
+                success=False,
+                data=str(),
+                message=str(ex)
+            )
+
+        return dict(
+            success=True,
+            data=dict(year=year, columns=['stock_code', 'kor_name'] + columns, total=total, rows=rows),
+            message=str()
+        )
+
+    @staticmethod
+    def parse_filter(text):
+        """
+            'PER:0:10' -> ('PER', 0.0, 10.0), 'PBR::1' -> ('PBR', None, 1.0)
+        """
+        name, _, bounds = text.partition(':')
+        minimum, _, maximum = bounds.partition(':')
+        try:
+            return (
+                name.strip(),
+                float(minimum) if minimum.strip() else None,
+                float(maximum) if maximum.strip() else None
+            )
+        except ValueError:
+            raise ValueError('invalid filter, [{}]'.format(text))
+
+
 class PutStockIndicators(Resource):
     def post(self):
         indicator_html = request.form.get('indicator_html')
@@ -66,8 +343,8 @@ class PutStockIndicators(Resource):
             if res:
                 return dict(
                     success=True,
-                    data=str(res),
-                    message=str()
+                    data=res['table_html'],
+                    message=self.count_message(res['counts'])
                 )
             
             else:
@@ -85,58 +362,73 @@ class PutStockIndicators(Resource):
             )
         
     def html_to_list(self, indicator):
-        soup = BeautifulSoup(indicator, 'lxml')
-        
-        tbl_ext_set = soup.findAll('table', {'class': '__se_tbl_ext'})
-        
-        if not len(tbl_ext_set) == 2:
+        result = parse_indicator_html(indicator)
+        if result is None:
             return False
-        else:
-            tr_set = tbl_ext_set[0].findAll('tr')
-            default_data = self.get_td_list(tr_set[5])
-        
-            stock_kor, year_list = list(default_data.items())[0]
-            now_year_index = year_list.index(str(datetime.datetime.now().year))
-            year_list = year_list[:now_year_index + 1]
-        
-            year_list = [each for each in year_list if int(each)]
-            indicator_dic = dict()
-        
-            for bs_tr in tr_set[15:]:
-                data = self.get_td_list(bs_tr)
-                if data is not None:
-                    indicator_dic.update(data)
-            
-            scr = dict()
-            total_value_list = list()
-            for indi_index, indicator_name in enumerate(indicator_dic):
-                value_list = indicator_dic[indicator_name]
-                scr.update({indicator_name: indi_index})
-                for n, year in enumerate(year_list):
-                    total_value_list.append([indicator_name, year, value_list[n], indi_index])
-
-            DeleteQueries.indicator(stock_kor)
-            PutQueries.indicator(total_value_list, stock_kor)
-            
-            return tbl_ext_set[1]
-            
-    def get_td_list(self, bs_tr):
-        # 0번은 PER, PBR같은 지표명
-        td_set = bs_tr.findAll('td')
-        if not td_set[0]:
-            return None
-        else:
-            indicator_name = re.search('[\w\d].+', td_set[0].text)
-            
-        if indicator_name:
-            indicator_name = indicator_name.group()
-        else:
-            return None
-        
-        list_ = list()
-        for each in td_set[1:]:
-            txt = each.text.replace(' ', '')
-            if txt == str():
-                break
-            list_.append(txt)
-        return {indicator_name: list_}
+
+        result['counts'] = self.save(result['stock_kor'], result['value_list'])
+        return result
+
+    @staticmethod
+    def save(stock_kor, value_list):
+        """
+            저장된 값과 다른 row만 쓴다, 바뀐 row가 없으면 cache도 그대로 둔다.
+            Return:
+                dict(inserted, updated, deleted, skipped)
+        """
+        stock_code = stock_names.code_by_kor(stock_kor)
+        if stock_code is None:
+            raise ValueError('unknown stock kor name, [{}]'.format(stock_kor))
+
+        counts = PutQueries.indicator_diff(value_list, stock_code)
+        if counts['inserted'] or counts['updated'] or counts['deleted']:
+            candle_cache.invalidate(stock_kor)
+            indicator_matrix.update_stock(stock_kor)
+        return counts
+
+    @staticmethod
+    def count_message(counts):
+        return 'inserted=[{inserted}], updated=[{updated}], deleted=[{deleted}], skipped=[{skipped}]'.format(**counts)
+
+
+class PutStockIndicatorsBatch(Resource):
+    def post(self):
+        """
+            indicator_html을 여러 번 전달하면 process pool에서 parse 후 종목별로 저장한다.
+            data: [{stock_kor, success, message}, ...], 요청 순서
+        """
+        html_list = request.form.getlist('indicator_html')
+        if not html_list:
+            return dict(
+                success=False,
+                data=str(),
+                message='indicator_html is empty'
+            )
+        if len(html_list) > ParserInfo.MAX_BATCH:
+            return dict(
+                success=False,
+                data=str(),
+                message='too many pages, max=[{}]'.format(ParserInfo.MAX_BATCH)
+            )
+
+        TableQueries.set_indicator_table()
+
+        results = list()
+        for result, error in parse_many(html_list):
+            if result is None:
+                results.append(dict(stock_kor=None, success=False,
+                                    message=error or 'The server only receive one table.'))
+                continue
+            try:
+                counts = PutStockIndicators.save(result['stock_kor'], result['value_list'])
+                results.append(dict(stock_kor=result['stock_kor'], success=True,
+                                    message=PutStockIndicators.count_message(counts)))
+            except Exception as ex:
+                results.append(dict(stock_kor=result['stock_kor'], success=False, message=str(ex)))
+
+        failed = len([each for each in results if not each['success']])
+        return dict(
+            success=not failed,
+            data=results,
+            message='failed=[{}/{}]'.format(failed, len(results)) if failed else str()
+        )
@@ -4,7 +4,13 @@ from flask_restful import Api
 
 from Util.pyinstaller_patch import *
 
-from KiwoomHighChart.api import GetDailyCandle, GetStockIndicators, PutStockIndicators
+from KiwoomHighChart.api import GetDailyCandle, GetStockIndicators, PutStockIndicators, GetCandleIndicators, \
+    ScreenStocks, PutStockIndicatorsBatch, SearchStockNames, GetResampledCandle
+from KiwoomHighChart.config import ProfilingInfo
+from KiwoomHighChart.util import CONNECTION_POOL
+from SharedDatabase import RequestProfiler
+
+import multiprocessing
 
 app = Flask(__name__)
 api = Api()
@@ -13,12 +19,27 @@ cors = CORS(app)
 app.config['CORS_HEADERS'] = 'Content-Type'
 
 api.add_resource(GetDailyCandle, '/api/v0/get/daily-candle')
+api.add_resource(GetCandleIndicators, '/api/v0/get/candle-indicators')
+api.add_resource(GetResampledCandle, '/api/v0/get/daily-candle-resampled')
 
 api.add_resource(GetStockIndicators, '/api/v0/get/indicators')
 api.add_resource(PutStockIndicators, '/api/v0/put/indicators')
+api.add_resource(PutStockIndicatorsBatch, '/api/v0/put/indicators-batch')
+api.add_resource(ScreenStocks, '/api/v0/get/screener')
+api.add_resource(SearchStockNames, '/api/v0/get/stock-names')
 api.init_app(app)
 
+profiler = RequestProfiler(
+    pools=[CONNECTION_POOL],
+    slow_request_ms=ProfilingInfo.SLOW_REQUEST_MS,
+    sample_interval_ms=ProfilingInfo.SAMPLE_INTERVAL_MS,
+    max_slow_requests=ProfilingInfo.MAX_SLOW_REQUESTS
+)
+profiler.init_app(app, api)
+
 if __name__ == '__main__':
+    # pyinstaller 실행 파일에서 indicator parser process pool을 쓰기 위해 필요하다.
+    multiprocessing.freeze_support()
     id_ = user_check("jgeol", "jgeol123!", "KiwoomHighChart")
     try:
         port = 5000
@@ -0,0 +1,159 @@
+from KiwoomHighChart.config import CandleCacheInfo, StoreInfo
+from KiwoomHighChart.query import GetQueries
+from KiwoomHighChart.store import candle_store
+from KiwoomHighChart.names import stock_names
+
+from flask import request, Response
+
+from collections import OrderedDict
+
+import gzip
+import hashlib
+import json
+import threading
+import time
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MIMETYPE = 'application/x-msgpack'
+
+
+class CandleCache(object):
+    """
+        종목별 일봉 응답 cache
+        key는 (stock_kor, data watermark, 지표 version, 정렬된 query args, media type) 이므로
+        수집기가 일봉을 추가하거나 다른 worker가 지표를 저장하면 새 key로 조회되고, 이전 entry는 LRU로 밀려난다.
+        지표 version은 지표를 포함하는 응답(with_indicator)에만 key에 넣는다.
+        entry에는 인코딩된 body를 저장해 hit인 경우 직렬화, 압축도 생략한다.
+    """
+    def __init__(self, max_entries, watermark_ttl, gzip_min_bytes):
+        self._max_entries = max_entries
+        self._watermark_ttl = watermark_ttl
+        self._gzip_min_bytes = gzip_min_bytes
+
+        self._entries = OrderedDict()
+        self._watermarks = dict()
+        self._indicator_versions = dict()
+        self._lock = threading.Lock()
+
+        self._metrics = dict(hits=0, misses=0, not_modified=0, evictions=0)
+
+    def watermark(self, stock_kor):
+        stock_code = stock_names.code_by_kor(stock_kor)
+        if stock_code is None:
+            return None
+
+        if StoreInfo.ENABLED:
+            # store 파일 이름이 바뀌면 새 key, DB 조회가 필요 없다.
+            version = candle_store.version(stock_code)
+            if version is not None:
+                return version
+
+        return self._ttl_get(self._watermarks, stock_kor,
+                             lambda: GetQueries.candle_watermark_by_stock_code(stock_code))
+
+    def indicator_version(self, stock_kor):
+        stock_code = stock_names.code_by_kor(stock_kor)
+        if stock_code is None:
+            return None
+
+        return self._ttl_get(self._indicator_versions, stock_kor,
+                             lambda: GetQueries.indicator_version_by_stock_code(stock_code))
+
+    def _ttl_get(self, cache, stock_kor, fetch):
+        now = time.time()
+        with self._lock:
+            cached = cache.get(stock_kor)
+            if cached is not None and cached[0] > now:
+                return cached[1]
+
+        value = fetch()
+        with self._lock:
+            cache[stock_kor] = (now + self._watermark_ttl, value)
+        return value
+
+    def invalidate(self, stock_kor):
+        with self._lock:
+            self._watermarks.pop(stock_kor, None)
+            self._indicator_versions.pop(stock_kor, None)
+            for key in [key for key in self._entries if key[0] == stock_kor]:
+                self._entries.pop(key)
+
+    def get_metrics(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['entries'] = len(self._entries)
+        return metrics
+
+    @staticmethod
+    def _media_type():
+        if msgpack is not None and request.accept_mimetypes.best_match(
+                ['application/json', MSGPACK_MIMETYPE]) == MSGPACK_MIMETYPE:
+            return MSGPACK_MIMETYPE
+        return 'application/json'
+
+    @staticmethod
+    def _encode(payload, media_type):
+        if media_type == MSGPACK_MIMETYPE:
+            return msgpack.packb(payload, default=str)
+        return json.dumps(payload, default=str, ensure_ascii=False, separators=(',', ':')).encode()
+
+    def _get_entry(self, stock_kor, media_type, loader, with_indicator):
+        key = (stock_kor, self.watermark(stock_kor),
+               self.indicator_version(stock_kor) if with_indicator else None,
+               tuple(sorted(request.args.items(multi=True))), media_type)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._metrics['hits'] += 1
+                return entry
+            self._metrics['misses'] += 1
+
+        body = self._encode(loader(), media_type)
+        entry = dict(etag=hashlib.md5(body).hexdigest(), identity=body)
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._metrics['evictions'] += 1
+        return entry
+
+    def response(self, stock_kor, loader, with_indicator=False):
+        """
+            If-None-Match가 같으면 304, Accept-Encoding에 gzip이 있으면 압축된 body를 반환한다.
+            Args:
+                loader: cache miss일 때 payload(dict)를 만드는 함수
+                with_indicator: payload에 stock_indicators가 포함되는지 여부
+        """
+        media_type = self._media_type()
+        entry = self._get_entry(stock_kor, media_type, loader, with_indicator)
+
+        headers = {
+            'ETag': '"{}"'.format(entry['etag']),
+            'Cache-Control': 'no-cache',
+            'Vary': 'Accept, Accept-Encoding',
+        }
+        if request.if_none_match.contains(entry['etag']):
+            with self._lock:
+                self._metrics['not_modified'] += 1
+            return Response(status=304, headers=headers)
+
+        body = entry['identity']
+        if len(body) >= self._gzip_min_bytes and request.accept_encodings['gzip'] > 0:
+            if 'gzip' not in entry:
+                entry['gzip'] = gzip.compress(body, compresslevel=6)
+            body = entry['gzip']
+            headers['Content-Encoding'] = 'gzip'
+
+        return Response(body, status=200, headers=headers, content_type=media_type)
+
+
+candle_cache = CandleCache(
+    CandleCacheInfo.MAX_ENTRIES,
+    CandleCacheInfo.WATERMARK_TTL_SECONDS,
+    CandleCacheInfo.GZIP_MIN_BYTES
+)
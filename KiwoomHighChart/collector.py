@@ -0,0 +1,372 @@
+from KiwoomHighChart.config import CollectorInfo
+from KiwoomHighChart.query import GetQueries, PutQueries
+
+from Util.pyinstaller_patch import debugger
+
+from collections import deque
+
+import datetime
+import json
+import os
+import queue
+import threading
+import time
+
+"""
+    일봉 수집 scheduler
+    Kiwoom OpenAPI는 한 session에서 TR을 순서대로 처리하므로 요청을 동시에 보내는 대신
+    TR_LIMITS 한도까지 빈틈없이 보내고, 페이지 단위 진행상황을 checkpoint 파일에 남겨 재시작시 그 지점부터 이어받는다.
+    DB 저장은 CandleWriter thread가 맡아 TR 대기와 DB write가 겹쳐서 진행된다.
+"""
+
+
+class TrRateLimiter(object):
+    """
+        sliding window rate limiter, 모든 window의 한도를 동시에 만족할 때까지 대기한다.
+        Args:
+            limits: [(count, seconds), ...]
+            history: 이전 실행에서 보낸 TR 시각, 재시작 직후 시간당 한도를 넘지 않도록 이어받는다.
+    """
+    def __init__(self, limits, history=None):
+        self._limits = sorted(limits, key=lambda each: each[1])
+        self._max_window = self._limits[-1][1]
+        self._max_count = max(count for count, _ in self._limits)
+        self._history = deque(sorted(history or list()), maxlen=self._max_count)
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+            Return:
+                대기한 시간(seconds)
+        """
+        waited = 0
+        while True:
+            with self._lock:
+                now = time.time()
+                while self._history and self._history[0] <= now - self._max_window:
+                    self._history.popleft()
+
+                wait = 0
+                for count, seconds in self._limits:
+                    if len(self._history) >= count:
+                        wait = max(wait, self._history[-count] + seconds - now)
+
+                if wait <= 0:
+                    self._history.append(now)
+                    return waited
+            time.sleep(wait)
+            waited += wait
+
+    def history(self):
+        with self._lock:
+            return list(self._history)
+
+
+class CollectorCheckpoint(object):
+    """
+        기준일자 별 수집 진행상황
+        done: 수집이 끝난 종목
+        partial: 페이지를 받아 저장하는 중인 종목, {code: [oldest_candle_date, watermark]}
+            oldest_candle_date가 None이면 아직 저장된 페이지가 없다.
+        파일은 임시파일에 쓴 후 os.replace 하므로 저장 도중 종료되어도 깨지지 않는다.
+    """
+    def __init__(self, path, target_date):
+        self._path = path
+        self._target_date = target_date
+        self._done = set()
+        self._partial = dict()
+        self.tr_history = list()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self._path):
+            return
+        try:
+            with open(self._path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            debugger.exception('fail to load collector checkpoint, [{}]'.format(self._path))
+            return
+
+        self.tr_history = data.get('tr_history', list())
+        # 받다가 멈춘 과거 구간은 기준일자가 바뀌어도 이어받는다.
+        self._partial = data.get('partial', dict())
+        if data.get('target_date') != self._target_date:
+            # 기준일자가 바뀌면 새로 수집한다.
+            return
+        self._done = set(data.get('done', list()))
+
+    def save(self, tr_history=None):
+        if tr_history is not None:
+            self.tr_history = tr_history
+        data = dict(
+            target_date=self._target_date,
+            done=sorted(self._done),
+            partial=self._partial,
+            tr_history=self.tr_history,
+        )
+        tmp_path = '{}.tmp'.format(self._path)
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._path)
+
+    def is_done(self, code):
+        return code in self._done
+
+    def mark_done(self, code):
+        self._done.add(code)
+        self._partial.pop(code, None)
+
+    def get_partial(self, code):
+        return self._partial.get(code)
+
+    def set_partial(self, code, oldest_candle_date, watermark):
+        self._partial[code] = [oldest_candle_date, watermark]
+
+    @property
+    def done_count(self):
+        return len(self._done)
+
+
+class CandleWriter(threading.Thread):
+    """
+        일봉 저장 전용 thread
+        collector(producer)는 페이지를 queue에 넣고 바로 다음 TR을 요청하며,
+        writer는 여러 종목의 페이지를 batch_rows 혹은 flush_ms 단위로 모아 multi-row INSERT 1 transaction으로 저장한다.
+        queue가 가득 차면 put이 대기하므로 DB가 느린 경우 TR 요청도 함께 늦춰진다.
+        checkpoint는 commit 이후에만 갱신한다.
+    """
+    def __init__(self, checkpoint, limiter, queue_size=CollectorInfo.WRITER_QUEUE_SIZE,
+                 batch_rows=CollectorInfo.WRITER_BATCH_ROWS, flush_ms=CollectorInfo.WRITER_FLUSH_MS):
+        super(CandleWriter, self).__init__()
+        self.daemon = True
+
+        self._checkpoint = checkpoint
+        self._limiter = limiter
+        self._batch_rows = batch_rows
+        self._flush_interval = flush_ms / 1000
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop_event = threading.Event()
+        self.error = None
+
+        self.metrics = dict(pages=0, rows=0, commits=0, total_commit_ms=0, max_commit_ms=0)
+
+    def put(self, code, data_set, action):
+        """
+            Args:
+                action: ('start', watermark), ('page', oldest_candle_date, watermark), ('done',)
+        """
+        while True:
+            self._raise_if_failed()
+            try:
+                self._queue.put((code, data_set, action), timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def drain(self):
+        """
+            queue에 들어간 페이지가 모두 commit 될 때까지 대기한다.
+        """
+        while self._queue.unfinished_tasks:
+            self._raise_if_failed()
+            time.sleep(0.05)
+        self._raise_if_failed()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def _raise_if_failed(self):
+        if self.error is not None:
+            raise RuntimeError('candle writer is stopped, [{}]'.format(self.error))
+
+    def run(self):
+        while not (self._stop_event.is_set() and self._queue.empty()):
+            batch = self._collect()
+            if not batch:
+                continue
+            try:
+                self._write(batch)
+            except Exception as ex:
+                debugger.exception('fail to write the daily_candle batch')
+                self.error = ex
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if self.error is not None:
+                return
+
+    def _collect(self):
+        batch, rows = list(), 0
+        deadline = time.time() + self._flush_interval
+        while rows < self._batch_rows:
+            remain = deadline - time.time()
+            if remain <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=min(remain, 0.1))
+            except queue.Empty:
+                if self._stop_event.is_set():
+                    break
+                continue
+            batch.append(item)
+            rows += len(item[1])
+        return batch
+
+    def _write(self, batch):
+        # 시작 표시는 데이터보다 먼저 남겨야 첫 페이지 commit 직후 종료되어도 완료로 오인하지 않는다.
+        starts = [(code, action) for code, _, action in batch if action[0] == 'start']
+        for code, action in starts:
+            self._checkpoint.set_partial(code, None, action[1])
+        if starts:
+            self._checkpoint.save(self._limiter.history())
+
+        row_list = [[code, *data] for code, data_set, _ in batch for data in data_set]
+        if row_list:
+            start = time.time()
+            PutQueries.daily_candle_many(row_list)
+            elapsed_ms = (time.time() - start) * 1000
+            self.metrics['rows'] += len(row_list)
+            self.metrics['commits'] += 1
+            self.metrics['total_commit_ms'] += elapsed_ms
+            self.metrics['max_commit_ms'] = max(self.metrics['max_commit_ms'], elapsed_ms)
+
+        for code, data_set, action in batch:
+            if action[0] == 'page':
+                self._checkpoint.set_partial(code, action[1], action[2])
+            elif action[0] == 'done':
+                self._checkpoint.mark_done(code)
+        self._checkpoint.save(self._limiter.history())
+        self.metrics['pages'] += len(batch)
+
+
+class DailyCandleCollector(object):
+    """
+        전체 종목 일봉 수집
+        저장된 마지막 일봉(watermark) 이후만 받고, 없는 경우 기준일자부터 과거로 페이지를 넘기며 전부 받는다.
+        페이지는 writer가 DB에 저장한 뒤에 checkpoint에 기록하므로 재시작시 저장된 마지막 페이지 다음부터 요청한다.
+    """
+    def __init__(self, kiwoom_api, latest_date, checkpoint_path=CollectorInfo.CHECKPOINT_PATH,
+                 limits=CollectorInfo.TR_LIMITS, tr_timeout=CollectorInfo.TR_TIMEOUT,
+                 max_retry=CollectorInfo.MAX_RETRY):
+        self._kiwoom_api = kiwoom_api
+        self._latest_date = latest_date
+        self._tr_timeout = tr_timeout
+        self._max_retry = max_retry
+        self._queue = queue.Queue()
+
+        self.checkpoint = CollectorCheckpoint(checkpoint_path, latest_date.strftime('%Y%m%d'))
+        self.limiter = TrRateLimiter(limits, self.checkpoint.tr_history)
+        self._watermarks = dict()
+        self._writer = None
+
+    def _latest_trading_date(self):
+        """
+            Return:
+                latest_date 이전 마지막 평일 00:00의 candle_date(ms), 휴장일은 고려하지 않는다.
+        """
+        date = self._latest_date
+        while date.weekday() >= 5:
+            date -= datetime.timedelta(days=1)
+        return datetime.datetime(date.year, date.month, date.day).timestamp() * 1000
+
+    def _is_current(self, code):
+        watermark = self._watermarks.get(code)
+        return watermark is not None and watermark >= self._latest_trading_date()
+
+    def collect(self, total_codes):
+        """
+            Return:
+                True if 모든 종목 수집 완료 else 남은 종목 list
+        """
+        # 종목별 round trip 대신 시작시 1회 전체 watermark를 읽는다.
+        self._watermarks = GetQueries.latest_candle_dates()
+
+        codes = [
+            code for code in total_codes
+            if code and not self.checkpoint.is_done(code)
+            and (self.checkpoint.get_partial(code) or not self._is_current(code))
+        ]
+        debugger.debug('DailyCandleCollector:::start, remain=[{}], done=[{}], current=[{}]'.format(
+            len(codes), self.checkpoint.done_count, len(total_codes) - len(codes) - self.checkpoint.done_count))
+
+        self._writer = CandleWriter(self.checkpoint, self.limiter)
+        self._writer.start()
+        try:
+            completed = self._collect_codes(codes)
+        finally:
+            self._writer.stop()
+            debugger.debug('DailyCandleCollector:::writer, [{}]'.format(self._writer.metrics))
+
+        if completed and self._writer.error is None:
+            return True
+        # checkpoint는 commit 된 페이지까지만 반영되어 있다.
+        return [code for code in codes if not self.checkpoint.is_done(code)]
+
+    def _collect_codes(self, codes):
+        start = time.time()
+        for n, code in enumerate(codes):
+            for retry in range(self._max_retry):
+                try:
+                    self.collect_code(code)
+                    break
+                except queue.Empty:
+                    debugger.debug('daily candle get failed from [{}], retry=[{}]'.format(code, retry))
+                    try:
+                        # 재시도는 commit 된 checkpoint 기준으로 이어받는다.
+                        self._writer.drain()
+                    except Exception:
+                        return False
+                except Exception:
+                    # DB 장애 등은 재시작 후 checkpoint 부터 이어받는다.
+                    debugger.exception('fail to collect the daily_candle from = [{}]'.format(code))
+                    return False
+            else:
+                return False
+
+            if (n + 1) % 100 == 0:
+                debugger.debug('DailyCandleCollector:::[{}/{}], [{:.1f}s]'.format(n + 1, len(codes), time.time() - start))
+        return True
+
+    def collect_code(self, code):
+        partial = self.checkpoint.get_partial(code)
+        if partial:
+            oldest_candle_date, watermark = partial
+        else:
+            oldest_candle_date, watermark = None, self._watermarks.get(code)
+            self._writer.put(code, list(), ('start', watermark))
+
+        if oldest_candle_date is None:
+            base_date = self._latest_date
+        else:
+            base_date = datetime.datetime.fromtimestamp(oldest_candle_date / 1000) - datetime.timedelta(days=1)
+
+        repeat = 0
+        while True:
+            is_repeat, data_set = self._request(code, base_date, repeat)
+            repeat = 2
+
+            new_data_set = [data for data in data_set if watermark is None or data[0] > watermark]
+
+            reached_watermark = len(new_data_set) < len(data_set)
+            if not is_repeat or reached_watermark or not data_set:
+                self._writer.put(code, new_data_set, ('done',))
+                return
+
+            self._writer.put(code, new_data_set, ('page', data_set[-1][0], watermark))
+
+    def _request(self, code, base_date, repeat):
+        # timeout 이후 늦게 도착한 응답이 다음 요청의 결과로 읽히지 않도록 비운다.
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+        self.limiter.acquire()
+        self._kiwoom_api.get_all_daily_candle(code, base_date.strftime('%Y%m%d'), self._queue, repeat=repeat)
+        return self._queue.get(timeout=self._tr_timeout)
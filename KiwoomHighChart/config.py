@@ -1,8 +1,20 @@
+import os
+
+
 class SqlInfo(object):
     HOST = 'localhost'
     USER = 'root'
     PASSWORD = 'root'
     DATABASE = 'kiwoom'
+    POOL_SIZE = 4
+    SLOW_QUERY_MS = 500
+
+
+class ProfilingInfo(object):
+    SLOW_REQUEST_MS = 1000
+    # 0 보다 크면 sampling profiler로 slow request의 stack을 수집한다.
+    SAMPLE_INTERVAL_MS = 0
+    MAX_SLOW_REQUESTS = 50
 
 
 class IndicatorDict(object):
@@ -13,3 +25,76 @@ class IndicatorDict(object):
         '5 ROE 5 SP 저': 22, 'SP 10 저': 23, 'ASP 10 저': 24, 'IP 10 저': 25, 'CP 10 저': 26
     }
     OTHER = 27
+
+
+class CollectorInfo(object):
+    # Kiwoom 조회 TR 제한, [(횟수, 초)], 초당 5회 / 시간당 1000회
+    TR_LIMITS = [(5, 1), (1000, 60 * 60)]
+    TR_TIMEOUT = 10
+    # 한 종목의 TR이 연속으로 실패하면 남은 종목을 반환해 process를 재시작한다.
+    MAX_RETRY = 3
+    # CandleWriter, 대기 페이지 수 한도와 group commit 단위
+    WRITER_QUEUE_SIZE = 64
+    WRITER_BATCH_ROWS = 5000
+    WRITER_FLUSH_MS = 1000
+    # True면 daily_watermark 테이블에서 종목별 마지막 일봉을 읽는다, False면 daily_info GROUP BY
+    USE_WATERMARK_TABLE = True
+    CHECKPOINT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'collector_checkpoint.json')
+
+
+class CandleCacheInfo(object):
+    MAX_ENTRIES = 512
+    # 수집기, 다른 worker는 별도 process 이므로 종목별 watermark와 지표 version을 TTL 마다 다시 읽어 cache 유효성을 확인한다.
+    WATERMARK_TTL_SECONDS = 30
+    GZIP_MIN_BYTES = 1024
+
+
+class StoreInfo(object):
+    # 종목별 mmap 일봉 파일, 수집 완료 후 갱신되며 GetDailyCandle이 DB 대신 읽는다.
+    ENABLED = True
+    PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'candle_store')
+
+
+class IndicatorInfo(object):
+    MAX_ENTRIES = 2048
+    MAX_INDICATORS = 10
+    MAX_WINDOW = 500
+
+
+class ScreenerInfo(object):
+    # 다른 process에서 저장된 지표를 반영하기 위한 전체 재구성 주기
+    REFRESH_SECONDS = 5 * 60
+    DEFAULT_LIMIT = 50
+    MAX_LIMIT = 1000
+
+
+class ParserInfo(object):
+    # PutStockIndicatorsBatch의 parse용 process 수
+    PROCESS_POOL_SIZE = max(1, (os.cpu_count() or 2) - 1)
+    MIN_POOL_BATCH = 8
+    MAX_BATCH = 500
+
+
+class NameIndexInfo(object):
+    # stock_info 재조회 주기, 없는 종목명이 조회된 경우 최소 재조회 간격
+    REFRESH_SECONDS = 10 * 60
+    MISS_RELOAD_SECONDS = 30
+    DEFAULT_LIMIT = 10
+    MAX_LIMIT = 50
+
+
+class ResampleInfo(object):
+    # candle_date는 수집 PC(KST) 00:00 기준
+    UTC_OFFSET_HOURS = 9
+    DEFAULT_POINTS = 500
+    MAX_POINTS = 5000
+
+
+class ExportInfo(object):
+    # python -m KiwoomHighChart.export 기본 경로
+    PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'analytics')
+    BATCH_ROWS = 50000
+    ROWS_PER_FILE = 1000000
+    # 모든 partition buffer 합, 넘으면 가장 큰 partition부터 파일로 쓴다.
+    MAX_BUFFERED_ROWS = 2000000
+    COMPRESSION = 'zstd'
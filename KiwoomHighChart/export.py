@@ -0,0 +1,322 @@
+from KiwoomHighChart.config import ExportInfo, ResampleInfo
+from KiwoomHighChart.query import GetQueries
+from KiwoomHighChart.screener import to_number
+from StockApis.name_cache import StockNameCache
+
+from Util.pyinstaller_patch import debugger
+
+import numpy as np
+
+import argparse
+import datetime
+import itertools
+import json
+import os
+import shutil
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+"""
+    daily_info, stock_indicators를 분석용 Parquet로 내보낸다.
+    '{root}/{table}/market={market}/year={year}/part-{run}-{n}.parquet' hive partition 이므로
+    pyarrow.dataset, pandas.read_parquet(root/table)로 전체 종목을 바로 읽을 수 있다.
+
+    server-side cursor로 BATCH_ROWS 씩 읽고, partition buffer 합이 MAX_BUFFERED_ROWS를 넘으면 가장 큰 partition부터 파일로 쓴다.
+    market은 stock_info에 없으므로 Kiwoom 도구들의 종목명 cache(StockApis.name_cache)에서 읽고, 없으면 'unknown'
+
+    daily_info: 일봉은 바뀌지 않으므로 종목별 (첫, 마지막 candle_date, 수)를 watermark로 저장하고 그 밖의 일봉만 추가로 쓴다.
+        이미 쓴 구간 사이에 일봉이 채워진 종목이 있으면 partition 파일에서 종목만 바꿀 수 없으므로 전체를 다시 쓴다.
+    stock_indicators: 값이 갱신되므로 checksum이 바뀐 경우에만 전체를 다시 쓴다.
+
+    usage:
+        python -m KiwoomHighChart.export ./analytics
+        python -m KiwoomHighChart.export ./analytics --full --tables daily_info
+"""
+
+STATE_NAME = '_export_state.json'
+DAY_MS = 24 * 60 * 60 * 1000
+TABLES = ('daily_info', 'stock_indicators')
+
+
+def candle_years(candle_dates):
+    """
+        candle_date(ms, 현지 00:00) -> 연도
+    """
+    days = (candle_dates + ResampleInfo.UTC_OFFSET_HOURS * 60 * 60 * 1000) // DAY_MS
+    return days.astype('datetime64[D]').astype('datetime64[Y]').astype(np.int64) + 1970
+
+
+def merge_range(old, new):
+    """
+        [첫, 마지막 candle_date, 수] 두 범위를 합친다, old가 없으면 new
+    """
+    if old is None:
+        return list(new)
+    return [min(old[0], new[0]), max(old[1], new[1]), old[2] + new[2]]
+
+
+def batches(row_iter, size):
+    iterator = iter(row_iter)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class PartitionedWriter(object):
+    """
+        (market, year) partition 별 column buffer, 임시 directory에 쓰고 commit()에서 제자리로 옮긴다.
+    """
+    def __init__(self, root, table, schema, run_id):
+        self._root = root
+        self._table = table
+        self._schema = schema
+        self._run_id = run_id
+        self._tmp_root = os.path.join(root, '.tmp-{}'.format(run_id), table)
+
+        self._buffers = dict()
+        self._buffered_rows = 0
+        self._file_count = 0
+        self._files = list()
+        self.rows = 0
+
+    def add(self, markets, years, columns):
+        """
+            Args:
+                markets, years: row 별 partition 값 배열
+                columns: {column name: 배열}, schema 순서
+        """
+        keys = np.char.add(np.char.add(markets.astype(str), '/'), years.astype(str))
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        for index, key in enumerate(unique_keys):
+            mask = inverse == index
+            buffer = self._buffers.setdefault(str(key), dict(rows=0, chunks=list()))
+            buffer['chunks'].append({name: values[mask] for name, values in columns.items()})
+            buffer['rows'] += int(mask.sum())
+            self._buffered_rows += int(mask.sum())
+
+        while self._buffered_rows > ExportInfo.MAX_BUFFERED_ROWS:
+            self._flush(max(self._buffers, key=lambda each: self._buffers[each]['rows']))
+        for key in [key for key, buffer in self._buffers.items() if buffer['rows'] >= ExportInfo.ROWS_PER_FILE]:
+            self._flush(key)
+
+    def _flush(self, key):
+        buffer = self._buffers.pop(key)
+        if not buffer['rows']:
+            return
+        market, year = key.split('/')
+        arrays = [
+            pa.array(np.concatenate([chunk[field.name] for chunk in buffer['chunks']]), type=field.type)
+            for field in self._schema
+        ]
+        relative = os.path.join('market={}'.format(market), 'year={}'.format(year),
+                                'part-{}-{:05d}.parquet'.format(self._run_id, self._file_count))
+        path = os.path.join(self._tmp_root, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pq.write_table(pa.Table.from_arrays(arrays, schema=self._schema), path, compression=ExportInfo.COMPRESSION)
+
+        self._file_count += 1
+        self._files.append(relative)
+        self._buffered_rows -= buffer['rows']
+        self.rows += buffer['rows']
+
+    def close(self):
+        for key in list(self._buffers):
+            self._flush(key)
+
+    def discard(self):
+        """
+            commit 하지 않고 이번에 쓴 임시 파일을 지운다.
+        """
+        shutil.rmtree(self._tmp_root, ignore_errors=True)
+        self._buffers, self._buffered_rows, self._files, self._file_count, self.rows = dict(), 0, list(), 0, 0
+
+    def commit(self, replace=False):
+        """
+            Args:
+                replace: True면 기존 table directory를 지우고 이번 파일만 남긴다.
+        """
+        target_root = os.path.join(self._root, self._table)
+        if replace and os.path.isdir(target_root):
+            shutil.rmtree(target_root)
+        for relative in self._files:
+            target = os.path.join(target_root, relative)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(os.path.join(self._tmp_root, relative), target)
+        return len(self._files)
+
+
+class ParquetExporter(object):
+    def __init__(self, root):
+        if pa is None:
+            raise ImportError('pyarrow is required for the parquet export, pip install pyarrow')
+        self._root = root
+        self._run_id = datetime.datetime.now().strftime('%Y%m%d%H%M%S%f')
+        self._markets = {
+            code: market for code, (_, market) in ((StockNameCache().load() or dict()).get('names', dict())).items()
+        }
+
+        self.daily_schema = pa.schema([
+            ('stock_code', pa.string()),
+            ('candle_date', pa.int64()),
+            ('open', pa.int64()),
+            ('high', pa.int64()),
+            ('low', pa.int64()),
+            ('close', pa.int64()),
+        ])
+        self.indicator_schema = pa.schema([
+            ('stock_code', pa.string()),
+            ('indicator_name', pa.string()),
+            ('date', pa.int32()),
+            ('value', pa.string()),
+            ('value_number', pa.float64()),
+            ('order_index', pa.int32()),
+        ])
+
+    def _state_path(self):
+        return os.path.join(self._root, STATE_NAME)
+
+    def load_state(self):
+        try:
+            with open(self._state_path(), 'r', encoding='utf8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return dict()
+
+    def save_state(self, state):
+        tmp_path = '{}.tmp'.format(self._state_path())
+        with open(tmp_path, 'w', encoding='utf8') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._state_path())
+
+    def _market_array(self, codes):
+        return np.array([self._markets.get(code, 'unknown') for code in codes], dtype=object)
+
+    def _write_daily(self, writer, row_iter, written):
+        """
+            Args:
+                written: {stock_code: [첫, 마지막 candle_date, 수]}, 이번에 쓴 일봉의 종목별 범위를 더한다.
+        """
+        for chunk in batches(row_iter, ExportInfo.BATCH_ROWS):
+            codes = np.array([row[0] for row in chunk], dtype=object)
+            values = np.array([row[1:] for row in chunk], dtype=np.int64)
+            columns = dict(
+                stock_code=codes,
+                candle_date=values[:, 0],
+                open=values[:, 1],
+                high=values[:, 2],
+                low=values[:, 3],
+                close=values[:, 4],
+            )
+            writer.add(self._market_array(codes), candle_years(values[:, 0]), columns)
+
+            unique_codes, inverse = np.unique(codes.astype(str), return_inverse=True)
+            firsts = np.full(len(unique_codes), np.iinfo(np.int64).max)
+            lasts = np.full(len(unique_codes), np.iinfo(np.int64).min)
+            np.minimum.at(firsts, inverse, values[:, 0])
+            np.maximum.at(lasts, inverse, values[:, 0])
+            counts = np.bincount(inverse, minlength=len(unique_codes))
+            for code, first, last, count in zip(unique_codes.tolist(), firsts.tolist(), lasts.tolist(),
+                                                counts.tolist()):
+                written[code] = merge_range(written.get(code), [first, last, count])
+
+    def export_daily_info(self, state, full=False):
+        """
+            Return:
+                dict(table, rows, files, stocks), stocks는 새로 쓴 일봉이 있는 종목 수
+        """
+        old_ranges = dict() if full else state.get('daily_info', dict())
+        new_ranges = {code: [first, last, count] for code, first, last, count in GetQueries.candle_ranges()}
+        changed = [code for code, each in new_ranges.items() if old_ranges.get(code) != each]
+
+        writer = PartitionedWriter(self._root, 'daily_info', self.daily_schema, self._run_id)
+        written = dict()
+        if not old_ranges:
+            # 첫 export는 종목별 조회 대신 전체를 한번에 읽는다.
+            self._write_daily(writer, GetQueries.stream_daily_candles(), written)
+        else:
+            for code in changed:
+                old = old_ranges.get(code)
+                before, after = (old[0], old[1]) if old else (None, None)
+                self._write_daily(writer, GetQueries.stream_daily_candles(code, before, after), written)
+        writer.close()
+
+        # watermark는 실제로 쓴 일봉 기준, 조회 중 추가된 일봉도 다음 실행에서 중복으로 쓰지 않는다.
+        ranges = {code: old_ranges[code] for code in new_ranges if code in old_ranges}
+        for code, each in written.items():
+            ranges[code] = merge_range(ranges.get(code), each)
+
+        missing = [code for code in changed if code not in ranges or ranges[code][2] < new_ranges[code][2]]
+        if missing and old_ranges:
+            # 기존 구간 사이가 채워진 종목, watermark 밖만 읽으므로 다음 실행에서도 빠진다.
+            debugger.info('daily_info export, [{}] stocks have candles inside the exported range, ex) [{}], '
+                          'rebuilding all'.format(len(missing), missing[0]))
+            writer.discard()
+            return self.export_daily_info(state, full=True)
+
+        files = writer.commit(replace=full or not old_ranges)
+        state['daily_info'] = ranges
+        return dict(table='daily_info', rows=writer.rows, files=files, stocks=len(changed))
+
+    def export_stock_indicators(self, state, full=False):
+        checksum = list(GetQueries.stock_indicators_checksum())
+        if not full and state.get('stock_indicators') == checksum:
+            return dict(table='stock_indicators', rows=0, files=0, skipped=True)
+
+        writer = PartitionedWriter(self._root, 'stock_indicators', self.indicator_schema, self._run_id)
+        for chunk in batches(GetQueries.stream_stock_indicators(), ExportInfo.BATCH_ROWS):
+            codes = np.array([row[0] for row in chunk], dtype=object)
+            years = np.array([row[2] or 0 for row in chunk], dtype=np.int64)
+            values = np.array([row[3] for row in chunk], dtype=object)
+            columns = dict(
+                stock_code=codes,
+                indicator_name=np.array([row[1] for row in chunk], dtype=object),
+                date=years,
+                value=values,
+                value_number=np.array([to_number(value) for value in values], dtype=np.float64),
+                order_index=np.array([row[4] or 0 for row in chunk], dtype=np.int64),
+            )
+            writer.add(self._market_array(codes), years, columns)
+        writer.close()
+
+        files = writer.commit(replace=True)
+        state['stock_indicators'] = checksum
+        return dict(table='stock_indicators', rows=writer.rows, files=files, skipped=False)
+
+    def export(self, tables=TABLES, full=False):
+        start = time.time()
+        os.makedirs(self._root, exist_ok=True)
+        state = self.load_state()
+
+        results = list()
+        try:
+            if 'daily_info' in tables:
+                results.append(self.export_daily_info(state, full))
+            if 'stock_indicators' in tables:
+                results.append(self.export_stock_indicators(state, full))
+            # 파일을 모두 옮긴 후 watermark를 저장한다.
+            self.save_state(state)
+        finally:
+            shutil.rmtree(os.path.join(self._root, '.tmp-{}'.format(self._run_id)), ignore_errors=True)
+
+        for result in results:
+            debugger.info('parquet export [{}], [{:.1f}s]'.format(result, time.time() - start))
+        return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('root', nargs='?', default=ExportInfo.PATH)
+    parser.add_argument('--full', action='store_true', help='watermark를 무시하고 전체를 다시 쓴다.')
+    parser.add_argument('--tables', nargs='+', choices=TABLES, default=list(TABLES))
+    args = parser.parse_args()
+
+    print(ParquetExporter(args.root).export(args.tables, args.full))
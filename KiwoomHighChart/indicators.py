@@ -0,0 +1,164 @@
+from KiwoomHighChart.config import IndicatorInfo
+
+from collections import OrderedDict
+
+import numpy as np
+
+import threading
+
+"""
+    일봉 종가 기반 기술적 지표
+    계산은 항상 전체 일봉으로 하고 요청 구간만 잘라서 반환하므로, 구간 앞부분도 warm-up 없이 값이 채워진다.
+    결과는 (종목, 지표, parameter, 일봉 watermark) 단위로 cache 한다.
+"""
+
+
+def rolling_mean(values, window):
+    out = np.full(len(values), np.nan)
+    if len(values) < window:
+        return out
+    csum = np.cumsum(np.insert(values, 0, 0.0))
+    out[window - 1:] = (csum[window:] - csum[:-window]) / window
+    return out
+
+
+def rolling_std(values, window):
+    """
+        모표준편차, Bollinger band 기준
+    """
+    out = np.full(len(values), np.nan)
+    if len(values) < window:
+        return out
+    mean = rolling_mean(values, window)[window - 1:]
+    csum_sq = np.cumsum(np.insert(values * values, 0, 0.0))
+    mean_sq = (csum_sq[window:] - csum_sq[:-window]) / window
+    out[window - 1:] = np.sqrt(np.maximum(mean_sq - mean * mean, 0))
+    return out
+
+
+def exponential_smoothing(values, alpha, window):
+    """
+        첫 window개의 평균으로 시작하는 지수평활, 이전 값에 의존하므로 1회 순회한다.
+    """
+    out = np.full(len(values), np.nan)
+    if len(values) < window:
+        return out
+    value = values[:window].mean()
+    out[window - 1] = value
+    for index in range(window, len(values)):
+        value += alpha * (values[index] - value)
+        out[index] = value
+    return out
+
+
+def sma(close, window):
+    return dict(value=rolling_mean(close, window))
+
+
+def ema(close, window):
+    return dict(value=exponential_smoothing(close, 2 / (window + 1), window))
+
+
+def rsi(close, window):
+    """
+        Wilder RSI
+    """
+    out = np.full(len(close), np.nan)
+    if len(close) <= window:
+        return dict(value=out)
+
+    diff = np.diff(close)
+    average_gain = exponential_smoothing(np.maximum(diff, 0), 1 / window, window)
+    average_loss = exponential_smoothing(np.maximum(-diff, 0), 1 / window, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        value = np.where(average_loss == 0, 100.0, 100 - 100 / (1 + average_gain / average_loss))
+    out[1:] = np.where(np.isnan(average_gain), np.nan, value)
+    return dict(value=out)
+
+
+def bollinger(close, window, width=2):
+    mid = rolling_mean(close, window)
+    std = rolling_std(close, window)
+    return dict(mid=mid, upper=mid + width * std, lower=mid - width * std)
+
+
+KERNELS = {
+    'sma': (sma, 1),
+    'ema': (ema, 1),
+    'rsi': (rsi, 1),
+    'bb': (bollinger, 2),
+}
+
+
+def parse_indicators(text):
+    """
+        'sma:20,rsi:14,bb:20:2' -> [('sma', (20,)), ('rsi', (14,)), ('bb', (20, 2.0))]
+        첫 parameter는 window(int), 나머지는 float
+    """
+    specs = list()
+    for each in filter(None, (part.strip() for part in text.split(','))):
+        name, *params = each.split(':')
+        if name not in KERNELS:
+            raise ValueError('unknown indicator, [{}]'.format(name))
+        if not params or len(params) > KERNELS[name][1]:
+            raise ValueError('invalid indicator parameters, [{}]'.format(each))
+        try:
+            window, rest = int(params[0]), tuple(float(param) for param in params[1:])
+        except ValueError:
+            raise ValueError('invalid indicator parameters, [{}]'.format(each))
+        if not 1 <= window <= IndicatorInfo.MAX_WINDOW:
+            raise ValueError('window should be 1 ~ {}, [{}]'.format(IndicatorInfo.MAX_WINDOW, each))
+        specs.append((name, (window, *rest)))
+
+    if not specs:
+        raise ValueError('indicators is empty')
+    if len(specs) > IndicatorInfo.MAX_INDICATORS:
+        raise ValueError('too many indicators, max=[{}]'.format(IndicatorInfo.MAX_INDICATORS))
+    return specs
+
+
+def indicator_key(name, params):
+    return '_'.join([name] + ['{:g}'.format(param) for param in params])
+
+
+class IndicatorEngine(object):
+    def __init__(self, max_entries):
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def compute(self, stock_kor, watermark, close, specs):
+        """
+            Args:
+                watermark: 일봉이 바뀌면 달라지는 값, cache key에 포함된다.
+                close: 전체 종가 배열
+            Return:
+                {indicator_key: {series name: np.ndarray}}
+        """
+        close = np.asarray(close, dtype=np.float64)
+        results = dict()
+        for name, params in specs:
+            key = (stock_kor, watermark, name, params)
+            with self._lock:
+                result = self._entries.get(key)
+                if result is not None:
+                    self._entries.move_to_end(key)
+
+            if result is None:
+                result = KERNELS[name][0](close, *params)
+                with self._lock:
+                    self._entries[key] = result
+                    while len(self._entries) > self._max_entries:
+                        self._entries.popitem(last=False)
+
+            results[indicator_key(name, params)] = result
+        return results
+
+
+def to_json_list(values):
+    out = np.round(values, 4).astype(object)
+    out[np.isnan(values)] = None
+    return out.tolist()
+
+
+indicator_engine = IndicatorEngine(IndicatorInfo.MAX_ENTRIES)
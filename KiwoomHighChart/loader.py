@@ -0,0 +1,101 @@
+from KiwoomHighChart.util import create_pool
+from KiwoomHighChart.query import PutQueries
+from KiwoomHighChart.config import CollectorInfo
+
+from Util.pyinstaller_patch import debugger
+
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+"""
+    daily_info, stock_indicators 전체 backfill 용 bulk loader
+    row를 CSV로 흘려 쓴 후 LOAD DATA LOCAL INFILE 한번으로 적재하고 rows/s를 기록한다.
+    평소 수집은 PutQueries의 multi-row VALUES 경로를 사용한다.
+
+    usage:
+        python -m KiwoomHighChart.loader daily_info candles.csv
+        python -m KiwoomHighChart.loader stock_indicators indicators.csv
+"""
+
+# LOAD DATA LOCAL INFILE은 client 파일을 읽으므로 local_infile은 loader 전용 pool에만 켠다.
+# connection은 처음 적재할 때 만들어진다.
+LOAD_POOL = create_pool(1, local_infile=True)
+
+TABLE_COLUMNS = {
+    'daily_info': ['stock_code', 'candle_date', 'open', 'high', 'low', 'close'],
+    'stock_indicators': ['stock_code', 'indicator_name', 'date', 'value', 'order_index'],
+}
+
+
+def write_csv(row_iter, f):
+    """
+        LOAD DATA의 FIELDS 설정에 맞춰 쓴다, None은 따옴표 없는 NULL
+        Return:
+            row 수
+    """
+    writer = csv.writer(f, lineterminator='\n')
+    rows = 0
+    for row in row_iter:
+        writer.writerow(['NULL' if each is None else each for each in row])
+        rows += 1
+    return rows
+
+
+def report(table, rows, start):
+    seconds = time.time() - start
+    result = dict(
+        table=table,
+        rows=rows,
+        seconds=seconds,
+        rows_per_second=rows / seconds if seconds else 0,
+    )
+    debugger.info('bulk load [{}], rows=[{}], [{:.1f}s], [{:.0f} rows/s]'.format(
+        table, rows, seconds, result['rows_per_second']))
+    return result
+
+
+def load_csv(table, path, ignore=True):
+    """
+        Args:
+            path: TABLE_COLUMNS 순서의 header 없는 CSV
+    """
+    start = time.time()
+    rows = LOAD_POOL.load_data_infile(os.path.abspath(path), table, TABLE_COLUMNS[table], ignore)
+    if table == 'daily_info' and CollectorInfo.USE_WATERMARK_TABLE:
+        PutQueries.refresh_daily_watermark()
+    return report(table, rows, start)
+
+
+def load_rows(table, row_iter, ignore=True):
+    """
+        row iterator를 임시 CSV로 흘려 쓴 후 적재한다, 메모리에 전체 row를 올리지 않는다.
+    """
+    f = tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf8', newline='', delete=False)
+    try:
+        with f:
+            write_csv(row_iter, f)
+        return load_csv(table, f.name, ignore)
+    finally:
+        os.remove(f.name)
+
+
+def insert_rows(row_list):
+    """
+        multi-row VALUES 경로, daily_info row: [stock_code, candle_date, open, high, low, close]
+    """
+    start = time.time()
+    PutQueries.daily_candle_many(row_list)
+    return report('daily_info', len(row_list), start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('table', choices=sorted(TABLE_COLUMNS))
+    parser.add_argument('path')
+    parser.add_argument('--replace', action='store_true', help='중복 key는 IGNORE 대신 REPLACE')
+    args = parser.parse_args()
+
+    print(load_csv(args.table, args.path, ignore=not args.replace))
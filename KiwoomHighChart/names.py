@@ -0,0 +1,145 @@
+from KiwoomHighChart.config import NameIndexInfo
+from KiwoomHighChart.query import GetQueries
+
+from Util.pyinstaller_patch import debugger
+
+import bisect
+import threading
+import time
+
+"""
+    종목명 -> 종목코드 in-process index
+    요청마다 stock_info를 kor_name으로 JOIN 하지 않고 여기서 종목코드를 찾은 후 stock_code로 조회한다.
+    자동완성용 prefix 검색과 초성 검색('ㅅㅅㅈㅈ' -> 삼성전자, '삼성ㅈ' -> 삼성전자)을 지원한다.
+
+    stock_info는 수집기(task.py)가 갱신하므로 server process는 REFRESH_SECONDS 마다,
+    또는 없는 종목명이 조회되면 MISS_RELOAD_SECONDS 간격으로 다시 읽는다.
+"""
+
+CHOSEONG = 'ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ'
+CHOSEONG_SET = frozenset(CHOSEONG)
+HANGUL_FIRST, HANGUL_LAST = 0xAC00, 0xD7A3
+# 초성 하나에 해당하는 음절 수, 중성 21 x 종성 28
+SYLLABLES_PER_CHOSEONG = 21 * 28
+
+
+def normalize(text):
+    return text.replace(' ', '').lower()
+
+
+def choseong(text):
+    """
+        '삼성전자' -> 'ㅅㅅㅈㅈ', 한글 음절이 아닌 문자는 그대로 둔다.
+    """
+    return str().join(
+        CHOSEONG[(ord(char) - HANGUL_FIRST) // SYLLABLES_PER_CHOSEONG]
+        if HANGUL_FIRST <= ord(char) <= HANGUL_LAST else char
+        for char in text
+    )
+
+
+def _match_at(query, key, key_choseong, offset):
+    """
+        query의 초성 문자는 key 음절의 초성과, 나머지 문자는 그대로 비교한다.
+    """
+    if len(key) - offset < len(query):
+        return False
+    for index, char in enumerate(query):
+        if char == key[offset + index]:
+            continue
+        if char in CHOSEONG_SET and char == key_choseong[offset + index]:
+            continue
+        return False
+    return True
+
+
+class _NameState(object):
+    def __init__(self, rows):
+        self.code_by_name = {kor_name: stock_code for stock_code, kor_name in rows}
+        self.name_by_code = {stock_code: kor_name for stock_code, kor_name in rows}
+        # (검색 key, 종목명, 종목코드), key 순 정렬, prefix 검색은 bisect
+        self.entries = sorted((normalize(kor_name), kor_name, stock_code) for stock_code, kor_name in rows)
+        self.keys = [entry[0] for entry in self.entries]
+        self.choseong_keys = [choseong(key) for key in self.keys]
+
+
+class StockNameIndex(object):
+    def __init__(self, refresh_seconds, miss_reload_seconds):
+        self._refresh_seconds = refresh_seconds
+        self._miss_reload_seconds = miss_reload_seconds
+        self._state = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """
+            stock_info를 다시 읽는다, PutQueries.code_and_name 이후 호출한다.
+        """
+        state = _NameState(GetQueries.code_and_names())
+        with self._lock:
+            self._state = state
+            self._loaded_at = time.time()
+        debugger.debug('stock name index refresh, names=[{}]'.format(len(state.code_by_name)))
+
+    def _snapshot(self):
+        if self._state is None or time.time() - self._loaded_at > self._refresh_seconds:
+            self.refresh()
+        return self._state
+
+    def code_by_kor(self, stock_kor):
+        """
+            Return:
+                종목코드, 없으면 None
+        """
+        if not stock_kor:
+            return None
+        stock_code = self._snapshot().code_by_name.get(stock_kor)
+        if stock_code is None and time.time() - self._loaded_at > self._miss_reload_seconds:
+            # 새로 상장된 종목일 수 있다.
+            self.refresh()
+            stock_code = self._state.code_by_name.get(stock_kor)
+        return stock_code
+
+    def name_by_code(self, stock_code):
+        return self._snapshot().name_by_code.get(stock_code)
+
+    def search(self, query, limit):
+        """
+            prefix 일치를 먼저, 그 다음 중간 일치를 반환한다, 공백과 영문 대소문자는 무시한다.
+            Return:
+                [(stock_code, kor_name), ...]
+        """
+        state = self._snapshot()
+        query = normalize(query or str())
+        if not query:
+            return list()
+
+        if CHOSEONG_SET.isdisjoint(query):
+            start = bisect.bisect_left(state.keys, query)
+            prefix = list()
+            for index in range(start, len(state.keys)):
+                if not state.keys[index].startswith(query):
+                    break
+                prefix.append(index)
+            contains = [index for index, key in enumerate(state.keys) if query in key[1:]] \
+                if len(prefix) < limit else list()
+        elif all(char in CHOSEONG_SET for char in query):
+            prefix = [index for index, key in enumerate(state.choseong_keys) if key.startswith(query)]
+            contains = [index for index, key in enumerate(state.choseong_keys) if query in key[1:]] \
+                if len(prefix) < limit else list()
+        else:
+            prefix, contains = list(), list()
+            for index, key in enumerate(state.keys):
+                key_choseong = state.choseong_keys[index]
+                if _match_at(query, key, key_choseong, 0):
+                    prefix.append(index)
+                elif any(_match_at(query, key, key_choseong, offset) for offset in range(1, len(key))):
+                    contains.append(index)
+
+        # 짧은 이름이 더 정확한 일치
+        prefix.sort(key=lambda index: (len(state.keys[index]), state.keys[index]))
+        result = list(dict.fromkeys(prefix + contains))[:limit]
+        return [(state.entries[index][2], state.entries[index][1]) for index in result]
+
+
+stock_names = StockNameIndex(NameIndexInfo.REFRESH_SECONDS, NameIndexInfo.MISS_RELOAD_SECONDS)
@@ -0,0 +1,255 @@
+from KiwoomHighChart.config import ParserInfo
+
+from lxml import etree
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import argparse
+import datetime
+import io
+import re
+import threading
+import time
+
+"""
+    PutStockIndicators로 올라오는 재무지표 HTML parser
+    문서 전체 tree를 만들지 않고 lxml iterparse로 table이 닫힐 때마다 '__se_tbl_ext' table만 처리하고 나머지는 바로 버린다.
+    batch 업로드는 process pool에서 parse 한다, 결과는 pickle 가능한 dict
+
+    이전 BeautifulSoup 구현은 parse_indicator_html_bs4로 남겨두고 benchmark에서 결과가 같은지 비교한다.
+
+    usage:
+        python -m KiwoomHighChart.parser page1.html page2.html --repeat 5
+"""
+
+TABLE_CLASS = '__se_tbl_ext'
+NAME_PATTERN = re.compile(r'[\w\d].+')
+
+# 첫 table에서 종목명, 연도가 있는 행과 지표가 시작되는 행
+HEADER_ROW_INDEX = 5
+INDICATOR_ROW_INDEX = 15
+
+
+def _has_table_class(element):
+    return TABLE_CLASS in (element.get('class') or str()).split()
+
+
+def _text(element):
+    return str().join(element.itertext())
+
+
+def _row_values(tr):
+    """
+        Return:
+            (지표명, [값, ...]), 첫 td가 비었거나 지표명이 없으면 None
+    """
+    td_set = tr.xpath('.//td')
+    if not td_set or (not len(td_set[0]) and not td_set[0].text):
+        return None
+
+    indicator_name = NAME_PATTERN.search(_text(td_set[0]))
+    if not indicator_name:
+        return None
+
+    value_list = list()
+    for td in td_set[1:]:
+        txt = _text(td).replace(' ', '')
+        if txt == str():
+            break
+        value_list.append(txt)
+    return indicator_name.group(), value_list
+
+
+def _to_value_list(header, rows, year):
+    """
+        Args:
+            header: (종목명, [연도, ...])
+            rows: [(지표명, [값, ...]), ...]
+        Return:
+            (stock_kor, [[indicator_name, year, value, order_index], ...])
+    """
+    if header is None:
+        raise ValueError('Fail to find stock name and years in indicator table.')
+
+    stock_kor, year_list = header
+    now_year_index = year_list.index(str(year))
+    year_list = [each for each in year_list[:now_year_index + 1] if int(each)]
+
+    # 같은 지표명이 다시 나오면 값은 나중 것, 순서는 처음 것, dict.update와 같다.
+    indicator_dic = dict()
+    for indicator_name, value_list in rows:
+        indicator_dic[indicator_name] = value_list
+
+    total_value_list = list()
+    for indi_index, indicator_name in enumerate(indicator_dic):
+        value_list = indicator_dic[indicator_name]
+        for n, each_year in enumerate(year_list):
+            total_value_list.append([indicator_name, each_year, value_list[n], indi_index])
+    return stock_kor, total_value_list
+
+
+def parse_indicator_html(html, year=None):
+    """
+        Args:
+            year: 이 연도까지의 값만 사용한다, None이면 올해
+        Return:
+            dict(stock_kor, value_list, table_html), '__se_tbl_ext' table이 2개가 아니면 None
+            table_html은 두번째 table의 HTML
+    """
+    if not html:
+        return None
+    year = year or datetime.datetime.now().year
+    source = io.BytesIO(html.encode('utf8') if isinstance(html, str) else html)
+
+    table_count = 0
+    header, rows, table_html = None, list(), None
+    for _, element in etree.iterparse(source, events=('end',), tag='table', html=True, encoding='utf8'):
+        if not _has_table_class(element):
+            # __se_tbl_ext 안의 table은 바깥 table이 닫힐 때 읽어야 하므로 남겨둔다.
+            if not element.xpath('ancestor::table[contains(@class, "{}")]'.format(TABLE_CLASS)):
+                element.clear()
+            continue
+
+        table_count += 1
+        if table_count == 1:
+            tr_set = element.xpath('.//tr')
+            if len(tr_set) > HEADER_ROW_INDEX:
+                header = _row_values(tr_set[HEADER_ROW_INDEX])
+            rows = [row for row in map(_row_values, tr_set[INDICATOR_ROW_INDEX:]) if row is not None]
+        elif table_count == 2:
+            table_html = etree.tostring(element, encoding='unicode', method='html', with_tail=False)
+        element.clear()
+
+    if table_count != 2:
+        return None
+
+    stock_kor, value_list = _to_value_list(header, rows, year)
+    return dict(stock_kor=stock_kor, value_list=value_list, table_html=table_html)
+
+
+def parse_indicator_html_bs4(html, year=None):
+    """
+        이전 BeautifulSoup 구현, benchmark 비교용
+    """
+    from bs4 import BeautifulSoup
+
+    def get_td_list(bs_tr):
+        td_set = bs_tr.findAll('td')
+        if not td_set or not td_set[0]:
+            return None
+        indicator_name = NAME_PATTERN.search(td_set[0].text)
+        if not indicator_name:
+            return None
+
+        list_ = list()
+        for each in td_set[1:]:
+            txt = each.text.replace(' ', '')
+            if txt == str():
+                break
+            list_.append(txt)
+        return indicator_name.group(), list_
+
+    year = year or datetime.datetime.now().year
+    soup = BeautifulSoup(html, 'lxml')
+    tbl_ext_set = soup.findAll('table', {'class': TABLE_CLASS})
+    if not len(tbl_ext_set) == 2:
+        return None
+
+    tr_set = tbl_ext_set[0].findAll('tr')
+    header = get_td_list(tr_set[HEADER_ROW_INDEX]) if len(tr_set) > HEADER_ROW_INDEX else None
+    rows = [row for row in map(get_td_list, tr_set[INDICATOR_ROW_INDEX:]) if row is not None]
+
+    stock_kor, value_list = _to_value_list(header, rows, year)
+    return dict(stock_kor=stock_kor, value_list=value_list, table_html=str(tbl_ext_set[1]))
+
+
+def parse_safely(html):
+    """
+        process pool worker, 한 page의 오류가 batch 전체를 실패시키지 않도록 결과와 오류 메세지를 같이 반환한다.
+        Return:
+            (parse_indicator_html 결과, 오류 메세지)
+    """
+    try:
+        return parse_indicator_html(html), str()
+    except Exception as ex:
+        return None, str(ex)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=ParserInfo.PROCESS_POOL_SIZE)
+        return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = None
+
+
+def parse_many(html_list):
+    """
+        MIN_POOL_BATCH 보다 적으면 pickle 비용이 더 크므로 현재 process에서 parse 한다.
+        Return:
+            [(parse_indicator_html 결과, 오류 메세지), ...], html_list 순서
+    """
+    if len(html_list) < ParserInfo.MIN_POOL_BATCH or ParserInfo.PROCESS_POOL_SIZE <= 1:
+        return [parse_safely(html) for html in html_list]
+
+    chunksize = max(1, len(html_list) // (ParserInfo.PROCESS_POOL_SIZE * 4))
+    try:
+        return list(_get_executor().map(parse_safely, html_list, chunksize=chunksize))
+    except BrokenProcessPool:
+        # worker가 비정상 종료된 경우 pool을 다시 만들고 이번 batch는 현재 process에서 처리한다.
+        _reset_executor()
+        return [parse_safely(html) for html in html_list]
+
+
+def benchmark(html_list, repeat=5):
+    """
+        Return:
+            dict(pages, lxml_ms, bs4_ms, speedup, same), ms는 page 당 평균
+    """
+    def measure(parse):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            results = [parse(html) for html in html_list]
+        return (time.perf_counter() - start) * 1000 / (repeat * len(html_list)), results
+
+    lxml_ms, lxml_results = measure(parse_indicator_html)
+    bs4_ms, bs4_results = measure(parse_indicator_html_bs4)
+
+    # table_html은 serializer마다 속성 순서, 공백이 달라 비교하지 않는다.
+    same = all(
+        (a is None and b is None) or (a and b and a['stock_kor'] == b['stock_kor'] and a['value_list'] == b['value_list'])
+        for a, b in zip(lxml_results, bs4_results)
+    )
+    return dict(
+        pages=len(html_list),
+        lxml_ms=lxml_ms,
+        bs4_ms=bs4_ms,
+        speedup=bs4_ms / lxml_ms if lxml_ms else 0,
+        same=same,
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('paths', nargs='+', help='저장된 재무지표 HTML')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    pages = list()
+    for path in args.paths:
+        with open(path, 'r', encoding='utf8') as f:
+            pages.append(f.read())
+    print(benchmark(pages, args.repeat))
@@ -1,4 +1,5 @@
-from KiwoomHighChart.util import execute_db, execute_db_many
+from KiwoomHighChart.util import execute_db, execute_db_many, execute_db_values, transaction_db, stream_db
+from KiwoomHighChart.config import CollectorInfo
 
 
 class TableQueries(object):
@@ -34,6 +35,29 @@ class TableQueries(object):
     
         return execute_db(query)
     
+    @staticmethod
+    def set_daily_watermark():
+        """
+            종목별 마지막 일봉 candle_date, daily_candle 저장시 같은 transaction에서 갱신한다.
+            처음 만들어진 경우 daily_info에서 채운다.
+        """
+        query = """
+            CREATE TABLE IF NOT EXISTS daily_watermark (
+                stock_code varchar(16) NOT NULL PRIMARY KEY,
+                candle_date bigint NOT NULL
+            )
+        """
+        execute_db(query)
+
+        query = """
+            INSERT IGNORE INTO daily_watermark(stock_code, candle_date)
+            SELECT stock_code, MAX(candle_date)
+            FROM daily_info
+            WHERE NOT EXISTS (SELECT 1 FROM daily_watermark)
+            GROUP BY stock_code
+        """
+        return execute_db(query)
+
     @staticmethod
     def set_stock_info():
         query = """
@@ -48,29 +72,182 @@ class TableQueries(object):
 
 class GetQueries(object):
     @staticmethod
-    def daily_candle_by_stock_kor(stock_kor):
+    def daily_candle_range_by_stock_code(stock_code, date_from, date_to, limit):
+        """
+            date_from ~ date_to 사이 최근 limit개, candle_date 오름차순
+        """
         query = """
             SELECT candle_date, open, high, low, close
             FROM daily_info
-            JOIN stock_info ON stock_info.stock_code = daily_info.stock_code
-            WHERE stock_info.kor_name = %s
+            WHERE stock_code = %s AND (candle_date BETWEEN %s AND %s)
+            ORDER BY candle_date DESC
+            LIMIT %s
+        """
+
+        res = execute_db(query, value=(stock_code, date_from, date_to, limit))
+        return list(reversed(res))
+
+    @staticmethod
+    def candle_watermark_by_stock_code(stock_code):
+        """
+            Return:
+                (마지막 candle_date, candle 수), 과거 구간 backfill도 반영되도록 수를 함께 본다.
+        """
+        query = """
+            SELECT MAX(candle_date), COUNT(*)
+            FROM daily_info
+            WHERE stock_code = %s
+        """
+
+        res = execute_db(query, value=stock_code)
+        return tuple(res[0]) if res else (None, 0)
+
+    @staticmethod
+    def daily_candle_by_stock_code(stock_code, after=None):
+        """
+            after 보다 이후 일봉, candle_date 오름차순
+        """
+        query = """
+            SELECT candle_date, open, high, low, close
+            FROM daily_info
+            WHERE stock_code = %s AND candle_date > %s
             ORDER BY candle_date ASC
         """
-        
-        return execute_db(query, value=stock_kor)
-    
+
+        return execute_db(query, value=(stock_code, -1 if after is None else after))
+
+    @staticmethod
+    def candle_watermarks():
+        """
+            Return:
+                [(stock_code, 마지막 candle_date, candle 수), ...]
+        """
+        query = """
+            SELECT stock_code, MAX(candle_date), COUNT(*)
+            FROM daily_info
+            GROUP BY stock_code
+        """
+
+        return execute_db(query)
+
+    @staticmethod
+    def candle_ranges():
+        """
+            export watermark
+            Return:
+                [(stock_code, 첫 candle_date, 마지막 candle_date, candle 수), ...]
+        """
+        query = """
+            SELECT stock_code, MIN(candle_date), MAX(candle_date), COUNT(*)
+            FROM daily_info
+            GROUP BY stock_code
+        """
+
+        return execute_db(query)
+
+    @staticmethod
+    def stream_daily_candles(stock_code=None, before=None, after=None):
+        """
+            server-side cursor로 읽는 일봉 generator
+            Args:
+                stock_code: None이면 전체 종목
+                before, after: 있으면 candle_date < before 또는 candle_date > after 인 일봉만
+            Return:
+                (stock_code, candle_date, open, high, low, close) generator
+        """
+        if stock_code is None:
+            query = """
+                SELECT stock_code, candle_date, open, high, low, close
+                FROM daily_info
+            """
+            return stream_db(query)
+
+        query = """
+            SELECT stock_code, candle_date, open, high, low, close
+            FROM daily_info
+            WHERE stock_code = %s AND (candle_date < %s OR candle_date > %s)
+        """
+        return stream_db(query, value=(
+            stock_code,
+            -1 if before is None else before,
+            -1 if after is None else after
+        ))
+
+    @staticmethod
+    def stream_stock_indicators():
+        """
+            Return:
+                (stock_code, indicator_name, date, value, order_index) generator
+        """
+        query = """
+            SELECT stock_code, indicator_name, date, value, order_index
+            FROM stock_indicators
+        """
+
+        return stream_db(query)
+
+    @staticmethod
+    def stock_indicators_checksum():
+        """
+            값이 바뀌었는지 확인용, (row 수, row crc 합)
+        """
+        query = """
+            SELECT COUNT(*), COALESCE(SUM(CRC32(CONCAT_WS('|', stock_code, indicator_name, date, value, order_index))), 0)
+            FROM stock_indicators
+        """
+
+        res = execute_db(query)
+        return (int(res[0][0]), int(res[0][1])) if res else (0, 0)
+
+    @staticmethod
+    def indicator_version_by_stock_code(stock_code):
+        """
+            종목 지표가 바뀌었는지 확인용, (row 수, row crc 합)
+        """
+        query = """
+            SELECT COUNT(*), COALESCE(SUM(CRC32(CONCAT_WS('|', indicator_name, date, value, order_index))), 0)
+            FROM stock_indicators
+            WHERE stock_code = %s
+        """
+
+        res = execute_db(query, value=stock_code)
+        return (int(res[0][0]), int(res[0][1])) if res else (0, 0)
+
+    @staticmethod
+    def code_and_names():
+        query = """
+            SELECT stock_code, kor_name
+            FROM stock_info
+        """
+
+        return execute_db(query)
+
     @staticmethod
-    def stock_indicator_by_stock_kor(stock_kor):
+    def stock_indicator_by_stock_code(stock_code):
         query = """
             SELECT indicator_name, date, value
             FROM stock_indicators
-            JOIN stock_info ON stock_info.stock_code = stock_indicators.stock_code
-            WHERE stock_info.kor_name = %s
+            WHERE stock_code = %s
             ORDER BY order_index ASC
         """
     
-        return execute_db(query, value=stock_kor)
+        return execute_db(query, value=stock_code)
     
+    @staticmethod
+    def all_stock_indicators():
+        """
+            screener 행렬 구성용 전체 지표
+            Return:
+                [(stock_code, kor_name, indicator_name, date, value), ...]
+        """
+        query = """
+            SELECT stock_indicators.stock_code, stock_info.kor_name, indicator_name, date, value
+            FROM stock_indicators
+            JOIN stock_info ON stock_info.stock_code = stock_indicators.stock_code
+        """
+
+        return execute_db(query)
+
     @staticmethod
     def is_exist_table_by_stock_code(stock_kor):
         query = """
@@ -84,6 +261,37 @@ class GetQueries(object):
         res = execute_db(query, value=stock_kor)
         return res
     
+    @staticmethod
+    def stock_code_by_kor(stock_kor):
+        query = """
+            SELECT stock_code
+            FROM stock_info
+            WHERE kor_name = %s
+        """
+
+        res = execute_db(query, value=stock_kor)
+        return res[0][0] if res else None
+
+    @staticmethod
+    def latest_candle_dates():
+        """
+            Return:
+                {stock_code: 마지막 candle_date}, 수집 시작시 1회 조회한다.
+        """
+        if CollectorInfo.USE_WATERMARK_TABLE:
+            query = """
+                SELECT stock_code, candle_date
+                FROM daily_watermark
+            """
+        else:
+            query = """
+                SELECT stock_code, MAX(candle_date)
+                FROM daily_info
+                GROUP BY stock_code
+            """
+
+        return dict(execute_db(query))
+
     @staticmethod
     def is_exist_indicator_by_stock_code(stock_kor):
         query = """
@@ -101,24 +309,133 @@ class GetQueries(object):
 class PutQueries(object):
     @staticmethod
     def indicator(value_list, stock_kor):
-        query = """
+        """
+            stock_code는 batch 당 1회만 조회한다.
+            Args:
+                value_list: [[indicator_name, date, value, order_index], ...]
+        """
+        stock_code = GetQueries.stock_code_by_kor(stock_kor)
+        if stock_code is None:
+            raise ValueError('unknown stock kor name, [{}]'.format(stock_kor))
+
+        query_prefix = """
             INSERT INTO stock_indicators(stock_code, indicator_name, date, value, order_index)
-            VALUES ((SELECT stock_code FROM stock_info WHERE kor_name = %s), %s, %s, %s, %s)
+            VALUES """
+        query_suffix = """
             ON DUPLICATE KEY UPDATE
             date = VALUES(date),
             value = VALUES(value)
-
         """
 
-        return execute_db_many(query, value_list, stock_kor)
+        return execute_db_values([(query_prefix, [[stock_code, *each] for each in value_list], query_suffix)])
     
+    @staticmethod
+    def indicator_diff(value_list, stock_code):
+        """
+            저장된 지표와 비교해 바뀐 row만 INSERT, UPDATE, DELETE 한다.
+            비교와 쓰기는 하나의 transaction이고, 저장된 row는 FOR UPDATE로 잠가 같은 종목의 동시 업로드를 순서대로 처리한다.
+            Args:
+                value_list: [[indicator_name, date, value, order_index], ...]
+            Return:
+                dict(inserted, updated, deleted, skipped)
+        """
+        incoming = {(indicator_name, int(date)): (value, order_index)
+                    for indicator_name, date, value, order_index in value_list}
+
+        with transaction_db('indicator diff') as cursor:
+            cursor.execute("""
+                SELECT indicator_name, date, value, order_index
+                FROM stock_indicators
+                WHERE stock_code = %s
+                FOR UPDATE
+            """, (stock_code,))
+            stored = {(indicator_name, date): (value, order_index)
+                      for indicator_name, date, value, order_index in cursor.fetchall()}
+
+            insert_list, update_list = list(), list()
+            for (indicator_name, date), (value, order_index) in incoming.items():
+                old = stored.get((indicator_name, date))
+                if old is None:
+                    insert_list.append((stock_code, indicator_name, date, value, order_index))
+                elif old != (value, order_index):
+                    update_list.append((value, order_index, stock_code, indicator_name, date))
+            delete_list = [(stock_code, indicator_name, date)
+                           for indicator_name, date in stored if (indicator_name, date) not in incoming]
+
+            # key 비교는 collation 기준이므로 지운 후 넣는다.
+            if delete_list:
+                cursor.executemany("""
+                    DELETE FROM stock_indicators
+                    WHERE stock_code = %s AND indicator_name = %s AND date = %s
+                """, delete_list)
+            if update_list:
+                cursor.executemany("""
+                    UPDATE stock_indicators SET value = %s, order_index = %s
+                    WHERE stock_code = %s AND indicator_name = %s AND date = %s
+                """, update_list)
+            if insert_list:
+                cursor.executemany("""
+                    INSERT INTO stock_indicators(stock_code, indicator_name, date, value, order_index)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                    value = VALUES(value),
+                    order_index = VALUES(order_index)
+                """, insert_list)
+
+        return dict(
+            inserted=len(insert_list),
+            updated=len(update_list),
+            deleted=len(delete_list),
+            skipped=len(incoming) - len(insert_list) - len(update_list)
+        )
+
     @staticmethod
     def daily_candle(stock_code, value_list):
-        query = """
+        return PutQueries.daily_candle_many([[stock_code, *each] for each in value_list])
+
+    @staticmethod
+    def daily_candle_many(row_list):
+        """
+            여러 종목의 일봉을 1 transaction으로 저장한다.
+            Args:
+                row_list: [[stock_code, candle_date, open, high, low, close], ...]
+        """
+        query_prefix = """
             INSERT IGNORE INTO daily_info(stock_code, candle_date, open, high, low, close)
-            VALUES (%s, %s, %s, %s, %s, %s)
+            VALUES """
+        statement_list = [(query_prefix, row_list, '')]
+
+        if CollectorInfo.USE_WATERMARK_TABLE:
+            watermarks = dict()
+            for row in row_list:
+                watermarks[row[0]] = max(watermarks.get(row[0], row[1]), row[1])
+
+            watermark_prefix = """
+                INSERT INTO daily_watermark(stock_code, candle_date)
+                VALUES """
+            watermark_suffix = """
+                ON DUPLICATE KEY UPDATE
+                candle_date = GREATEST(candle_date, VALUES(candle_date))
+            """
+            statement_list.append((watermark_prefix, list(watermarks.items()), watermark_suffix))
+
+        return execute_db_values(statement_list)
+
+    @staticmethod
+    def refresh_daily_watermark():
+        """
+            bulk load 처럼 daily_candle_many를 거치지 않고 적재한 경우 daily_info 기준으로 다시 맞춘다.
         """
-        return execute_db_many(query, value_list, stock_code)
+        query = """
+            INSERT INTO daily_watermark(stock_code, candle_date)
+            SELECT stock_code, MAX(candle_date)
+            FROM daily_info
+            GROUP BY stock_code
+            ON DUPLICATE KEY UPDATE
+            candle_date = GREATEST(daily_watermark.candle_date, VALUES(candle_date))
+        """
+
+        return execute_db(query)
     
     @staticmethod
     def code_and_name(total_codes):
@@ -0,0 +1,95 @@
+from KiwoomHighChart.config import ResampleInfo
+
+import numpy as np
+
+"""
+    긴 구간 차트용 일봉 downsampling
+    week, month: 주(월요일 시작), 월 단위 OHLC, 시가는 첫 일봉, 고가/저가는 최대/최소, 종가는 마지막 일봉
+    lttb: Largest-Triangle-Three-Buckets, 종가 기준으로 모양이 유지되는 일봉 points개를 골라 그대로 반환한다.
+
+    입력은 candle_date 오름차순 shape (5, n) 배열 [candle_date, open, high, low, close]
+    candle_date는 수집 PC 현지 시간 00:00의 ms 이므로 UTC_OFFSET_HOURS 만큼 더해 날짜를 구한다.
+"""
+
+DAY_MS = 24 * 60 * 60 * 1000
+INTERVALS = ('week', 'month', 'lttb')
+
+
+def bucket_keys(t, interval):
+    """
+        Return:
+            candle 별 기간 번호, 같은 주/월이면 같은 값
+    """
+    days = (np.asarray(t, dtype=np.int64) + ResampleInfo.UTC_OFFSET_HOURS * 60 * 60 * 1000) // DAY_MS
+    if interval == 'week':
+        # 1970-01-01은 목요일, 3일을 더하면 월요일 시작
+        return (days + 3) // 7
+    if interval == 'month':
+        return days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    raise ValueError('unknown interval, [{}]'.format(interval))
+
+
+def resample_ohlc(data, interval):
+    """
+        Return:
+            shape (5, 기간 수), candle_date는 기간의 첫 일봉
+    """
+    if not data.shape[1]:
+        return data
+    keys = bucket_keys(data[0], interval)
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(keys)) + 1])
+    ends = np.concatenate([starts[1:], [data.shape[1]]]) - 1
+    return np.stack([
+        data[0, starts],
+        data[1, starts],
+        np.maximum.reduceat(data[2], starts),
+        np.minimum.reduceat(data[3], starts),
+        data[4, ends],
+    ])
+
+
+def lttb_indices(x, y, threshold):
+    """
+        Largest-Triangle-Three-Buckets
+        처음과 마지막 점은 유지하고, 가운데를 threshold - 2개 bucket으로 나눠
+        이전에 고른 점, 현재 bucket의 점, 다음 bucket 평균이 이루는 삼각형 넓이가 가장 큰 점을 고른다.
+        Return:
+            고른 index 배열, threshold 이하이면 전체
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else n
+        average_x = x[next_start:next_end].mean()
+        average_y = y[next_start:next_end].mean()
+
+        # 넓이의 2배, 비교만 하므로 나누지 않는다.
+        area = np.abs(
+            (x[previous] - average_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (average_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample(data, interval, points=None):
+    """
+        Args:
+            data: shape (5, n) 일봉
+            interval: INTERVALS 중 하나
+            points: lttb의 목표 점 수
+    """
+    if interval == 'lttb':
+        return data[:, lttb_indices(data[0], data[4], points)]
+    return resample_ohlc(data, interval)
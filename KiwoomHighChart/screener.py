@@ -0,0 +1,185 @@
+from KiwoomHighChart.config import ScreenerInfo
+from KiwoomHighChart.query import GetQueries
+from KiwoomHighChart.names import stock_names
+
+from Util.pyinstaller_patch import debugger
+
+import numpy as np
+
+import threading
+import time
+
+"""
+    전체 종목 지표 screener
+    stock_indicators(varchar value)를 (종목 x 지표 x 연도) float 행렬로 만들어 두고 범위 조건, 정렬, top-N을 배열 연산으로 처리한다.
+    PutStockIndicators가 저장한 종목은 즉시 반영하고, 다른 process에서 저장된 값은 REFRESH_SECONDS 마다 전체를 다시 만든다.
+"""
+
+
+def to_number(value):
+    """
+        '1,234.5' -> 1234.5, '-', 'N/A', '' 등은 nan
+    """
+    try:
+        return float(str(value).replace(',', ''))
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class MatrixState(object):
+    """
+        읽기 전용 snapshot, 갱신시 새 객체로 교체하므로 조회 중에는 lock이 필요 없다.
+    """
+    def __init__(self, stocks, indicators, years, values):
+        self.stocks = stocks
+        self.stock_index = {stock_code: index for index, (stock_code, _) in enumerate(stocks)}
+        self.indicators = indicators
+        self.indicator_index = {name: index for index, name in enumerate(indicators)}
+        self.years = years
+        self.year_index = {year: index for index, year in enumerate(years)}
+        self.values = values
+
+
+def build_state(rows, base=None):
+    """
+        Args:
+            rows: [(stock_code, kor_name, indicator_name, date, value), ...]
+            base: 기존 snapshot, 있으면 rows의 종목만 교체한 새 snapshot을 만든다.
+    """
+    stocks = list(base.stocks) if base else list()
+    indicators = list(base.indicators) if base else list()
+    years = list(base.years) if base else list()
+    stock_index = dict(base.stock_index) if base else dict()
+    indicator_index = dict(base.indicator_index) if base else dict()
+    year_index = dict(base.year_index) if base else dict()
+
+    positions, numbers = list(), list()
+    for stock_code, kor_name, indicator_name, date, value in rows:
+        if stock_code not in stock_index:
+            stock_index[stock_code] = len(stocks)
+            stocks.append((stock_code, kor_name))
+        if indicator_name not in indicator_index:
+            indicator_index[indicator_name] = len(indicators)
+            indicators.append(indicator_name)
+        if date not in year_index:
+            year_index[date] = len(years)
+            years.append(date)
+        positions.append((stock_index[stock_code], indicator_index[indicator_name], year_index[date]))
+        numbers.append(to_number(value))
+
+    values = np.full((len(stocks), len(indicators), len(years)), np.nan)
+    if base is not None:
+        old = base.values
+        values[:old.shape[0], :old.shape[1], :old.shape[2]] = old
+        # 전달된 종목은 기존 값을 지우고 새로 채운다.
+        values[sorted({position[0] for position in positions})] = np.nan
+
+    if positions:
+        position_array = np.array(positions, dtype=np.int64)
+        values[position_array[:, 0], position_array[:, 1], position_array[:, 2]] = numbers
+
+    return MatrixState(stocks, indicators, years, values)
+
+
+class IndicatorMatrix(object):
+    def __init__(self, refresh_seconds):
+        self._refresh_seconds = refresh_seconds
+        self._state = None
+        self._built_at = 0
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        if self._state is None or time.time() - self._built_at > self._refresh_seconds:
+            with self._lock:
+                if self._state is None or time.time() - self._built_at > self._refresh_seconds:
+                    self.rebuild()
+        return self._state
+
+    def rebuild(self):
+        start = time.time()
+        self._state = build_state(GetQueries.all_stock_indicators())
+        self._built_at = time.time()
+        debugger.debug('indicator matrix rebuild, shape=[{}], [{:.1f}ms]'.format(
+            self._state.values.shape, (time.time() - start) * 1000))
+
+    def update_stock(self, stock_kor):
+        """
+            PutStockIndicators 저장 직후 해당 종목만 교체한다.
+        """
+        with self._lock:
+            if self._state is None:
+                return
+            stock_code = stock_names.code_by_kor(stock_kor)
+            if stock_code is None:
+                return
+            rows = [
+                (stock_code, stock_kor, indicator_name, date, value)
+                for indicator_name, date, value in GetQueries.stock_indicator_by_stock_code(stock_code)
+            ]
+            if not rows and stock_code in self._state.stock_index:
+                # 값이 모두 지워진 경우
+                values = self._state.values.copy()
+                values[self._state.stock_index[stock_code]] = np.nan
+                self._state = MatrixState(self._state.stocks, self._state.indicators, self._state.years, values)
+                return
+            self._state = build_state(rows, self._state)
+
+    def screen(self, year=None, filters=None, sort=None, descending=False, limit=ScreenerInfo.DEFAULT_LIMIT,
+               columns=None):
+        """
+            Args:
+                year: 대상 연도, None이면 가장 최근 연도
+                filters: [(indicator_name, min or None, max or None), ...], 값이 없는 종목은 제외된다.
+                sort: 정렬 기준 지표, 값이 없는 종목은 뒤로 간다.
+                columns: 반환할 지표, None이면 filters와 sort에 쓰인 지표
+            Return:
+                (year, columns, matched count, [[stock_code, kor_name, values...], ...])
+        """
+        state = self.snapshot()
+        filters = filters or list()
+        if columns is None:
+            columns = list(dict.fromkeys([name for name, _, _ in filters] + ([sort] if sort else list())))
+
+        for name in [name for name, _, _ in filters] + list(columns) + ([sort] if sort else list()):
+            if name not in state.indicator_index:
+                raise ValueError('unknown indicator, [{}]'.format(name))
+
+        if year is None:
+            if not state.years:
+                return None, columns, 0, list()
+            year = max(state.years)
+        if year not in state.year_index:
+            return year, columns, 0, list()
+
+        plane = state.values[:, :, state.year_index[year]]
+        mask = np.ones(plane.shape[0], dtype=bool)
+        for name, minimum, maximum in filters:
+            column = plane[:, state.indicator_index[name]]
+            mask &= ~np.isnan(column)
+            if minimum is not None:
+                mask &= column >= minimum
+            if maximum is not None:
+                mask &= column <= maximum
+
+        matched = np.flatnonzero(mask)
+        if sort:
+            key = plane[matched, state.indicator_index[sort]]
+            key = np.where(np.isnan(key), np.inf, -key if descending else key)
+            if limit < len(matched):
+                top = np.argpartition(key, limit)[:limit]
+                order = top[np.argsort(key[top], kind='stable')]
+            else:
+                order = np.argsort(key, kind='stable')
+            selected = matched[order]
+        else:
+            selected = matched[:limit]
+
+        column_index = [state.indicator_index[name] for name in columns]
+        table = plane[selected][:, column_index].astype(object)
+        table[np.isnan(plane[selected][:, column_index])] = None
+
+        rows = [list(state.stocks[stock]) + values for stock, values in zip(selected.tolist(), table.tolist())]
+        return year, columns, len(matched), rows
+
+
+indicator_matrix = IndicatorMatrix(ScreenerInfo.REFRESH_SECONDS)
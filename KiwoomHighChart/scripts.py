@@ -1,30 +1,113 @@
-from KiwoomHighChart.util import execute_db, execute_db_many
+from KiwoomHighChart.util import connection_db
 from KiwoomHighChart.config import IndicatorDict
 
+from Util.pyinstaller_patch import debugger
+
+import argparse
+import time
+
 """
-    특정 데이터에 int 넣어주기,
-    
+    대량 데이터 보정용 set-based migration 도구
+    row 단위 UPDATE 대신 기준 값을 임시 table에 올리고 JOIN UPDATE 한번을 key 범위 단위로 나눠 실행한다.
+    범위마다 commit 하므로 lock은 짧게 잡히고, 중단 후 다시 실행해도 같은 결과가 된다.
+
+    usage:
+        python -m KiwoomHighChart.scripts order_index --chunk 100
 """
 
-def script():
-    all_query = """
-        SELECT stock_code, indicator_name
-        from stock_indicators
-    """
-    
-    res = execute_db(all_query)
-    
-    l_r = list(res)
-    
-    for each in l_r:
-        code, indi_name = each
-        index = IndicatorDict.SET.get(indi_name, IndicatorDict.OTHER)
-        query = """
-            UPDATE stock_indicators SET order_index = %s
-            WHERE stock_code = %s and indicator_name = %s
-        """
-        res = execute_db(query, (index, code, indi_name))
-
-    
+DEFAULT_CHUNK_KEYS = 100
+
+
+def load_temp_table(cursor, table, columns_ddl, rows):
+    """
+        connection이 끝나면 사라지는 TEMPORARY table을 만들고 rows를 넣는다.
+        Args:
+            columns_ddl: 'indicator_name varchar(32) NOT NULL PRIMARY KEY, order_index int'
+    """
+    cursor.execute('DROP TEMPORARY TABLE IF EXISTS {}'.format(table))
+    cursor.execute('CREATE TEMPORARY TABLE {} ({})'.format(table, columns_ddl))
+    if rows:
+        placeholders = ', '.join(['%s'] * len(rows[0]))
+        cursor.executemany('INSERT INTO {} VALUES ({})'.format(table, placeholders), [tuple(each) for each in rows])
+
+
+def key_chunks(cursor, table, key, chunk_keys):
+    """
+        key의 distinct 값을 chunk_keys 개씩 묶은 (첫 값, 마지막 값) 범위
+        key는 index의 선두 column이어야 범위 조건이 index range scan이 된다.
+    """
+    cursor.execute('SELECT DISTINCT {key} FROM {table} ORDER BY {key}'.format(key=key, table=table))
+    keys = [row[0] for row in cursor.fetchall()]
+    return [(keys[index], keys[min(index + chunk_keys, len(keys)) - 1]) for index in range(0, len(keys), chunk_keys)]
+
+
+def run_chunked(name, statement, table, key, chunk_keys=DEFAULT_CHUNK_KEYS, setup=None, value=()):
+    """
+        statement를 key 범위마다 실행하고 범위마다 commit 한다.
+        Args:
+            statement: 마지막 두 parameter가 범위의 시작, 끝인 query
+                ex) 'UPDATE t ... WHERE t.stock_code BETWEEN %s AND %s'
+            setup: 같은 connection에서 먼저 실행할 함수 f(cursor), 임시 table 생성 등
+            value: 범위 앞에 붙는 parameter
+        Return:
+            dict(name, chunks, rows, seconds), rows는 변경된 row 수
+    """
+    start = time.time()
+    total_rows = 0
+    # TEMPORARY table은 connection 단위이므로 전체 작업을 하나의 connection에서 한다.
+    with connection_db() as con:
+        with con.cursor() as cursor:
+            if setup is not None:
+                setup(cursor)
+                con.commit()
+
+            chunks = key_chunks(cursor, table, key, chunk_keys)
+            for index, (first, last) in enumerate(chunks, 1):
+                rows = cursor.execute(statement, tuple(value) + (first, last))
+                con.commit()
+                total_rows += rows
+
+                elapsed = time.time() - start
+                debugger.info('[{}] chunk [{}/{}], key=[{} ~ {}], rows=[{}], total=[{}], [{:.1f}s], eta=[{:.1f}s]'.format(
+                    name, index, len(chunks), first, last, rows, total_rows, elapsed,
+                    elapsed / index * (len(chunks) - index)))
+
+    result = dict(name=name, chunks=len(chunks), rows=total_rows, seconds=time.time() - start)
+    debugger.info('[{}] done, rows=[{}], [{:.1f}s]'.format(name, total_rows, result['seconds']))
+    return result
+
+
+def backfill_order_index(chunk_keys=DEFAULT_CHUNK_KEYS):
+    """
+        stock_indicators.order_index를 IndicatorDict.SET 기준으로 채운다, 없는 지표는 IndicatorDict.OTHER
+    """
+    def setup(cursor):
+        load_temp_table(
+            cursor,
+            'tmp_indicator_order',
+            'indicator_name varchar(32) NOT NULL PRIMARY KEY, order_index int NOT NULL',
+            list(IndicatorDict.SET.items())
+        )
+
+    statement = """
+        UPDATE stock_indicators
+        LEFT JOIN tmp_indicator_order ON tmp_indicator_order.indicator_name = stock_indicators.indicator_name
+        SET stock_indicators.order_index = COALESCE(tmp_indicator_order.order_index, %s)
+        WHERE stock_indicators.stock_code BETWEEN %s AND %s
+    """
+    return run_chunked('order_index', statement, 'stock_indicators', 'stock_code', chunk_keys, setup,
+                       value=(IndicatorDict.OTHER,))
+
+
+TASKS = {
+    'order_index': backfill_order_index,
+}
+
+
 if __name__ == '__main__':
-    script()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('task', choices=sorted(TASKS))
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK_KEYS, help='한 번에 처리할 key 수')
+    args = parser.parse_args()
+
+    print(TASKS[args.task](args.chunk))
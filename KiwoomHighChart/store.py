@@ -0,0 +1,195 @@
+from KiwoomHighChart.config import StoreInfo
+from KiwoomHighChart.query import GetQueries
+
+from Util.pyinstaller_patch import debugger
+
+import numpy as np
+
+import json
+import os
+import threading
+import time
+
+"""
+    daily_info의 읽기 전용 columnar 사본, MySQL이 원본이다.
+    종목별로 shape (5, n) int64 배열 [candle_date, open, high, low, close]를 .npy로 저장하고 mmap으로 연다.
+    여러 server process가 같은 파일을 page cache로 공유한다.
+
+    파일은 덮어쓰지 않고 '{stock_code}_{n}_{last_candle_date}.npy' 로 새로 쓴 후 manifest.json을 교체한다.
+    Windows에서는 mmap 으로 열린 파일을 교체할 수 없기 때문이다.
+
+    usage:
+        python -m KiwoomHighChart.store
+"""
+
+COLUMNS = ('t', 'o', 'h', 'l', 'c')
+MANIFEST_NAME = 'manifest.json'
+
+
+class CandleStore(object):
+    def __init__(self, path):
+        self._path = path
+        self._manifest = dict(codes=dict(), names=dict())
+        self._manifest_mtime = None
+        self._arrays = dict()
+        self._lock = threading.Lock()
+
+    def _manifest_path(self):
+        return os.path.join(self._path, MANIFEST_NAME)
+
+    def _refresh(self):
+        """
+            manifest가 바뀐 경우에만 다시 읽는다, 요청마다 stat 1회
+        """
+        try:
+            mtime = os.stat(self._manifest_path()).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._manifest_mtime:
+            return
+
+        with self._lock:
+            if mtime == self._manifest_mtime:
+                return
+            try:
+                with open(self._manifest_path(), 'r', encoding='utf8') as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                # 교체 도중이면 다음 요청에서 다시 읽는다.
+                return
+            self._manifest = manifest
+            self._manifest_mtime = mtime
+            self._arrays = {
+                code: array for code, array in self._arrays.items()
+                if manifest['codes'].get(code, dict()).get('file') == array.filename_key
+            }
+
+    def code_by_kor(self, stock_kor):
+        self._refresh()
+        return self._manifest['names'].get(stock_kor)
+
+    def version(self, stock_code):
+        """
+            Return:
+                저장된 파일 이름, 없으면 None, 응답 cache key의 watermark로 사용한다.
+        """
+        self._refresh()
+        entry = self._manifest['codes'].get(stock_code)
+        return entry['file'] if entry else None
+
+    def read(self, stock_code):
+        """
+            Return:
+                shape (5, n) read-only mmap 배열, 없으면 None
+        """
+        self._refresh()
+        entry = self._manifest['codes'].get(stock_code)
+        if entry is None:
+            return None
+
+        array = self._arrays.get(stock_code)
+        if array is None or array.filename_key != entry['file']:
+            array = _MappedArray(np.load(os.path.join(self._path, entry['file']), mmap_mode='r'), entry['file'])
+            with self._lock:
+                self._arrays[stock_code] = array
+        return array.data
+
+    def slice(self, stock_code, date_from=None, date_to=None, limit=None):
+        """
+            candle_date 범위 내 최근 limit개, 복사 없이 mmap 배열의 view를 반환한다.
+        """
+        data = self.read(stock_code)
+        if data is None:
+            return None
+
+        t = data[0]
+        start = 0 if date_from is None else int(np.searchsorted(t, date_from, side='left'))
+        end = len(t) if date_to is None else int(np.searchsorted(t, date_to, side='right'))
+        if limit is not None:
+            start = max(start, end - limit)
+        return data[:, start:end]
+
+    def rebuild(self, codes=None):
+        """
+            DB와 달라진 종목만 다시 쓴다.
+            새 일봉만 추가된 경우 기존 배열 뒤에 붙이고, 과거 구간이 채워진 경우 해당 종목 전체를 다시 읽는다.
+            Args:
+                codes: 대상 종목, None이면 전체
+            Return:
+                갱신된 종목 수
+        """
+        start = time.time()
+        os.makedirs(self._path, exist_ok=True)
+        self._refresh()
+        old_codes = dict(self._manifest['codes'])
+        new_codes = dict(old_codes)
+
+        updated, appended = 0, 0
+        for stock_code, last_candle_date, count in GetQueries.candle_watermarks():
+            if codes is not None and stock_code not in codes:
+                continue
+            entry = old_codes.get(stock_code)
+            if entry and entry['n'] == count and entry['last'] == last_candle_date:
+                continue
+
+            base = None
+            if entry and entry['last'] < last_candle_date:
+                base = np.load(os.path.join(self._path, entry['file']))
+                rows = GetQueries.daily_candle_by_stock_code(stock_code, entry['last'])
+                if entry['n'] + len(rows) != count:
+                    base = None
+                else:
+                    appended += 1
+
+            if base is None:
+                rows = GetQueries.daily_candle_by_stock_code(stock_code)
+
+            new_data = np.array(rows, dtype=np.int64).reshape(-1, len(COLUMNS)).T
+            data = new_data if base is None else np.concatenate([base, new_data], axis=1)
+
+            file_name = '{}_{}_{}.npy'.format(stock_code, data.shape[1], int(data[0, -1]) if data.shape[1] else 0)
+            np.save(os.path.join(self._path, file_name), np.ascontiguousarray(data))
+            new_codes[stock_code] = dict(file=file_name, n=int(data.shape[1]),
+                                         last=int(data[0, -1]) if data.shape[1] else 0)
+            updated += 1
+
+        names = {kor_name: stock_code for stock_code, kor_name in GetQueries.code_and_names()}
+        self._write_manifest(dict(codes=new_codes, names=names))
+        self._remove_unused(new_codes)
+
+        debugger.info('candle store rebuild, updated=[{}], appended=[{}], [{:.1f}s]'.format(
+            updated, appended, time.time() - start))
+        return updated
+
+    def _write_manifest(self, manifest):
+        tmp_path = '{}.tmp'.format(self._manifest_path())
+        with open(tmp_path, 'w', encoding='utf8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._manifest_path())
+
+    def _remove_unused(self, codes):
+        in_use = {entry['file'] for entry in codes.values()}
+        for file_name in os.listdir(self._path):
+            if file_name.endswith('.npy') and file_name not in in_use:
+                try:
+                    os.remove(os.path.join(self._path, file_name))
+                except OSError:
+                    # 다른 process가 아직 mmap 중이면 다음 rebuild에서 지운다.
+                    pass
+
+
+class _MappedArray(object):
+    __slots__ = ('data', 'filename_key')
+
+    def __init__(self, data, filename_key):
+        self.data = data
+        self.filename_key = filename_key
+
+
+candle_store = CandleStore(StoreInfo.PATH)
+
+
+if __name__ == '__main__':
+    print(candle_store.rebuild())
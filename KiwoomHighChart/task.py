@@ -1,4 +1,5 @@
 from StockApis.kiwoom import KiwoomAPIModule
+from StockApis.name_cache import StockNameCache
 from PyQt5.QAxContainer import QAxWidget
 from PyQt5 import (
     QtCore
@@ -8,11 +9,12 @@ from PyQt5.QtCore import pyqtSignal
 
 from multiprocessing import Queue
 
-import queue
-import random
-
 from Util.pyinstaller_patch import *
-from KiwoomHighChart.query import GetQueries, PutQueries, TableQueries
+from KiwoomHighChart.query import PutQueries, TableQueries
+from KiwoomHighChart.collector import DailyCandleCollector
+from KiwoomHighChart.config import CollectorInfo, StoreInfo
+from KiwoomHighChart.store import candle_store
+from KiwoomHighChart.names import stock_names
 
 """
     checklist
@@ -67,7 +69,7 @@ class KiwoomThread(QtCore.QThread):
         self.result_queue = res_queue
         self.remain_codes = remains
         
-        self._total_queue = Queue()
+        self.collector = None
         self.daemon = True
 
     def run(self):
@@ -76,8 +78,14 @@ class KiwoomThread(QtCore.QThread):
                 if self.kiwoom_api.is_connected:
                     break
                 time.sleep(1)
+            # 전날기준 600일 이전 값
+            latest_date = datetime.datetime.now() - datetime.timedelta(days=1)
+            self.collector = DailyCandleCollector(self.kiwoom_api, latest_date)
+
             TableQueries.set_stock_info()
             TableQueries.set_daily_info()
+            if CollectorInfo.USE_WATERMARK_TABLE:
+                TableQueries.set_daily_watermark()
             if not self.remain_codes:
                 # 첫 시작, 혹은 정상적인 시작의 경우 remain_codes는 none이다.
                 TableQueries.set_stock_info()
@@ -85,7 +93,14 @@ class KiwoomThread(QtCore.QThread):
                 total_codes, _ = self.insert_all_stocks_code_name()
                 self.remain_codes = total_codes
 
-            res = self.get_all_stocks_daily_candle(self.remain_codes)
+            res = self.collector.collect(self.remain_codes)
+
+            if StoreInfo.ENABLED:
+                try:
+                    # 이번 실행에서 저장된 종목만 다시 쓴다.
+                    candle_store.rebuild()
+                except Exception:
+                    debugger.exception('fail to rebuild the candle store')
 
             if res is True:
                 # 정상적으로 종료가 된 경우.
@@ -106,91 +121,28 @@ class KiwoomThread(QtCore.QThread):
         totals = dict()
         for index in indexes:
             code_list = codes[index:end]
+            self.collector.limiter.acquire()
             self.kiwoom_api.get_all_stock_korean_name(scn, code_list, self._queue)
             res = self._queue.get(timeout=20)
             totals.update(res)
             end = index
-            time.sleep(0.2)
         return totals
     
-    def get_stocks_daily_candle_not_entered(self, data_set, date):
-        for n, data in enumerate(data_set):
-            if date in data:
-                # 오늘 제외, 전날부터 미입력 값 넣어야 함.
-                # 최대 600일전까지 나오는데, 그정도로 값이 갱신이 안되진 않을 것이라고 판단함.
-                return data_set[:n]
-    
     def insert_all_stocks_code_name(self):
         codes = self.kiwoom_api.get_stock_codes()
-        kospi_codes = self.get_index_stock_names('9542', codes['kospi'])
-        kosdaq_codes = self.get_index_stock_names('9543', codes['kosdaq'])
-        total_code_name_set = dict(**kospi_codes, **kosdaq_codes)
+        # 오늘 처음 실행이 아니면 신규 종목만 TR로 받는다.
+        names = StockNameCache().get_names(codes, self.get_index_stock_names)
+        total_code_name_set = dict(**names['kospi'], **names['kosdaq'])
         total_codes = codes['kospi'] + codes['kosdaq']
         try:
             PutQueries.code_and_name(total_code_name_set)
+            # 같은 process의 index는 바로 갱신, server process는 없는 종목명이 조회되면 다시 읽는다.
+            stock_names.refresh()
         except Exception as ex:
             debugger.debug('fail to update stock codes&names, [{}]'.format(ex))
         
         return total_codes, total_code_name_set
 
-    def get_all_stocks_daily_candle(self, total_codes):
-        # 전날기준 600일 이전 값
-        latest_date = (datetime.datetime.now() - datetime.timedelta(days=1))
-        for n, code in enumerate(total_codes):
-            if not code:
-                # 코드값이 비어있는 경우가 있음.
-                continue
-            
-            repeat = 0
-            input_date = GetQueries.is_exist_table_by_stock_code(code)  # timestamp
-            input_date = list(input_date)
-        
-            get_total_data_thread = threading.Thread(target=self.get_all_daily_thread,
-                                                     args=[code, latest_date, input_date, repeat],
-                                                     daemon=True)
-            get_total_data_thread.start()
-            try:
-                total_data_set = self._total_queue.get(timeout=10)
-            except queue.Empty:
-                debugger.debug('daily candle get failed from [{}]'.format(code))
-                after = total_codes[n:]
-                return after
-        
-            if total_data_set:
-                try:
-                    PutQueries.daily_candle(code, total_data_set)
-                except Exception as ex:
-                    debugger.info('fail to put the daily_candle from = [{}]'.format(code))
-            time.sleep(random.randrange(200, 4000) / 1000)
-        return True
-
-    def get_all_daily_thread(self, *args):
-        code, latest_date, input_date, repeat = args
-        total_data_set = list()
-        while True:
-            self.kiwoom_api.get_all_daily_candle(code, latest_date.strftime('%Y%m%d'), self._queue,
-                                                 repeat=repeat)
-            is_repeat, data_set = self._queue.get(timeout=10)
-            repeat = 2
-        
-            if input_date:
-                # 기존 데이터가 있는 경우, 1회 데이터 추가
-                not_entered = self.get_stocks_daily_candle_not_entered(data_set, input_date[0][0])
-                if not_entered:
-                    total_data_set += not_entered
-                break
-            else:
-                # 반복시 마지막 날짜를 기준으로 가져오므로
-                if is_repeat is False:
-                    # 반복상태가 아닌 경우 break해서 수집종료
-                    total_data_set += data_set
-                    break
-                else:
-                    total_data_set += data_set[:-1]
-                time.sleep(random.randrange(200, 4000) / 1000)
-        self._total_queue.put(total_data_set)
-        return
-
 
 def processor(res_queue, remains):
     app = QApplication(sys.argv)
@@ -0,0 +1,136 @@
+from KiwoomHighChart import collector
+from KiwoomHighChart.collector import TrRateLimiter, CollectorCheckpoint, CandleWriter
+from KiwoomHighChart.query import PutQueries
+
+import json
+
+import pytest
+
+
+class FakeClock(object):
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.sleeps = list()
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(collector, 'time', fake)
+    return fake
+
+
+def test_rate_limiter_waits_for_every_window(clock):
+    limiter = TrRateLimiter([(2, 1), (3, 10)])
+
+    waits, sent = list(), list()
+    for _ in range(7):
+        waits.append(limiter.acquire())
+        sent.append(clock.now)
+
+    # 초당 2회 한도로 1초, 10초당 3회 한도로 첫 요청 후 10초까지 대기한다.
+    assert waits[:4] == [0, 0, pytest.approx(1), pytest.approx(9)]
+    for count, seconds in [(2, 1), (3, 10)]:
+        for index in range(len(sent) - count):
+            assert sent[index + count] - sent[index] >= seconds
+
+
+def test_rate_limiter_continues_previous_history(clock):
+    limiter = TrRateLimiter([(2, 60)], history=[clock.now - 30, clock.now - 10])
+
+    assert limiter.acquire() == pytest.approx(30)
+
+
+def test_rate_limiter_drops_expired_history(clock):
+    limiter = TrRateLimiter([(1, 5)], history=[clock.now - 100])
+
+    assert limiter.acquire() == 0
+    assert limiter.history() == [clock.now]
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = str(tmp_path / 'checkpoint.json')
+    checkpoint = CollectorCheckpoint(path, '20261019')
+    checkpoint.mark_done('005930')
+    checkpoint.set_partial('000660', 1700000000000, 1600000000000)
+    checkpoint.save([1.0, 2.0])
+
+    loaded = CollectorCheckpoint(path, '20261019')
+    assert loaded.is_done('005930')
+    assert loaded.done_count == 1
+    assert loaded.get_partial('000660') == [1700000000000, 1600000000000]
+    assert loaded.tr_history == [1.0, 2.0]
+
+    loaded.mark_done('000660')
+    assert loaded.get_partial('000660') is None
+
+
+def test_checkpoint_new_target_date_keeps_partial_only(tmp_path):
+    path = str(tmp_path / 'checkpoint.json')
+    checkpoint = CollectorCheckpoint(path, '20261016')
+    checkpoint.mark_done('005930')
+    checkpoint.set_partial('000660', None, None)
+    checkpoint.save([1.0])
+
+    loaded = CollectorCheckpoint(path, '20261019')
+    assert not loaded.is_done('005930')
+    assert loaded.get_partial('000660') == [None, None]
+    assert loaded.tr_history == [1.0]
+
+
+def test_checkpoint_ignores_broken_file(tmp_path):
+    path = tmp_path / 'checkpoint.json'
+    path.write_text('{"done": [')
+
+    checkpoint = CollectorCheckpoint(str(path), '20261019')
+    assert checkpoint.done_count == 0
+    assert checkpoint.tr_history == list()
+
+
+def test_candle_writer_updates_checkpoint_after_commit(tmp_path, monkeypatch):
+    committed = list()
+    monkeypatch.setattr(PutQueries, 'daily_candle_many', staticmethod(committed.extend))
+
+    path = str(tmp_path / 'checkpoint.json')
+    checkpoint = CollectorCheckpoint(path, '20261019')
+    writer = CandleWriter(checkpoint, TrRateLimiter([(5, 1)]), batch_rows=100, flush_ms=10)
+    writer.start()
+
+    writer.put('005930', list(), ('start', 100))
+    writer.put('005930', [[300, 1, 2, 0, 1], [200, 1, 2, 0, 1]], ('page', 200, 100))
+    writer.drain()
+    assert CollectorCheckpoint(path, '20261019').get_partial('005930') == [200, 100]
+
+    writer.put('005930', list(), ('done', ))
+    writer.drain()
+    writer.stop()
+
+    assert committed == [['005930', 300, 1, 2, 0, 1], ['005930', 200, 1, 2, 0, 1]]
+    with open(path) as f:
+        data = json.load(f)
+    assert data['done'] == ['005930']
+    assert data['partial'] == dict()
+
+
+def test_candle_writer_stops_on_commit_error(tmp_path, monkeypatch):
+    def fail(row_list):
+        raise ConnectionError('db is down')
+    monkeypatch.setattr(PutQueries, 'daily_candle_many', staticmethod(fail))
+
+    checkpoint = CollectorCheckpoint(str(tmp_path / 'checkpoint.json'), '20261019')
+    writer = CandleWriter(checkpoint, TrRateLimiter([(5, 1)]), batch_rows=100, flush_ms=10)
+    writer.start()
+
+    writer.put('005930', [[300, 1, 2, 0, 1]], ('page', 300, None))
+    with pytest.raises(RuntimeError):
+        writer.drain()
+    with pytest.raises(RuntimeError):
+        writer.put('005930', list(), ('done', ))
+    assert checkpoint.get_partial('005930') is None
@@ -0,0 +1,100 @@
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+from KiwoomHighChart import export
+from KiwoomHighChart.export import ParquetExporter, merge_range
+
+DAY_MS = 24 * 60 * 60 * 1000
+BASE_MS = 1704067200000  # 2024-01-01 00:00 UTC
+
+
+class FakeDailyDB(object):
+    """
+        GetQueries의 candle_ranges, stream_daily_candles만 흉내 낸다, candles: {stock_code: {candle_date: close}}
+    """
+    def __init__(self, candles):
+        self.candles = candles
+        self.streams = list()
+
+    def candle_ranges(self):
+        return [(code, min(dates), max(dates), len(dates)) for code, dates in self.candles.items() if dates]
+
+    def stream_daily_candles(self, stock_code=None, before=None, after=None):
+        self.streams.append(stock_code)
+        for code in sorted(self.candles):
+            if stock_code is not None and code != stock_code:
+                continue
+            for candle_date, close in sorted(self.candles[code].items()):
+                if before is not None and before <= candle_date <= after:
+                    continue
+                yield code, candle_date, close, close, close, close
+
+
+def days(*day_numbers):
+    return {BASE_MS + day * DAY_MS: 100 + day for day in day_numbers}
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDailyDB({'005930': days(0, 1, 2), '247540': days(1, 2)})
+    monkeypatch.setattr(export, 'GetQueries', db)
+    monkeypatch.setattr(export.StockNameCache, 'load',
+                        lambda self: dict(names={'005930': ['삼성전자', 'kospi'], '247540': ['에코프로비엠', 'kosdaq']}))
+    return db
+
+
+def exported(root):
+    table = pq.read_table(str(root / 'daily_info'))
+    return sorted(zip(table.column('stock_code').to_pylist(), table.column('candle_date').to_pylist()))
+
+
+def expected(db):
+    return sorted((code, candle_date) for code, dates in db.candles.items() for candle_date in dates)
+
+
+def test_merge_range():
+    assert merge_range(None, [5, 9, 3]) == [5, 9, 3]
+    assert merge_range([5, 9, 3], [1, 2, 2]) == [1, 9, 5]
+
+
+def test_incremental_export_appends_outside_watermark(db, tmp_path):
+    result, = ParquetExporter(str(tmp_path)).export(['daily_info'])
+    assert result['rows'] == 5
+    assert db.streams == [None]
+    assert exported(tmp_path) == expected(db)
+    assert (tmp_path / 'daily_info' / 'market=kosdaq' / 'year=2024').is_dir()
+
+    # 변경 없음
+    db.streams = list()
+    result, = ParquetExporter(str(tmp_path)).export(['daily_info'])
+    assert result['rows'] == 0 and db.streams == list()
+
+    # 새 일봉은 바뀐 종목의 watermark 밖만 읽는다.
+    db.candles['005930'].update(days(3, 4))
+    result, = ParquetExporter(str(tmp_path)).export(['daily_info'])
+    assert result['rows'] == 2 and result['stocks'] == 1
+    assert db.streams == ['005930']
+    assert exported(tmp_path) == expected(db)
+
+    state = ParquetExporter(str(tmp_path)).load_state()
+    assert state['daily_info']['005930'] == [BASE_MS, BASE_MS + 4 * DAY_MS, 5]
+
+
+def test_gap_inside_watermark_rebuilds_all(db, tmp_path):
+    db.candles['005930'] = days(0, 2)
+    ParquetExporter(str(tmp_path)).export(['daily_info'])
+
+    # 이미 내보낸 구간 사이가 채워지면 watermark 밖만 읽어서는 빠지므로 전체를 다시 쓴다.
+    db.candles['005930'].update(days(1, 3))
+    db.streams = list()
+    result, = ParquetExporter(str(tmp_path)).export(['daily_info'])
+
+    assert db.streams == ['005930', None]
+    assert result['rows'] == 6
+    assert exported(tmp_path) == expected(db)
+    assert not [path for path in tmp_path.iterdir() if path.name.startswith('.tmp-')]
+
+    state = ParquetExporter(str(tmp_path)).load_state()
+    assert state['daily_info'] == {code: [first, last, count] for code, first, last, count in db.candle_ranges()}
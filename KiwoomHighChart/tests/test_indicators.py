@@ -0,0 +1,104 @@
+from KiwoomHighChart import indicators
+from KiwoomHighChart.indicators import rolling_mean, rolling_std, sma, ema, rsi, bollinger, parse_indicators, \
+    indicator_key, IndicatorEngine, to_json_list
+
+import numpy as np
+
+import pytest
+
+
+@pytest.fixture
+def close():
+    return np.random.default_rng(0).normal(0, 1, 300).cumsum() + 100
+
+
+def naive_ema(values, window):
+    alpha = 2 / (window + 1)
+    out = [np.nan] * len(values)
+    value = np.mean(values[:window])
+    out[window - 1] = value
+    for index in range(window, len(values)):
+        value = alpha * values[index] + (1 - alpha) * value
+        out[index] = value
+    return np.array(out)
+
+
+def naive_rsi(values, window):
+    diff = np.diff(values)
+    gains, losses = np.maximum(diff, 0), np.maximum(-diff, 0)
+    out = [np.nan] * len(values)
+    average_gain, average_loss = gains[:window].mean(), losses[:window].mean()
+    for index in range(window, len(diff) + 1):
+        if index > window:
+            average_gain = (average_gain * (window - 1) + gains[index - 1]) / window
+            average_loss = (average_loss * (window - 1) + losses[index - 1]) / window
+        out[index] = 100.0 if average_loss == 0 else 100 - 100 / (1 + average_gain / average_loss)
+    return np.array(out)
+
+
+def test_rolling_mean_and_std_match_naive(close):
+    window = 20
+    expected_mean = [np.mean(close[index - window + 1:index + 1]) for index in range(window - 1, len(close))]
+    expected_std = [np.std(close[index - window + 1:index + 1]) for index in range(window - 1, len(close))]
+
+    assert np.isnan(rolling_mean(close, window)[:window - 1]).all()
+    np.testing.assert_allclose(rolling_mean(close, window)[window - 1:], expected_mean)
+    np.testing.assert_allclose(rolling_std(close, window)[window - 1:], expected_std, atol=1e-7)
+    np.testing.assert_allclose(sma(close, window)['value'], rolling_mean(close, window))
+
+
+def test_short_series_is_all_nan():
+    assert np.isnan(rolling_mean(np.arange(3.0), 5)).all()
+    assert np.isnan(ema(np.arange(3.0), 5)['value']).all()
+    assert np.isnan(rsi(np.arange(5.0), 5)['value']).all()
+
+
+def test_ema_matches_naive(close):
+    np.testing.assert_allclose(ema(close, 12)['value'], naive_ema(close, 12), equal_nan=True)
+
+
+def test_rsi_matches_wilder(close):
+    np.testing.assert_allclose(rsi(close, 14)['value'], naive_rsi(close, 14), equal_nan=True)
+
+
+def test_rsi_only_gains_is_100():
+    value = rsi(np.arange(1.0, 31.0), 14)['value']
+    assert np.isnan(value[:14]).all()
+    assert (value[14:] == 100).all()
+
+
+def test_bollinger_band_width(close):
+    result = bollinger(close, 20, 2.5)
+    np.testing.assert_allclose(result['upper'] - result['mid'], 2.5 * rolling_std(close, 20), equal_nan=True)
+    np.testing.assert_allclose(result['mid'] - result['lower'], 2.5 * rolling_std(close, 20), equal_nan=True)
+
+
+def test_parse_indicators():
+    assert parse_indicators('sma:20, rsi:14,bb:20:2') == [('sma', (20,)), ('rsi', (14,)), ('bb', (20, 2.0))]
+    assert indicator_key('bb', (20, 2.0)) == 'bb_20_2'
+
+    for text in ['', 'macd:12', 'sma', 'sma:20:2', 'sma:x', 'sma:0']:
+        with pytest.raises(ValueError):
+            parse_indicators(text)
+
+
+def test_engine_caches_by_watermark(close, monkeypatch):
+    calls = list()
+
+    def counted_sma(values, window):
+        calls.append(window)
+        return sma(values, window)
+
+    monkeypatch.setitem(indicators.KERNELS, 'sma', (counted_sma, 1))
+    engine = IndicatorEngine(max_entries=2)
+
+    first = engine.compute('삼성전자', 1, close, [('sma', (5,))])
+    second = engine.compute('삼성전자', 1, close, [('sma', (5,))])
+    engine.compute('삼성전자', 2, close, [('sma', (5,))])
+
+    assert calls == [5, 5]
+    assert first['sma_5'] is second['sma_5']
+
+
+def test_to_json_list():
+    assert to_json_list(np.array([np.nan, 1.23456, 2.0])) == [None, 1.2346, 2.0]
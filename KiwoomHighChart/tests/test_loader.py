@@ -0,0 +1,34 @@
+from KiwoomHighChart.loader import write_csv, TABLE_COLUMNS
+
+import csv
+import io
+
+
+def test_write_csv_matches_load_data_fields():
+    """
+        FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"' ESCAPED BY ''
+        NULL은 따옴표 없이, '"'는 두번, ','와 '"'가 있는 값만 감싼다. escape 문자가 없으므로 '\\'는 그대로 둔다.
+    """
+    rows = [
+        ['005930', 'PER', '2025', '12.5', 0],
+        ['005930', 'EPS, 원', '2025', None, 1],
+        ['000660', '"PBR"', '2024', 'C:\\temp', 2],
+    ]
+    f = io.StringIO()
+
+    assert write_csv(iter(rows), f) == 3
+    assert f.getvalue() == (
+        '005930,PER,2025,12.5,0\n'
+        '005930,"EPS, 원",2025,NULL,1\n'
+        '000660,"""PBR""",2024,C:\\temp,2\n'
+    )
+
+    parsed = list(csv.reader(io.StringIO(f.getvalue())))
+    assert all(len(row) == len(TABLE_COLUMNS['stock_indicators']) for row in parsed)
+    assert [row[1] for row in parsed] == ['PER', 'EPS, 원', '"PBR"']
+
+
+def test_write_csv_empty():
+    f = io.StringIO()
+    assert write_csv(iter(list()), f) == 0
+    assert f.getvalue() == str()
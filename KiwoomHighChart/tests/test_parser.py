@@ -0,0 +1,71 @@
+import pytest
+
+pytest.importorskip('lxml')
+
+from KiwoomHighChart.parser import parse_indicator_html, parse_indicator_html_bs4, parse_safely
+
+import os
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'indicator_page.html')
+YEAR = 2025
+
+
+@pytest.fixture
+def html():
+    with open(FIXTURE_PATH, 'r', encoding='utf8') as f:
+        return f.read()
+
+
+def test_parse_indicator_html(html):
+    result = parse_indicator_html(html, YEAR)
+
+    assert result['stock_kor'] == '삼성전자'
+    assert result['table_html'].startswith('<table class="__se_tbl_ext">')
+    # 두번째 table 안의 table도 그대로 남는다.
+    assert '<table class="inner"><tr><td>nested</td></tr></table>' in result['table_html']
+
+    value_list = result['value_list']
+    # 2021 ~ 2025, 지표 5개
+    assert len(value_list) == 5 * 5
+    assert value_list[:5] == [
+        ['PER', '2021', '20', 0],
+        ['PER', '2022', '21', 0],
+        ['PER', '2023', '22', 0],
+        ['PER', '2024', '23', 0],
+        ['PER', '2025', '24', 0],
+    ]
+    assert ['PBR', '2022', '1.1', 1] in value_list
+    assert [row[0] for row in value_list[::5]] == ['PER', 'PBR', 'ROE', 'EV/EBITDA', 'EPS']
+    assert value_list[-1] == ['EPS', '2025', '4', 4]
+
+
+def test_parse_accepts_bytes(html):
+    assert parse_indicator_html(html.encode('utf8'), YEAR) == parse_indicator_html(html, YEAR)
+
+
+def test_matches_bs4_implementation(html):
+    pytest.importorskip('bs4')
+
+    expected = parse_indicator_html_bs4(html, YEAR)
+    result = parse_indicator_html(html, YEAR)
+
+    assert result['stock_kor'] == expected['stock_kor']
+    assert result['value_list'] == expected['value_list']
+
+
+def test_table_count_must_be_two(html):
+    assert parse_indicator_html(str()) is None
+    assert parse_indicator_html('<table class="__se_tbl_ext"><tr><td>1</td></tr></table>', YEAR) is None
+
+    first_only = html[:html.index('<p>')] + '</body></html>'
+    assert parse_indicator_html(first_only, YEAR) is None
+
+
+def test_parse_safely_returns_error_message():
+    # 종목명, 연도 행이 없는 page
+    result, error = parse_safely(
+        '<table class="__se_tbl_ext"><tr><td>a</td></tr></table><table class="__se_tbl_ext"></table>'
+    )
+
+    assert result is None
+    assert 'stock name' in error
@@ -0,0 +1,77 @@
+from KiwoomHighChart import query
+from KiwoomHighChart.query import PutQueries
+
+from contextlib import contextmanager
+
+import pytest
+
+
+class FakeTransactionCursor(object):
+    def __init__(self, stored):
+        self.stored = stored
+        self.selected = None
+        self.statements = dict()
+
+    def execute(self, sql, value=None):
+        assert 'FOR UPDATE' in sql
+        self.selected = value
+
+    def fetchall(self):
+        return list(self.stored)
+
+    def executemany(self, sql, value_list):
+        kind = sql.split()[0]
+        assert kind not in self.statements
+        self.statements[kind] = list(value_list)
+
+
+@pytest.fixture
+def cursor(monkeypatch):
+    cursor = FakeTransactionCursor([
+        ('PER', 2023, '10.1', 0),
+        ('PER', 2024, '11.2', 0),
+        ('ROE', 2023, '5.0', 1),
+        ('ROE', 2024, '6.0', 1),
+    ])
+    names = list()
+
+    @contextmanager
+    def fake_transaction_db(name):
+        names.append(name)
+        yield cursor
+
+    monkeypatch.setattr(query, 'transaction_db', fake_transaction_db)
+    cursor.transaction_names = names
+    return cursor
+
+
+def test_indicator_diff(cursor):
+    result = PutQueries.indicator_diff([
+        # 그대로
+        ['PER', '2023', '10.1', 0],
+        # 값 변경, order_index 변경
+        ['PER', '2024', '12.0', 0],
+        ['ROE', '2023', '5.0', 2],
+        # 신규
+        ['PER', '2025', '13.0', 0],
+        # ROE 2024는 빠졌으므로 삭제
+    ], '005930')
+
+    assert result == dict(inserted=1, updated=2, deleted=1, skipped=1)
+    assert cursor.transaction_names == ['indicator diff']
+    assert cursor.selected == ('005930',)
+    assert cursor.statements == {
+        'DELETE': [('005930', 'ROE', 2024)],
+        'UPDATE': [('12.0', 0, '005930', 'PER', 2024), ('5.0', 2, '005930', 'ROE', 2023)],
+        'INSERT': [('005930', 'PER', 2025, '13.0', 0)],
+    }
+
+
+def test_indicator_diff_unchanged_writes_nothing(cursor):
+    result = PutQueries.indicator_diff([
+        [indicator_name, str(date), value, order_index]
+        for indicator_name, date, value, order_index in cursor.stored
+    ], '005930')
+
+    assert result == dict(inserted=0, updated=0, deleted=0, skipped=4)
+    assert cursor.statements == dict()
@@ -0,0 +1,130 @@
+from KiwoomHighChart.config import ResampleInfo
+from KiwoomHighChart.resample import bucket_keys, resample_ohlc, lttb_indices, downsample
+
+import numpy as np
+
+import datetime
+
+import pytest
+
+KST = datetime.timezone(datetime.timedelta(hours=ResampleInfo.UTC_OFFSET_HOURS))
+
+
+def candle_date(year, month, day):
+    # 수집 PC 현지 시간 00:00의 ms
+    return int(datetime.datetime(year, month, day, tzinfo=KST).timestamp() * 1000)
+
+
+def trading_days(start, count):
+    days, day = list(), start
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day += datetime.timedelta(days=1)
+    return days
+
+
+@pytest.fixture
+def candles():
+    rng = np.random.default_rng(1)
+    days = trading_days(datetime.date(2025, 12, 1), 90)
+    close = (rng.normal(0, 100, len(days)).cumsum() + 50000).astype(np.int64)
+    open_ = close + rng.integers(-50, 50, len(days))
+    high = np.maximum(open_, close) + rng.integers(0, 100, len(days))
+    low = np.minimum(open_, close) - rng.integers(0, 100, len(days))
+    t = np.array([candle_date(day.year, day.month, day.day) for day in days], dtype=np.int64)
+    return days, np.stack([t, open_, high, low, close])
+
+
+def naive_resample(days, data, key):
+    groups = dict()
+    for index, day in enumerate(days):
+        groups.setdefault(key(day), list()).append(index)
+
+    columns = list()
+    for indices in groups.values():
+        columns.append([
+            data[0, indices[0]], data[1, indices[0]], data[2, indices].max(),
+            data[3, indices].min(), data[4, indices[-1]],
+        ])
+    return np.array(columns, dtype=np.int64).T
+
+
+def test_bucket_keys_use_local_date():
+    # 월요일 00:00 KST는 UTC로 일요일 15:00
+    monday, sunday = candle_date(2026, 10, 19), candle_date(2026, 10, 18)
+    weeks = bucket_keys([sunday, monday, candle_date(2026, 10, 25)], 'week')
+    assert weeks[0] != weeks[1]
+    assert weeks[1] == weeks[2]
+
+    months = bucket_keys([candle_date(2026, 9, 30), candle_date(2026, 10, 1)], 'month')
+    assert months[0] + 1 == months[1]
+
+    with pytest.raises(ValueError):
+        bucket_keys([monday], 'year')
+
+
+@pytest.mark.parametrize('interval, key', [
+    ('week', lambda day: day.isocalendar()[:2]),
+    ('month', lambda day: (day.year, day.month)),
+])
+def test_resample_matches_naive_grouping(candles, interval, key):
+    days, data = candles
+    np.testing.assert_array_equal(resample_ohlc(data, interval), naive_resample(days, data, key))
+
+
+def test_resample_empty():
+    empty = np.empty((5, 0), dtype=np.int64)
+    assert resample_ohlc(empty, 'week').shape == (5, 0)
+
+
+def naive_lttb(x, y, threshold):
+    """
+        bucket 경계를 lttb_indices와 같은 방식으로 나눈 참조 구현
+    """
+    n = len(x)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected, previous = [0], 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        average_x, average_y = np.mean(x[end:next_end]), np.mean(y[end:next_end])
+        best, best_area = start, -1
+        for index in range(start, end):
+            area = abs((x[previous] - average_x) * (y[index] - y[previous])
+                       - (x[previous] - x[index]) * (average_y - y[previous]))
+            if area > best_area:
+                best, best_area = index, area
+        selected.append(best)
+        previous = best
+    return selected + [n - 1]
+
+
+def test_lttb_matches_reference(candles):
+    _, data = candles
+    x, y = data[0].astype(np.float64), data[4].astype(np.float64)
+
+    selected = lttb_indices(x, y, 20)
+    assert selected.tolist() == naive_lttb(x, y, 20)
+    assert len(selected) == 20
+    assert (np.diff(selected) > 0).all()
+
+
+def test_lttb_keeps_extremes():
+    x = np.arange(100, dtype=np.float64)
+    y = np.zeros(100)
+    y[37], y[71] = 10, -10
+
+    selected = lttb_indices(x, y, 10)
+    assert 37 in selected and 71 in selected
+
+
+def test_lttb_threshold_bounds():
+    assert lttb_indices(np.arange(5), np.arange(5), 10).tolist() == [0, 1, 2, 3, 4]
+    assert lttb_indices(np.arange(5), np.arange(5), 2).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_downsample(candles):
+    _, data = candles
+    assert downsample(data, 'lttb', 30).shape == (5, 30)
+    np.testing.assert_array_equal(downsample(data, 'month'), resample_ohlc(data, 'month'))
@@ -0,0 +1,93 @@
+from KiwoomHighChart import screener
+from KiwoomHighChart.screener import to_number, build_state, IndicatorMatrix
+from KiwoomHighChart.query import GetQueries
+
+import numpy as np
+
+import pytest
+
+ROWS = [
+    ('005930', '삼성전자', 'PER', 2025, '12.5'),
+    ('005930', '삼성전자', 'ROE', 2025, '9.1'),
+    ('000660', 'SK하이닉스', 'PER', 2025, '8.0'),
+    ('000660', 'SK하이닉스', 'ROE', 2025, '20.3'),
+    ('035420', 'NAVER', 'PER', 2025, '1,234.5'),
+    ('035420', 'NAVER', 'ROE', 2025, 'N/A'),
+    ('035720', '카카오', 'PER', 2025, '-'),
+    ('035720', '카카오', 'ROE', 2025, '3.0'),
+    ('005930', '삼성전자', 'PER', 2024, '20.0'),
+]
+
+
+@pytest.fixture
+def matrix(monkeypatch):
+    monkeypatch.setattr(GetQueries, 'all_stock_indicators', staticmethod(lambda: list(ROWS)))
+    return IndicatorMatrix(refresh_seconds=300)
+
+
+def test_to_number():
+    assert to_number('1,234.5') == 1234.5
+    assert to_number(3) == 3.0
+    for value in ['-', 'N/A', '', None]:
+        assert np.isnan(to_number(value))
+
+
+def test_build_state_shape():
+    state = build_state(ROWS)
+
+    assert state.values.shape == (4, 2, 2)
+    assert state.values[state.stock_index['035420'], state.indicator_index['PER'], state.year_index[2025]] == 1234.5
+    assert np.isnan(state.values[state.stock_index['000660'], state.indicator_index['PER'], state.year_index[2024]])
+
+
+def test_build_state_replaces_only_given_stocks():
+    base = build_state(ROWS)
+    state = build_state([('005930', '삼성전자', 'EPS', 2025, '100')], base)
+
+    index = state.stock_index['005930']
+    assert state.values[index, state.indicator_index['EPS'], state.year_index[2025]] == 100
+    # 전달된 종목의 기존 값은 지워진다.
+    assert np.isnan(state.values[index, state.indicator_index['PER'], state.year_index[2025]])
+    assert state.values[state.stock_index['000660'], state.indicator_index['ROE'], state.year_index[2025]] == 20.3
+    # base는 그대로
+    assert base.values[index, base.indicator_index['PER'], base.year_index[2025]] == 12.5
+
+
+def test_screen_filters_and_sorts(matrix):
+    year, columns, total, rows = matrix.screen(filters=[('PER', 0, 100)], sort='ROE', descending=True)
+
+    assert year == 2025
+    assert columns == ['PER', 'ROE']
+    assert total == 2
+    assert rows == [['000660', 'SK하이닉스', 8.0, 20.3], ['005930', '삼성전자', 12.5, 9.1]]
+
+
+def test_screen_top_n_matches_full_sort(matrix):
+    _, _, total, rows = matrix.screen(sort='PER', limit=2)
+    _, _, _, all_rows = matrix.screen(sort='PER', limit=100)
+
+    assert total == 4
+    assert rows == all_rows[:2]
+    # 값이 없는 종목은 뒤로 간다.
+    assert [row[0] for row in all_rows] == ['000660', '005930', '035420', '035720']
+    assert all_rows[-1][2] is None
+
+
+def test_screen_year_and_unknown_indicator(matrix):
+    assert matrix.screen(year=2024, filters=[('PER', None, None)])[2:] == (1, [['005930', '삼성전자', 20.0]])
+    assert matrix.screen(year=1999)[2] == 0
+
+    with pytest.raises(ValueError):
+        matrix.screen(filters=[('EPS', 0, None)])
+
+
+def test_update_stock_replaces_row(matrix, monkeypatch):
+    matrix.snapshot()
+    monkeypatch.setattr(screener.stock_names, 'code_by_kor', lambda stock_kor: '035720')
+    monkeypatch.setattr(GetQueries, 'stock_indicator_by_stock_code',
+                        staticmethod(lambda stock_code: [('PER', 2025, '5.0'), ('ROE', 2025, '30.0')]))
+
+    matrix.update_stock('카카오')
+
+    _, _, _, rows = matrix.screen(sort='ROE', descending=True, limit=1, columns=['PER', 'ROE'])
+    assert rows == [['035720', '카카오', 5.0, 30.0]]
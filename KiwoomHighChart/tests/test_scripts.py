@@ -0,0 +1,97 @@
+from KiwoomHighChart import scripts
+from KiwoomHighChart.scripts import key_chunks, run_chunked
+
+from contextlib import contextmanager
+
+import pytest
+
+STATEMENT = 'UPDATE stock_indicators SET order_index = %s WHERE stock_code BETWEEN %s AND %s'
+
+
+class FakeBackfillDB(object):
+    """
+        stock_indicators rows: [stock_code, order_index], run_chunked의 statement를 흉내 낸다.
+        fail_at 번째 chunk에서 commit 전에 예외를 낸다.
+    """
+    def __init__(self, rows, fail_at=None):
+        self.rows = rows
+        self.fail_at = fail_at
+        self.ranges = list()
+        self.commits = 0
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def commit(self):
+        self.commits += 1
+
+    def execute(self, query, value=None):
+        if query.startswith('SELECT DISTINCT'):
+            self._result = [(code,) for code in sorted({row[0] for row in self.rows})]
+            return len(self._result)
+
+        order_index, first, last = value
+        if len(self.ranges) + 1 == self.fail_at:
+            raise RuntimeError('connection lost')
+        self.ranges.append((first, last))
+        changed = 0
+        for row in self.rows:
+            if first <= row[0] <= last and row[1] != order_index:
+                row[1] = order_index
+                changed += 1
+        return changed
+
+    def fetchall(self):
+        return self._result
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeBackfillDB([['{:06d}'.format(code), None] for code in range(0, 230, 3) for _ in range(2)])
+
+    @contextmanager
+    def fake_connection_db():
+        yield db
+
+    monkeypatch.setattr(scripts, 'connection_db', fake_connection_db)
+    return db
+
+
+def test_key_chunks_boundaries(db):
+    assert key_chunks(db, 'stock_indicators', 'stock_code', 30) == [('000000', '000087'), ('000090', '000177'),
+                                                                    ('000180', '000228')]
+    assert key_chunks(db, 'stock_indicators', 'stock_code', 1000) == [('000000', '000228')]
+    db.rows = list()
+    assert key_chunks(db, 'stock_indicators', 'stock_code', 30) == list()
+
+
+@pytest.mark.parametrize('chunk_keys', [1, 7, 77, 1000])
+def test_chunks_cover_every_key_once(db, chunk_keys):
+    result = run_chunked('order_index', STATEMENT, 'stock_indicators', 'stock_code', chunk_keys, value=(9,))
+
+    codes = sorted({row[0] for row in db.rows})
+    covered = [code for first, last in db.ranges for code in codes if first <= code <= last]
+    assert covered == codes
+    assert result['chunks'] == len(db.ranges) == -(-len(codes) // chunk_keys)
+    assert result['rows'] == len(db.rows)
+    assert db.commits == result['chunks']
+
+
+def test_resume_after_failure(db):
+    db.fail_at = 3
+    with pytest.raises(RuntimeError):
+        run_chunked('order_index', STATEMENT, 'stock_indicators', 'stock_code', 10, value=(9,))
+    done = [row for row in db.rows if row[1] == 9]
+    assert len(done) == 2 * 10 * 2
+
+    # 처음부터 다시 실행해도 이미 바뀐 row는 그대로이고 남은 row만 바뀐다.
+    db.fail_at, db.ranges = None, list()
+    result = run_chunked('order_index', STATEMENT, 'stock_indicators', 'stock_code', 10, value=(9,))
+    assert result['rows'] == len(db.rows) - len(done)
+    assert all(row[1] == 9 for row in db.rows)
@@ -1,48 +1,46 @@
 from KiwoomHighChart.config import SqlInfo as info
-import pymysql
+from SharedDatabase import ConnectionPool
 
-from Util.pyinstaller_patch import debugger
-import datetime
 
-con = pymysql.connect(host=info.HOST, user=info.USER, password=info.PASSWORD, charset='utf8', db=info.DATABASE)
-# con = None
+def create_pool(pool_size, **connect_kwargs):
+    return ConnectionPool(
+        pool_size=pool_size,
+        slow_query_ms=info.SLOW_QUERY_MS,
+        host=info.HOST,
+        user=info.USER,
+        password=info.PASSWORD,
+        charset='utf8',
+        db=info.DATABASE,
+        **connect_kwargs
+    )
+
+
+CONNECTION_POOL = create_pool(info.POOL_SIZE)
 
 
 def execute_db(query, value=None, custom_cursor=None):
-    global con
-    if not con.open:
-        con = pymysql.connect(host=info.HOST, user=info.USER, password=info.PASSWORD, charset='utf8', db=info.DATABASE)
+    return CONNECTION_POOL.execute(query, value, custom_cursor)
 
-    with con.cursor(custom_cursor) as cursor:
-        if value:
-            cursor.execute(query, value)
-        else:
-            cursor.execute(query)
 
-        debugger.info(cursor._last_executed)
-        data = cursor.fetchall()
+def execute_db_many(query, value_list, *args):
+    return CONNECTION_POOL.execute_many(query, value_list, *args)
 
-    con.commit()
 
-    return data
+def execute_db_group(statement_list):
+    return CONNECTION_POOL.execute_group(statement_list)
 
 
-def execute_db_many(query, value_list, *args):
-    try:
-        global con
-        if not con.open:
-            con = pymysql.connect(host=info.HOST, user=info.USER, password=info.PASSWORD, charset='utf8',
-                                  db=info.DATABASE)
-
-        with con.cursor() as cursor:
-            if value_list:
-                cursor.executemany(query, [tuple(list(args) + each) for each in value_list])
-            else:
-                raise
-            debugger.info(cursor._last_executed)
-            data = cursor.fetchall()
-        con.commit()
-        return data
-    except Exception:
-        debugger.info(query)
-        raise
+def execute_db_values(statement_list):
+    return CONNECTION_POOL.execute_values(statement_list)
+
+
+def connection_db():
+    return CONNECTION_POOL.connection()
+
+
+def transaction_db(name):
+    return CONNECTION_POOL.transaction(name)
+
+
+def stream_db(query, value=None, fetch_size=1000):
+    return CONNECTION_POOL.stream(query, value, fetch_size)
@@ -16,6 +16,7 @@ from pyqtgraph import PlotWidget, AxisItem
 from Util.pyinstaller_patch import *
 from Util.pyinstaller_patch_gui import LoginWidget
 from StockApis.kiwoom import KiwoomAPIModule, TRADE_AMOUNT
+from StockApis.name_cache import StockNameCache
 
 main_ui = uic.loadUiType(os.path.join(sys._MEIPASS, 'gui/main.ui'))[0]
 
@@ -828,10 +829,10 @@ class KiwoomCommunicateThread(QtCore.QThread):
 
     def get_all_stock_korean_name(self):
         code_dic = self.kiwoom_api.get_stock_codes()
-        kospi_codes = self.get_index_stock_names('9542', code_dic['kospi'])
-        kosdaq_codes = self.get_index_stock_names('9543', code_dic['kosdaq'])
+        # KiwoomHighChart 수집기와 같은 disk cache, 신규 종목만 TR로 받는다.
+        names = StockNameCache().get_names(code_dic, self.get_index_stock_names)
         
-        return {**kosdaq_codes, **kospi_codes}
+        return {**names['kosdaq'], **names['kospi']}
         
     def get_index_stock_names(self, scn, codes):
         indexes = list()
@@ -0,0 +1,10 @@
+from SharedDatabase.pool import ConnectionPool, QueryStats, normalize_statement
+from SharedDatabase.profiling import RequestProfiler, ProfilingMiddleware
+
+__all__ = [
+    'ConnectionPool',
+    'QueryStats',
+    'normalize_statement',
+    'RequestProfiler',
+    'ProfilingMiddleware'
+]
@@ -0,0 +1,314 @@
+try:
+    import pymysql
+    from pymysql.cursors import SSCursor
+except ImportError:
+    # SQLite backend로만 실행하는 경우 pymysql 없이 QueryStats, profiling을 쓸 수 있다.
+    pymysql = SSCursor = None
+
+from Util.pyinstaller_patch import debugger
+from SharedDatabase import profiling
+
+from contextlib import contextmanager
+
+import functools
+import queue
+import re
+import threading
+import time
+
+
+@functools.lru_cache(maxsize=512)
+def normalize_statement(query):
+    """
+        query 문자열의 공백을 정리한 statement, timing 통계의 key로 사용한다.
+        같은 query 객체는 매번 재계산하지 않도록 cache 한다.
+    """
+    return re.sub(r'\s+', ' ', query).strip()
+
+
+class QueryStats(object):
+    """
+        statement 별 실행 횟수, 누적/최대 실행시간과 pool 대기시간
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._statements = dict()
+        self._pool_wait = dict(count=0, total_ms=0, max_ms=0)
+
+    def add_query(self, statement, elapsed_ms, rows):
+        with self._lock:
+            stat = self._statements.setdefault(statement, dict(count=0, total_ms=0, max_ms=0, rows=0))
+            stat['count'] += 1
+            stat['total_ms'] += elapsed_ms
+            stat['max_ms'] = max(stat['max_ms'], elapsed_ms)
+            stat['rows'] += rows
+
+    def add_pool_wait(self, elapsed_ms):
+        with self._lock:
+            self._pool_wait['count'] += 1
+            self._pool_wait['total_ms'] += elapsed_ms
+            self._pool_wait['max_ms'] = max(self._pool_wait['max_ms'], elapsed_ms)
+
+    def get_stats(self):
+        with self._lock:
+            statements = {key: dict(value) for key, value in self._statements.items()}
+            pool_wait = dict(self._pool_wait)
+
+        return dict(statements=statements, pool_wait=pool_wait)
+
+
+class ConnectionPool(object):
+    """
+        DiffTrader server, KiwoomHighChart가 함께 쓰는 thread-safe pymysql connection pool
+        connection은 필요할 때 pool_size 까지 생성하며, 모두 사용중이면 반환될 때까지 대기한다.
+    """
+    def __init__(self, pool_size, slow_query_ms=200, pool_timeout=10, **connect_kwargs):
+        if pymysql is None:
+            raise ImportError('pymysql is required for the ConnectionPool, pip install pymysql')
+        self._pool_size = pool_size
+        self._slow_query_ms = slow_query_ms
+        self._pool_timeout = pool_timeout
+        self._connect_kwargs = connect_kwargs
+
+        self._max_packet = None
+
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+        self._created = 0
+        self._created_lock = threading.Lock()
+
+        self.stats = QueryStats()
+
+    def _connect(self):
+        return pymysql.connect(**self._connect_kwargs)
+
+    def get_connection(self):
+        start = time.time()
+        try:
+            con = self._idle.get_nowait()
+        except queue.Empty:
+            con = None
+            with self._created_lock:
+                if self._created < self._pool_size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+
+            if create:
+                try:
+                    con = self._connect()
+                except Exception:
+                    with self._created_lock:
+                        self._created -= 1
+                    raise
+            else:
+                try:
+                    con = self._idle.get(timeout=self._pool_timeout)
+                except queue.Empty:
+                    raise TimeoutError('connection pool is exhausted, pool_size=[{}]'.format(self._pool_size))
+
+        wait_ms = (time.time() - start) * 1000
+        self.stats.add_pool_wait(wait_ms)
+        profiling.add_pool_wait(wait_ms)
+
+        # 오래 idle 상태였던 connection은 서버에서 끊었을 수 있다.
+        try:
+            con.ping(reconnect=True)
+        except Exception:
+            self.release(con, broken=True)
+            raise
+        return con
+
+    def release(self, con, broken=False):
+        if broken:
+            try:
+                con.close()
+            except Exception:
+                pass
+            with self._created_lock:
+                self._created -= 1
+            return
+
+        self._idle.put_nowait(con)
+
+    @contextmanager
+    def connection(self):
+        con = self.get_connection()
+        broken = False
+        try:
+            yield con
+        except pymysql.err.OperationalError:
+            broken = True
+            raise
+        except Exception:
+            con.rollback()
+            raise
+        finally:
+            self.release(con, broken)
+
+    def _record(self, query, value, start, rows):
+        elapsed_ms = (time.time() - start) * 1000
+        statement = normalize_statement(query)
+        self.stats.add_query(statement, elapsed_ms, rows)
+        profiling.add_db_time(elapsed_ms)
+        if elapsed_ms >= self._slow_query_ms:
+            debugger.info('slow query [{:.1f}ms], [{}], [{}]'.format(elapsed_ms, statement, str(value)[:200]))
+
+    def execute(self, query, value=None, custom_cursor=None):
+        with self.connection() as con:
+            start = time.time()
+            with con.cursor(custom_cursor) as cursor:
+                if value:
+                    cursor.execute(query, value)
+                else:
+                    cursor.execute(query)
+                data = cursor.fetchall()
+            con.commit()
+            self._record(query, value, start, len(data))
+
+        return data
+
+    def execute_many(self, query, value_list, *args):
+        """
+            Args:
+                args: 모든 row 앞에 붙는 공통 값, ex) stock_code
+        """
+        if not value_list:
+            raise ValueError('value_list is empty, [{}]'.format(normalize_statement(query)))
+
+        rows = [tuple(list(args) + list(each)) for each in value_list]
+        with self.connection() as con:
+            start = time.time()
+            with con.cursor() as cursor:
+                # INSERT ... VALUES 형태는 pymysql이 multi-row INSERT로 묶어서 보낸다.
+                cursor.executemany(query, rows)
+                data = cursor.fetchall()
+            con.commit()
+            self._record(query, '{} rows'.format(len(rows)), start, len(rows))
+
+        return data
+
+    def execute_group(self, statement_list):
+        """
+            여러 executemany를 하나의 connection, 하나의 transaction으로 처리한다.
+            Args:
+                statement_list: [(query, value_list), ...], value_list가 비어있는 statement는 건너뛴다.
+        """
+        with self.connection() as con:
+            with con.cursor() as cursor:
+                for query, value_list in statement_list:
+                    if not value_list:
+                        continue
+                    start = time.time()
+                    cursor.executemany(query, [tuple(each) for each in value_list])
+                    self._record(query, '{} rows'.format(len(value_list)), start, len(value_list))
+            con.commit()
+
+    @contextmanager
+    def transaction(self, name):
+        """
+            조회 결과에 따라 쓰기가 달라지는 경우 하나의 connection, 하나의 transaction으로 처리한다.
+            정상 종료시 commit, 예외가 발생하면 rollback 한다.
+            Args:
+                name: timing 통계의 statement key
+            usage:
+                with pool.transaction('indicator diff') as cursor:
+                    cursor.execute(...)
+        """
+        with self.connection() as con:
+            start = time.time()
+            with con.cursor() as cursor:
+                yield cursor
+            con.commit()
+            self._record(name, None, start, 0)
+
+    def _get_max_packet(self, con):
+        if self._max_packet is None:
+            with con.cursor() as cursor:
+                cursor.execute('SELECT @@max_allowed_packet')
+                self._max_packet = int(cursor.fetchone()[0])
+        return self._max_packet
+
+    @staticmethod
+    def _values_chunks(con, query_prefix, value_list, query_suffix, max_bytes):
+        base_size = len(query_prefix.encode()) + len(query_suffix.encode())
+        chunk, size = list(), base_size
+        for row in value_list:
+            literal = con.escape(tuple(row))
+            length = len(literal.encode()) + 1
+            if chunk and size + length > max_bytes:
+                yield query_prefix + ','.join(chunk) + query_suffix
+                chunk, size = list(), base_size
+            chunk.append(literal)
+            size += length
+        if chunk:
+            yield query_prefix + ','.join(chunk) + query_suffix
+
+    def execute_values(self, statement_list):
+        """
+            row를 escape 해 multi-row VALUES 문을 직접 만들고, max_allowed_packet 크기 단위로 나눠 보낸다.
+            모든 statement는 하나의 transaction으로 처리한다.
+            Args:
+                statement_list: [(query_prefix, value_list, query_suffix), ...]
+                    ex) ('INSERT IGNORE INTO daily_info(stock_code, candle_date) VALUES ', [[code, date], ...], '')
+        """
+        with self.connection() as con:
+            # packet header, 여유분
+            max_bytes = int(self._get_max_packet(con) * 0.9)
+            with con.cursor() as cursor:
+                for query_prefix, value_list, query_suffix in statement_list:
+                    if not value_list:
+                        continue
+                    start = time.time()
+                    for query in self._values_chunks(con, query_prefix, value_list, query_suffix, max_bytes):
+                        cursor.execute(query)
+                    self._record(query_prefix + query_suffix, '{} rows'.format(len(value_list)),
+                                 start, len(value_list))
+            con.commit()
+
+    def load_data_infile(self, path, table, columns, ignore=True):
+        """
+            LOAD DATA LOCAL INFILE, connect_kwargs에 local_infile=True가 필요하다.
+            CSV는 ',' 구분, '"' quote, escape 없음, NULL은 따옴표 없는 NULL 이다.
+            Return:
+                적재된 row 수
+        """
+        query = """
+            LOAD DATA LOCAL INFILE %s {mode} INTO TABLE {table}
+            CHARACTER SET utf8
+            FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"' ESCAPED BY ''
+            LINES TERMINATED BY '\\n'
+            ({columns})
+        """.format(mode='IGNORE' if ignore else 'REPLACE', table=table, columns=', '.join(columns))
+
+        with self.connection() as con:
+            start = time.time()
+            with con.cursor() as cursor:
+                rows = cursor.execute(query, (path,))
+            con.commit()
+            self._record(query, path, start, rows)
+
+        return rows
+
+    def stream(self, query, value=None, fetch_size=1000):
+        """
+            unbuffered server-side cursor(SSCursor)로 결과를 fetch_size 단위로 읽으며 row를 yield 한다.
+            generator가 끝나거나 close 될 때까지 connection을 점유한다.
+        """
+        with self.connection() as con:
+            start = time.time()
+            rows = 0
+            cursor = con.cursor(SSCursor)
+            try:
+                cursor.execute(query, value)
+                while True:
+                    chunk = cursor.fetchmany(fetch_size)
+                    if not chunk:
+                        break
+                    rows += len(chunk)
+                    for row in chunk:
+                        yield row
+            finally:
+                # 남은 row를 다 읽어야 connection을 재사용할 수 있다.
+                cursor.close()
+                self._record(query, value, start, rows)
@@ -0,0 +1,308 @@
+from Util.pyinstaller_patch import debugger
+
+from collections import Counter, deque
+from flask import request
+from werkzeug.wsgi import ClosingIterator
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+"""
+    DiffTrader server, KiwoomHighChart가 함께 쓰는 request profiling middleware
+    request 1건의 시간을 parse, app, db, pool_wait, serialize 로 나눠 endpoint 별 histogram에 누적하고
+    /metrics 로 노출한다.
+    db, pool_wait 시간은 ConnectionPool이 현재 thread의 RequestProfile에 더해준다.
+"""
+
+# histogram bucket 상한(ms), 마지막 bucket은 그 이상 전부
+BUCKET_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+PHASES = ('total', 'parse', 'app', 'db', 'pool_wait', 'serialize')
+
+_local = threading.local()
+
+
+class RequestProfile(object):
+    __slots__ = ('start', 'endpoint', 'status', 'streaming', 'parse_ms', 'db_ms', 'db_count',
+                 'pool_wait_ms', 'serialize_ms', 'samples')
+
+    def __init__(self):
+        self.start = time.time()
+        self.endpoint = None
+        self.status = 0
+        self.streaming = False
+        self.parse_ms = 0
+        self.db_ms = 0
+        self.db_count = 0
+        self.pool_wait_ms = 0
+        self.serialize_ms = 0
+        self.samples = Counter()
+
+
+def current_profile():
+    return getattr(_local, 'profile', None)
+
+
+def add_db_time(elapsed_ms):
+    profile = current_profile()
+    if profile is not None:
+        profile.db_ms += elapsed_ms
+        profile.db_count += 1
+
+
+def add_pool_wait(elapsed_ms):
+    profile = current_profile()
+    if profile is not None:
+        profile.pool_wait_ms += elapsed_ms
+
+
+class LatencyHistogram(object):
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_MS) + 1)
+        self.count = 0
+        self.total_ms = 0
+        self.max_ms = 0
+
+    def add(self, elapsed_ms):
+        index = 0
+        while index < len(BUCKET_MS) and elapsed_ms > BUCKET_MS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def percentile(self, percent):
+        """
+            해당 percentile이 속한 bucket의 상한, 마지막 bucket이면 max_ms
+        """
+        if not self.count:
+            return 0
+        target = self.count * percent / 100
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return BUCKET_MS[index] if index < len(BUCKET_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self):
+        return dict(
+            count=self.count,
+            avg_ms=self.total_ms / self.count if self.count else 0,
+            max_ms=self.max_ms,
+            p50_ms=self.percentile(50),
+            p90_ms=self.percentile(90),
+            p99_ms=self.percentile(99),
+            buckets={'le_{}'.format(bound): count for bound, count in zip(BUCKET_MS, self.counts)},
+        )
+
+
+class RequestProfiler(object):
+    """
+        Args:
+            pools: pool_wait 통계를 함께 노출할 ConnectionPool list
+            slow_request_ms: 이 시간 이상 걸린 request는 slow_requests에 남긴다.
+            sample_interval_ms: 0 보다 크면 sampling profiler thread가 진행중인 request의 stack을 주기적으로 수집하고,
+                slow request로 끝난 경우에만 stack 요약을 남긴다.
+    """
+    def __init__(self, pools=None, slow_request_ms=500, sample_interval_ms=0,
+                 max_slow_requests=50, max_stack_depth=30, metrics_path='/metrics'):
+        self._pools = pools or list()
+        self._slow_request_ms = slow_request_ms
+        self._sample_interval = sample_interval_ms / 1000
+        self._max_stack_depth = max_stack_depth
+        self.metrics_path = metrics_path
+
+        self._lock = threading.Lock()
+        self._endpoints = dict()
+        self._slow_requests = deque(maxlen=max_slow_requests)
+        self._active = dict()
+        self._sampler = None
+
+    def init_app(self, app, api=None):
+        """
+            app.wsgi_app을 감싸고, flask_restful Api가 있으면 representation(json dumps) 시간을 serialize로 잰다.
+            api.init_app 이후에 호출한다.
+        """
+        app.wsgi_app = ProfilingMiddleware(app.wsgi_app, self)
+        app.before_request(self._before_request)
+
+        if api is not None:
+            for mediatype, representation in list(api.representations.items()):
+                api.representations[mediatype] = self._timed_representation(representation)
+
+        if self._sample_interval > 0 and self._sampler is None:
+            self._sampler = threading.Thread(target=self._sample_loop, daemon=True)
+            self._sampler.start()
+
+    @staticmethod
+    def _before_request():
+        profile = current_profile()
+        if profile is None:
+            return
+
+        rule = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+        profile.endpoint = '{} {}'.format(request.method, rule)
+        # query string, form body parse를 여기서 끝내 parse 구간에 포함시킨다.
+        request.args
+        request.form
+        profile.parse_ms = (time.time() - profile.start) * 1000
+
+    @staticmethod
+    def _timed_representation(representation):
+        @functools.wraps(representation)
+        def wrapper(*args, **kwargs):
+            start = time.time()
+            try:
+                return representation(*args, **kwargs)
+            finally:
+                profile = current_profile()
+                if profile is not None:
+                    profile.serialize_ms += (time.time() - start) * 1000
+        return wrapper
+
+    def start_request(self, environ):
+        profile = RequestProfile()
+        profile.endpoint = '{} {}'.format(environ.get('REQUEST_METHOD'), environ.get('PATH_INFO'))
+        _local.profile = profile
+        with self._lock:
+            self._active[threading.get_ident()] = profile
+        return profile
+
+    def finish_request(self, profile):
+        _local.profile = None
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+
+        if profile.streaming:
+            # SSE 등 long-lived stream은 latency 분포를 왜곡하므로 건수만 센다.
+            with self._lock:
+                stats = self._endpoint_stats(profile.endpoint)
+                stats['streams'] += 1
+            return
+
+        total_ms = (time.time() - profile.start) * 1000
+        phases = dict(
+            total=total_ms,
+            parse=profile.parse_ms,
+            db=profile.db_ms,
+            pool_wait=profile.pool_wait_ms,
+            serialize=profile.serialize_ms,
+        )
+        phases['app'] = max(total_ms - profile.parse_ms - profile.db_ms
+                            - profile.pool_wait_ms - profile.serialize_ms, 0)
+
+        with self._lock:
+            stats = self._endpoint_stats(profile.endpoint)
+            for phase in PHASES:
+                stats['phases'][phase].add(phases[phase])
+            stats['db_queries'] += profile.db_count
+            stats['status'][profile.status] = stats['status'].get(profile.status, 0) + 1
+
+            if total_ms >= self._slow_request_ms:
+                self._slow_requests.append(dict(
+                    endpoint=profile.endpoint,
+                    status=profile.status,
+                    finished_at=time.time(),
+                    phases_ms=phases,
+                    db_queries=profile.db_count,
+                    stacks=[dict(stack=stack, samples=count) for stack, count in profile.samples.most_common(10)],
+                ))
+
+        if total_ms >= self._slow_request_ms:
+            debugger.info('slow request [{:.1f}ms], [{}], db [{:.1f}ms], pool_wait [{:.1f}ms]'.format(
+                total_ms, profile.endpoint, profile.db_ms, profile.pool_wait_ms))
+
+    def _endpoint_stats(self, endpoint):
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            stats = dict(
+                phases={phase: LatencyHistogram() for phase in PHASES},
+                status=dict(),
+                db_queries=0,
+                streams=0,
+            )
+            self._endpoints[endpoint] = stats
+        return stats
+
+    def _sample_loop(self):
+        while True:
+            time.sleep(self._sample_interval)
+            with self._lock:
+                active = list(self._active.items())
+            if not active:
+                continue
+
+            frames = sys._current_frames()
+            for thread_id, profile in active:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    profile.samples[self._fold_stack(frame)] += 1
+
+    def _fold_stack(self, frame):
+        stack = list()
+        while frame is not None and len(stack) < self._max_stack_depth:
+            code = frame.f_code
+            stack.append('{}:{}:{}'.format(os.path.basename(code.co_filename), code.co_name, frame.f_lineno))
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
+
+    def get_metrics(self):
+        with self._lock:
+            endpoints = {
+                endpoint: dict(
+                    phases={phase: histogram.to_dict() for phase, histogram in stats['phases'].items()},
+                    status=dict(stats['status']),
+                    db_queries=stats['db_queries'],
+                    streams=stats['streams'],
+                )
+                for endpoint, stats in self._endpoints.items()
+            }
+            slow_requests = list(self._slow_requests)
+            in_flight = len(self._active)
+
+        return dict(
+            endpoints=endpoints,
+            pools=[pool.stats.get_stats()['pool_wait'] for pool in self._pools],
+            slow_request_ms=self._slow_request_ms,
+            sampling=self._sampler is not None,
+            slow_requests=slow_requests,
+            in_flight=in_flight,
+        )
+
+    def metrics_response(self, start_response):
+        body = json.dumps(self.get_metrics(), default=str).encode()
+        start_response('200 OK', [('Content-Type', 'application/json'), ('Content-Length', str(len(body)))])
+        return [body]
+
+
+class ProfilingMiddleware(object):
+    def __init__(self, wsgi_app, profiler):
+        self._wsgi_app = wsgi_app
+        self._profiler = profiler
+
+    def __call__(self, environ, start_response):
+        if environ.get('PATH_INFO') == self._profiler.metrics_path:
+            return self._profiler.metrics_response(start_response)
+
+        profile = self._profiler.start_request(environ)
+
+        def profiled_start_response(status, headers, exc_info=None):
+            profile.status = int(status.split(' ', 1)[0])
+            profile.streaming = any(
+                key.lower() == 'content-type' and value.startswith('text/event-stream') for key, value in headers
+            )
+            return start_response(status, headers, exc_info)
+
+        try:
+            body = self._wsgi_app(environ, profiled_start_response)
+        except Exception:
+            self._profiler.finish_request(profile)
+            raise
+
+        # stream_db 등 body iteration 중의 DB 시간도 포함하도록 close 시점에 기록한다.
+        return ClosingIterator(body, lambda: self._profiler.finish_request(profile))
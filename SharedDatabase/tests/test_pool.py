@@ -0,0 +1,111 @@
+import pytest
+
+pymysql = pytest.importorskip('pymysql')
+
+from SharedDatabase.pool import ConnectionPool
+
+from pymysql.converters import escape_item
+
+
+class FakeCursor(object):
+    def __init__(self, con):
+        self._con = con
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, query, value=None):
+        if query == 'SELECT @@max_allowed_packet':
+            self._result = (self._con.max_packet,)
+            return 1
+        self._con.queries.append(query)
+        return 0
+
+    def fetchone(self):
+        return self._result
+
+
+class FakeConnection(object):
+    """
+        escape는 pymysql과 같은 literal을 만든다, 실행된 query는 queries에 남긴다.
+    """
+    def __init__(self, max_packet=1024 * 1024):
+        self.max_packet = max_packet
+        self.queries = list()
+        self.commits = 0
+
+    def escape(self, value):
+        return escape_item(value, 'utf8mb4')
+
+    def cursor(self, custom_cursor=None):
+        return FakeCursor(self)
+
+    def ping(self, reconnect=False):
+        pass
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+def chunks(rows, max_bytes, prefix='INSERT INTO t(a, b) VALUES ', suffix=''):
+    return list(ConnectionPool._values_chunks(FakeConnection(), prefix, rows, suffix, max_bytes))
+
+
+def test_values_are_escaped():
+    rows = [['005930', None], ["it's", 'back\\slash'], ['"quoted"', 15]]
+
+    query, = chunks(rows, 1024, suffix=' ON DUPLICATE KEY UPDATE b = VALUES(b)')
+
+    assert query == (
+        "INSERT INTO t(a, b) VALUES ('005930',NULL),('it\\'s','back\\\\slash'),('\\\"quoted\\\"',15)"
+        " ON DUPLICATE KEY UPDATE b = VALUES(b)"
+    )
+
+
+def test_chunks_fit_max_bytes_and_keep_every_row():
+    rows = [['{:06d}'.format(index), index * 1000] for index in range(500)]
+    max_bytes = 300
+
+    queries = chunks(rows, max_bytes)
+
+    assert len(queries) > 1
+    assert all(len(query.encode()) <= max_bytes for query in queries)
+    literals = [literal for query in queries for literal in query[len('INSERT INTO t(a, b) VALUES '):].split('),(')]
+    assert len(literals) == len(rows)
+    assert literals[0] == "('000000',0" and literals[-1] == "'000499',499000)"
+
+
+def test_row_larger_than_max_bytes_is_sent_alone():
+    rows = [['a', 1], ['x' * 100, 2], ['b', 3]]
+
+    queries = chunks(rows, 60)
+
+    assert queries == [
+        "INSERT INTO t(a, b) VALUES ('a',1)",
+        "INSERT INTO t(a, b) VALUES ('{}',2)".format('x' * 100),
+        "INSERT INTO t(a, b) VALUES ('b',3)",
+    ]
+
+
+def test_execute_values_uses_max_packet_in_one_transaction(monkeypatch):
+    con = FakeConnection(max_packet=400)
+    pool = ConnectionPool(1)
+    monkeypatch.setattr(pool, '_connect', lambda: con)
+
+    pool.execute_values([
+        ('INSERT IGNORE INTO daily_info(stock_code, candle_date) VALUES ',
+         [['{:06d}'.format(index), index] for index in range(100)], ''),
+        ('INSERT INTO empty_table(a) VALUES ', list(), ''),
+    ])
+
+    assert len(con.queries) > 1
+    # max_allowed_packet의 90%
+    assert all(len(query.encode()) <= 360 for query in con.queries)
+    assert sum(query.count('(') - 1 for query in con.queries) == 100
+    assert con.commits == 1
@@ -0,0 +1,92 @@
+from Util.pyinstaller_patch import debugger
+
+import datetime
+import json
+import os
+
+"""
+    Kiwoom 종목코드 -> 종목명 disk cache, KiwoomHighChart 수집기와 KiwoomHighChartQTVer가 같은 파일을 쓴다.
+    종목코드 목록(GetCodeListByMarket)은 TR 없이 바로 받을 수 있으므로 매번 받고,
+    종목명은 cache에 없거나 시장이 바뀐 종목만 대량종목명 TR로 받는다.
+    이름이 바뀐 종목은 FULL_REFRESH_DAYS 마다 전체를 다시 받아 반영한다.
+
+    file: {"date": 마지막 갱신일, "full_date": 마지막 전체 갱신일, "names": {code: [name, market]}}
+"""
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.kiwoom', 'stock_names.json')
+FULL_REFRESH_DAYS = 7
+
+# get_all_stock_korean_name 화면번호
+MARKET_SCREENS = {
+    'kospi': '9542',
+    'kosdaq': '9543',
+}
+
+
+class StockNameCache(object):
+    def __init__(self, path=DEFAULT_PATH, full_refresh_days=FULL_REFRESH_DAYS):
+        self._path = path
+        self._full_refresh_days = full_refresh_days
+
+    def load(self):
+        try:
+            with open(self._path, 'r', encoding='utf8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, data):
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        tmp_path = '{}.{}.tmp'.format(self._path, os.getpid())
+        with open(tmp_path, 'w', encoding='utf8') as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._path)
+
+    def get_names(self, code_dic, fetch, today=None):
+        """
+            Args:
+                code_dic: KiwoomAPIModule.get_stock_codes() 결과, {'kospi': [...], 'kosdaq': [...]}
+                fetch: fetch(scn, code_list) -> {code: name}, 100개 단위 TR 요청은 호출하는 쪽에서 한다.
+                today: datetime.date, 테스트용
+            Return:
+                {'kospi': {code: name}, 'kosdaq': {code: name}}, code_dic 순서
+        """
+        today = today or datetime.date.today()
+        cache = self.load() or dict()
+        cached = cache.get('names', dict())
+
+        full_date = cache.get('full_date')
+        is_full = full_date is None or \
+            (today - datetime.date.fromisoformat(full_date)).days >= self._full_refresh_days
+
+        fetched = 0
+        names = dict()
+        for market, codes in code_dic.items():
+            codes = [code for code in codes if code]
+            if is_full:
+                targets = codes
+            else:
+                # 신규 상장, 시장 이전 종목
+                targets = [code for code in codes if cached.get(code, [None, None])[1] != market]
+
+            received = fetch(MARKET_SCREENS[market], targets) if targets else dict()
+            fetched += len(received)
+            names[market] = {
+                code: received[code] if code in received else cached.get(code, [str()])[0]
+                for code in codes
+            }
+
+        if fetched or is_full or cache.get('date') != today.isoformat():
+            # 상장폐지 종목은 code_dic에 없으므로 자연히 빠진다.
+            self.save(dict(
+                date=today.isoformat(),
+                full_date=today.isoformat() if is_full else full_date,
+                names={code: [name, market] for market, market_names in names.items()
+                       for code, name in market_names.items() if name},
+            ))
+
+        debugger.debug('stock name cache, codes=[{}], fetched=[{}], full=[{}]'.format(
+            sum(len(each) for each in names.values()), fetched, is_full))
+        return names
@@ -0,0 +1,103 @@
+from StockApis.name_cache import StockNameCache, MARKET_SCREENS
+
+import datetime
+import json
+
+import pytest
+
+NAMES = {
+    '005930': '삼성전자',
+    '000660': 'SK하이닉스',
+    '035720': '카카오',
+    '247540': '에코프로비엠',
+}
+
+
+class FakeFetch(object):
+    def __init__(self, names):
+        self.names = dict(names)
+        self.calls = list()
+
+    def __call__(self, scn, code_list):
+        self.calls.append((scn, list(code_list)))
+        return {code: self.names[code] for code in code_list if code in self.names}
+
+    @property
+    def fetched_codes(self):
+        return sorted(code for _, code_list in self.calls for code in code_list)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return StockNameCache(path=str(tmp_path / 'kiwoom' / 'stock_names.json'), full_refresh_days=7)
+
+
+def test_first_run_fetches_all(cache):
+    fetch = FakeFetch(NAMES)
+    code_dic = {'kospi': ['005930', '000660', ''], 'kosdaq': ['247540']}
+
+    names = cache.get_names(code_dic, fetch, today=datetime.date(2026, 10, 19))
+
+    assert names == {'kospi': {'005930': '삼성전자', '000660': 'SK하이닉스'}, 'kosdaq': {'247540': '에코프로비엠'}}
+    assert fetch.calls == [(MARKET_SCREENS['kospi'], ['005930', '000660']),
+                           (MARKET_SCREENS['kosdaq'], ['247540'])]
+
+    data = cache.load()
+    assert data['date'] == data['full_date'] == '2026-10-19'
+    assert data['names']['247540'] == ['에코프로비엠', 'kosdaq']
+
+
+def test_incremental_fetches_only_new_and_moved(cache):
+    cache.get_names({'kospi': ['005930', '000660'], 'kosdaq': ['247540']}, FakeFetch(NAMES),
+                    today=datetime.date(2026, 10, 19))
+
+    fetch = FakeFetch(dict(NAMES, **{'000660': '이름이 바뀐 종목'}))
+    # 035720 신규 상장, 247540 kosdaq -> kospi 이전, 000660 이름 변경은 다음 전체 갱신까지 cache 값
+    names = cache.get_names({'kospi': ['005930', '000660', '035720', '247540'], 'kosdaq': list()}, fetch,
+                            today=datetime.date(2026, 10, 20))
+
+    assert fetch.fetched_codes == ['035720', '247540']
+    assert names['kospi'] == {
+        '005930': '삼성전자', '000660': 'SK하이닉스', '035720': '카카오', '247540': '에코프로비엠'
+    }
+    data = cache.load()
+    assert data['full_date'] == '2026-10-19'
+    assert data['names']['247540'] == ['에코프로비엠', 'kospi']
+
+
+def test_delisted_codes_are_removed(cache):
+    cache.get_names({'kospi': ['005930', '000660']}, FakeFetch(NAMES), today=datetime.date(2026, 10, 19))
+
+    fetch = FakeFetch(NAMES)
+    names = cache.get_names({'kospi': ['005930']}, fetch, today=datetime.date(2026, 10, 20))
+
+    assert fetch.calls == list()
+    assert names == {'kospi': {'005930': '삼성전자'}}
+    assert sorted(cache.load()['names']) == ['005930']
+
+
+def test_full_refresh_after_interval(cache):
+    code_dic = {'kospi': ['005930', '000660']}
+    cache.get_names(code_dic, FakeFetch(NAMES), today=datetime.date(2026, 10, 19))
+
+    fetch = FakeFetch(dict(NAMES, **{'000660': '이름이 바뀐 종목'}))
+    cache.get_names(code_dic, fetch, today=datetime.date(2026, 10, 25))
+    assert fetch.calls == list()
+
+    names = cache.get_names(code_dic, fetch, today=datetime.date(2026, 10, 26))
+    assert fetch.fetched_codes == ['000660', '005930']
+    assert names['kospi']['000660'] == '이름이 바뀐 종목'
+    assert cache.load()['full_date'] == '2026-10-26'
+
+
+def test_broken_cache_file_is_full_refresh(cache, tmp_path):
+    path = tmp_path / 'kiwoom' / 'stock_names.json'
+    path.parent.mkdir(parents=True)
+    path.write_text('{"names": ', encoding='utf8')
+
+    fetch = FakeFetch(NAMES)
+    cache.get_names({'kospi': ['005930']}, fetch, today=datetime.date(2026, 10, 19))
+
+    assert fetch.fetched_codes == ['005930']
+    with open(str(path), encoding='utf8') as f:
+        assert json.load(f)['names'] == {'005930': ['삼성전자', 'kospi']}
@@ -0,0 +1,9 @@
+"""
+    repository root를 sys.path에 두어 각 패키지의 tests에서 DiffTrader, KiwoomHighChart, StockApis를 import 한다.
+    Util(pyinstaller_patch)은 별도로 설치되어 있어야 한다.
+"""
+
+collect_ignore = [
+    # Kiwoom OpenAPI(QAxWidget)가 설치된 Windows에서 직접 실행하는 수동 test
+    'StockApis/tests/kiwoom_test.py',
+]